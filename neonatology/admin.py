@@ -1,16 +1,27 @@
 from django.contrib import admin
-from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka
+from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka, StatusDziecka
+from .repliki import odczyt_z_repliki
+from .stronicowanie import KursorAdminMixin
+
+
+class ListaZRepliki:
+    """Listy obiektów w panelu admina czytane z repliki (zob. repliki.py); akcje (POST) idą do bazy podstawowej."""
+
+    def changelist_view(self, request, extra_context=None):
+        return odczyt_z_repliki(super().changelist_view)(request, extra_context)
 
 
 @admin.register(Matka)
-class MatkaAdmin(admin.ModelAdmin):
+class MatkaAdmin(ListaZRepliki, KursorAdminMixin, admin.ModelAdmin):
+    kursor_ordering = ('-id',)
     list_display = ('imie', 'nazwisko', 'pesel', 'grupa_krwi')
     search_fields = ('imie', 'nazwisko', 'pesel')
     list_filter = ('grupa_krwi', 'konflikt_serologiczny')
 
 
 @admin.register(Dziecko)
-class DzieckoAdmin(admin.ModelAdmin):
+class DzieckoAdmin(ListaZRepliki, KursorAdminMixin, admin.ModelAdmin):
+    kursor_ordering = ('-created_at', '-id')
     list_display = ('imie', 'data_urodzenia', 'plec', 'matka')
     search_fields = ('imie', 'matka__pesel', 'matka__imie', 'matka__nazwisko')
     list_filter = ('plec', 'data_urodzenia', 'matka')
@@ -18,7 +29,8 @@ class DzieckoAdmin(admin.ModelAdmin):
 
 
 @admin.register(ParametryZewnetrzne)
-class ParametryZewnetrzneAdmin(admin.ModelAdmin):
+class ParametryZewnetrzneAdmin(ListaZRepliki, KursorAdminMixin, admin.ModelAdmin):
+    kursor_ordering = ('-data_pomiaru', '-id')
     list_display = ('dziecko', 'data_pomiaru', 'waga_kg', 'wzrost_cm', 'lekarz')
     search_fields = ('dziecko__imie',)
     list_filter = ('data_pomiaru', 'czy_wczesniak', 'lekarz')
@@ -26,8 +38,17 @@ class ParametryZewnetrzneAdmin(admin.ModelAdmin):
 
 
 @admin.register(APGARScore)
-class APGARScoreAdmin(admin.ModelAdmin):
+class APGARScoreAdmin(ListaZRepliki, KursorAdminMixin, admin.ModelAdmin):
+    kursor_ordering = ('-data_pomiaru', '-id')
     list_display = ('dziecko', 'data_pomiaru', 'apgar_1min', 'apgar_5min', 'apgar_10min', 'lekarz')
     search_fields = ('dziecko__imie',)
     list_filter = ('data_pomiaru', 'lekarz')
     readonly_fields = ('data_pomiaru',)
+
+
+@admin.register(StatusDziecka)
+class StatusDzieckaAdmin(ListaZRepliki, admin.ModelAdmin):
+    list_display = ('dziecko', 'status', 'waga_kg', 'natlenienie_spO2', 'apgar_5min', 'konflikt_serologiczny', 'zaktualizowano')
+    list_filter = ('status', 'konflikt_serologiczny')
+    list_select_related = ('dziecko',)
+    readonly_fields = [f.name for f in StatusDziecka._meta.fields]
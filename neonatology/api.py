@@ -0,0 +1,154 @@
+"""JSON API dla integracji z systemami przyłóżkowymi.
+
+Odczyt jest zbiorczy: ``?ids=1,2,3`` (lub ``?dziecko=`` dla pomiarów i
+APGAR) pobiera wszystkie rekordy jednym zapytaniem, a ``?pola=`` zawęża
+kolumny SELECT do wybranych pól. Wiersze idą z `values_list` prosto do
+JSON - bez tworzenia obiektów modeli i bez szablonów.
+
+Zapis przyjmuje tablicę pomiarów, waliduje ją całą formularzem wiersza
+obchodu i zapisuje w jednej transakcji tak jak obchód (`obchod.zapisz_obchod`).
+"""
+from collections import namedtuple
+
+from .forms import WierszObchoduForm
+from .models import Dziecko, Matka, ParametryZewnetrzne, APGARScore
+from .obchod import werdykty_obchodu, zapisz_obchod
+
+# Najwięcej identyfikatorów w jednym żądaniu i pomiarów w jednym zapisie
+MAKS_ID = 500
+
+# `pola` - pole API -> ścieżka ORM; `filtry` - parametry zapytania -> pole filtrowane przez __in
+Zasob = namedtuple('Zasob', ['model', 'pola', 'domyslne', 'filtry'])
+
+_POLA_POMIARU = {'id': 'id', 'dziecko_id': 'dziecko_id', 'lekarz_id': 'lekarz_id', 'data_pomiaru': 'data_pomiaru'}
+
+ZASOBY = {
+    'dzieci': Zasob(
+        Dziecko,
+        {
+            'id': 'id', 'imie': 'imie', 'data_urodzenia': 'data_urodzenia', 'plec': 'plec',
+            'grupa_krwi': 'grupa_krwi', 'matka_id': 'matka_id', 'created_at': 'created_at',
+            # Z migawki statusu (ostatnie pomiary i werdykt)
+            'status': 'status__status', 'werdykt': 'status__werdykt', 'waga_kg': 'status__waga_kg',
+            'natlenienie_spO2': 'status__natlenienie_spO2', 'apgar_5min': 'status__apgar_5min',
+            'liczba_pomiarow': 'status__liczba_pomiarow', 'liczba_apgar': 'status__liczba_apgar',
+        },
+        ('id', 'imie', 'data_urodzenia', 'plec', 'grupa_krwi', 'matka_id', 'status'),
+        {'ids': 'pk', 'matka': 'matka_id'},
+    ),
+    'matki': Zasob(
+        Matka,
+        {'id': 'id', 'pesel': 'pesel', 'imie': 'imie', 'nazwisko': 'nazwisko', 'grupa_krwi': 'grupa_krwi',
+         'konflikt_serologiczny': 'konflikt_serologiczny'},
+        ('id', 'pesel', 'imie', 'nazwisko', 'grupa_krwi', 'konflikt_serologiczny'),
+        {'ids': 'pk'},
+    ),
+    'parametry': Zasob(
+        ParametryZewnetrzne,
+        dict(_POLA_POMIARU, **{pole: pole for pole in (
+            'wzrost_cm', 'waga_kg', 'czy_wczesniak', 'obwod_glowy_cm', 'oddechy_na_min', 'natlenienie_spO2')}),
+        ('id', 'dziecko_id', 'data_pomiaru', 'waga_kg', 'natlenienie_spO2'),
+        {'ids': 'pk', 'dziecko': 'dziecko_id'},
+    ),
+    'apgar': Zasob(
+        APGARScore,
+        dict(_POLA_POMIARU, **{pole: pole for pole in ('apgar_1min', 'apgar_5min', 'apgar_10min')}),
+        ('id', 'dziecko_id', 'data_pomiaru', 'apgar_1min', 'apgar_5min', 'apgar_10min'),
+        {'ids': 'pk', 'dziecko': 'dziecko_id'},
+    ),
+}
+
+
+def _lista_id(wartosci):
+    """Identyfikatory z parametrów ``?ids=1,2&ids=3``; ValueError dla niepoprawnych lub zbyt wielu."""
+    ids = []
+    for wartosc in wartosci:
+        for kawalek in wartosc.split(','):
+            kawalek = kawalek.strip()
+            if not kawalek.isdigit():
+                raise ValueError(f'Invalid id: {kawalek!r}')
+            ids.append(int(kawalek))
+    ids = sorted(set(ids))
+    if len(ids) > MAKS_ID:
+        raise ValueError(f'At most {MAKS_ID} ids per request')
+    return ids
+
+
+def _wybrane_pola(zasob, tekst):
+    """Pola z ``?pola=a,b`` (``id`` zawsze pierwsze); ValueError dla nieznanych."""
+    if not tekst:
+        return zasob.domyslne
+    pola = [pole.strip() for pole in tekst.split(',') if pole.strip()]
+    nieznane = [pole for pole in pola if pole not in zasob.pola]
+    if nieznane:
+        raise ValueError(f'Unknown fields: {", ".join(nieznane)}; available: {", ".join(zasob.pola)}')
+    return ('id',) + tuple(dict.fromkeys(pole for pole in pola if pole != 'id'))
+
+
+def pobierz(nazwa, parametry):
+    """Rekordy zasobu `nazwa` wskazane w `parametry` (np. ``request.GET``) jednym zapytaniem.
+
+    Zwraca ``{'wyniki': [...], 'brakujace': [...]}`` - ``brakujace`` to
+    identyfikatory z ``ids``, których nie ma w bazie. Rzuca KeyError dla
+    nieznanego zasobu i ValueError dla niepoprawnych parametrów.
+    """
+    zasob = ZASOBY[nazwa]
+    pola = _wybrane_pola(zasob, parametry.get('pola', ''))
+    zapytanie = zasob.model.objects.all()
+    ids = None
+    filtrowane = False
+    for parametr, pole in zasob.filtry.items():
+        if parametr in parametry:
+            wartosci = _lista_id(parametry.getlist(parametr))
+            zapytanie = zapytanie.filter(**{f'{pole}__in': wartosci})
+            filtrowane = True
+            if parametr == 'ids':
+                ids = wartosci
+    if not filtrowane:
+        raise ValueError(f'Filter required: {" or ".join(zasob.filtry)}')
+
+    wyniki = [dict(zip(pola, wiersz)) for wiersz in
+              zapytanie.order_by('pk').values_list(*(zasob.pola[pole] for pole in pola))]
+    znalezione = {wiersz['id'] for wiersz in wyniki}
+    return {'wyniki': wyniki, 'brakujace': [pk for pk in ids or () if pk not in znalezione]}
+
+
+def zapisz_pomiary(dane, lekarz):
+    """Waliduje i zapisuje tablicę pomiarów ``[{dziecko, waga_kg, ...}, ...]``.
+
+    Zwraca ``(zapisane, bledy)``: przy jakimkolwiek błędzie nic nie jest
+    zapisywane, a `bledy` mapuje indeks elementu na błędy jego pól.
+    """
+    if not isinstance(dane, list) or not dane:
+        raise ValueError('Expected a non-empty JSON array of measurements')
+    if len(dane) > MAKS_ID:
+        raise ValueError(f'At most {MAKS_ID} measurements per request')
+
+    formularze = [WierszObchoduForm(element) if isinstance(element, dict) else None for element in dane]
+    bledy = {}
+    for nr, form in enumerate(formularze):
+        if form is None:
+            bledy[nr] = {'__all__': [{'message': 'Expected a JSON object', 'code': 'invalid'}]}
+        elif not form.is_valid():
+            bledy[nr] = form.errors.get_json_data()
+    if bledy:
+        return [], bledy
+
+    dzieci = Dziecko.objects.in_bulk({form.cleaned_data['dziecko'] for form in formularze})
+    for nr, form in enumerate(formularze):
+        if form.cleaned_data['dziecko'] not in dzieci:
+            bledy[nr] = {'dziecko': [{'message': 'Dziecko nie istnieje.', 'code': 'invalid'}]}
+    if bledy:
+        return [], bledy
+
+    pomiary = []
+    for form in formularze:
+        pomiar = form.save(commit=False)
+        pomiar.dziecko = dzieci[form.cleaned_data['dziecko']]
+        pomiary.append(pomiar)
+    zapisane = [
+        {'id': pomiar.pk, 'dziecko_id': pomiar.dziecko_id, 'data_pomiaru': pomiar.data_pomiaru,
+         'status': status, 'werdykt': werdykt}
+        for pomiar, status, werdykt in werdykty_obchodu(zapisz_obchod(pomiary, lekarz))
+    ]
+    return zapisane, {}
@@ -0,0 +1,475 @@
+"""Archiwum starych wpisów historii (simple_history) w plikach gzip JSONL.
+
+Wpisy historii dzieci, matek, pomiarów i APGAR starsze niż
+``ARCHIWUM_HISTORII_DNI`` dni są przenoszone z tabel historycznych do
+plików miesięcznych ``<katalog>/<typ>/<RRRR-MM>.<n>.jsonl.gz`` (miesiąc
+``history_date`` w UTC). Plik jest tylko dopisywany: każde archiwizowanie
+dokłada bloki - osobne człony gzip po najwyżej `BLOK_WIERSZY` wierszy
+posortowanych po kluczu (dziecko, a dla historii matki - matka). Obok leży
+mały indeks ``<RRRR-MM>.indeks.json`` z położeniem, liczbą wierszy,
+SHA-256, zakresem dat i przedziałami kluczy każdego bloku. Historia
+jednego dziecka wymaga rozpakowania tylko bloków, których przedziały
+zawierają jego klucz, a JSON jest dekodowany tylko dla pasujących linii.
+
+Kolejność zapisu: bloki (fsync) -> indeks (plik tymczasowy i
+`os.replace`) -> usunięcie wierszy z bazy. Przerwane archiwizowanie
+zostawia najwyżej nieindeksowany ogon pliku (obcinany przy następnym
+dopisaniu) albo wiersze obecne i w bazie, i w archiwum - odczyt pomija
+duplikaty ``history_id``, a kompaktowanie usuwa je z archiwum.
+Kompaktowanie przepisuje miesiąc do nowego pliku (``n`` + 1) jako
+posortowane bloki bez duplikatów i dopiero potem przełącza na niego indeks.
+
+Ustawienia (opcjonalne): ``ARCHIWUM_HISTORII_KATALOG`` (domyślnie
+``archiwum_historii`` w ``BASE_DIR``) i ``ARCHIWUM_HISTORII_DNI``.
+"""
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timedelta, timezone as strefa
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka
+
+# Typ historii (jak `model_type` w historia.py) -> (model, pole klucza)
+TYPY = {
+    'dziecko': (Dziecko, 'id'),
+    'matka': (Matka, 'id'),
+    'parametry': (ParametryZewnetrzne, 'dziecko_id'),
+    'apgar': (APGARScore, 'dziecko_id'),
+}
+DOMYSLNE_DNI = 365
+BLOK_WIERSZY = 2000
+MAKS_PRZEDZIALOW = 64
+PORCJA_USUWANIA = 500
+WERSJA_INDEKSU = 1
+SUFIKS_INDEKSU = '.indeks.json'
+PLIK_BLOKADY = '.blokada'
+
+_indeksy = {}
+_blokada_indeksow = threading.Lock()
+
+
+def katalog():
+    sciezka = getattr(settings, 'ARCHIWUM_HISTORII_KATALOG', None)
+    if sciezka is None:
+        sciezka = Path(getattr(settings, 'BASE_DIR', '.')) / 'archiwum_historii'
+    return Path(sciezka)
+
+
+def dni_retencji():
+    return getattr(settings, 'ARCHIWUM_HISTORII_DNI', DOMYSLNE_DNI)
+
+
+def _katalog_typu(typ):
+    return katalog() / typ
+
+
+def _plik_danych(miesiac, numer):
+    return f'{miesiac}.{numer}.jsonl.gz'
+
+
+def _miesiac(chwila):
+    if timezone.is_aware(chwila):
+        chwila = chwila.astimezone(strefa.utc)
+    return chwila.strftime('%Y-%m')
+
+
+# --- Wiersze ---
+
+def _pola(model):
+    return model.history.model._meta.concrete_fields
+
+
+def _do_json(wartosc):
+    if isinstance(wartosc, (date, datetime)):
+        return wartosc.isoformat()
+    return wartosc
+
+
+def _wiersz(obiekt, pola):
+    return {pole.attname: _do_json(getattr(obiekt, pole.attname)) for pole in pola}
+
+
+def _obiekt(model, dane):
+    """Wpis historii odtworzony z wiersza archiwum (``z_archiwum = True``)."""
+    obiekt = model.history.model(**{pole.attname: pole.to_python(dane.get(pole.attname)) for pole in _pola(model)})
+    obiekt.z_archiwum = True
+    return obiekt
+
+
+def _klucz_sortowania(klucz):
+    return lambda dane: (dane[klucz], dane['id'], dane['history_date'], dane['history_id'])
+
+
+# --- Indeks ---
+
+def _przedzialy(klucze):
+    """Klucze bloku jako najwyżej `MAKS_PRZEDZIALOW` przedziałów ``[[od, do], ...]``.
+
+    Kolejne wartości tworzą jeden przedział; gdy przedziałów jest za dużo,
+    łączone są te rozdzielone najmniejszymi przerwami. Indeks pozostaje mały,
+    ale bywa nadmiarowy - klucz w przedziale nie musi mieć wierszy w bloku.
+    """
+    przedzialy = []
+    for klucz in sorted(set(klucze)):
+        if przedzialy and przedzialy[-1][1] + 1 == klucz:
+            przedzialy[-1][1] = klucz
+        else:
+            przedzialy.append([klucz, klucz])
+    if len(przedzialy) > MAKS_PRZEDZIALOW:
+        przerwy = sorted(range(1, len(przedzialy)), key=lambda i: przedzialy[i][0] - przedzialy[i - 1][1])
+        scalane = set(przerwy[:len(przedzialy) - MAKS_PRZEDZIALOW])
+        zlaczone = []
+        for i, przedzial in enumerate(przedzialy):
+            if i in scalane:
+                zlaczone[-1][1] = przedzial[1]
+            else:
+                zlaczone.append(przedzial)
+        przedzialy = zlaczone
+    return przedzialy
+
+
+def _zawiera(przedzialy, klucz):
+    i = bisect.bisect_right(przedzialy, [klucz, float('inf')]) - 1
+    return i >= 0 and przedzialy[i][0] <= klucz <= przedzialy[i][1]
+
+
+def _wczytaj_indeks(sciezka):
+    """Indeks miesiąca (pamiętany w procesie do zmiany pliku) albo None."""
+    try:
+        stan = os.stat(sciezka)
+    except FileNotFoundError:
+        return None
+    wersja = (stan.st_mtime_ns, stan.st_size)
+    with _blokada_indeksow:
+        zapamietany = _indeksy.get(sciezka)
+    if zapamietany and zapamietany[0] == wersja:
+        return zapamietany[1]
+    with open(sciezka, encoding='utf-8') as plik:
+        indeks = json.load(plik)
+    with _blokada_indeksow:
+        _indeksy[sciezka] = (wersja, indeks)
+    return indeks
+
+
+def _zapisz_plik(sciezka, tresc):
+    """Atomowa podmiana pliku: zapis obok, fsync, `os.replace`."""
+    tymczasowy = sciezka.with_name(sciezka.name + '.tmp')
+    with open(tymczasowy, 'wb') as plik:
+        plik.write(tresc)
+        plik.flush()
+        os.fsync(plik.fileno())
+    os.replace(tymczasowy, sciezka)
+
+
+def _zapisz_indeks(sciezka, indeks):
+    _zapisz_plik(sciezka, json.dumps(indeks, indent=1).encode('utf-8'))
+
+
+def indeksy(typ):
+    """(miesiąc, ścieżka indeksu, indeks) dla wszystkich miesięcy typu, od najstarszego.
+
+    Lista jest pamiętana do zmiany katalogu - każdy zapis indeksu to
+    `os.replace`, który zmienia czas modyfikacji katalogu.
+    """
+    katalog_typu = _katalog_typu(typ)
+    try:
+        wersja = os.stat(katalog_typu).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    with _blokada_indeksow:
+        zapamietany = _indeksy.get(katalog_typu)
+    if zapamietany and zapamietany[0] == wersja:
+        return zapamietany[1]
+    wynik = []
+    for sciezka in sorted(katalog_typu.glob('*' + SUFIKS_INDEKSU)):
+        indeks = _wczytaj_indeks(sciezka)
+        if indeks is not None:
+            wynik.append((sciezka.name[:-len(SUFIKS_INDEKSU)], sciezka, indeks))
+    with _blokada_indeksow:
+        _indeksy[katalog_typu] = (wersja, wynik)
+    return wynik
+
+
+# --- Zapis ---
+
+def _bloki(wiersze, klucz):
+    """Człony gzip po `BLOK_WIERSZY` wierszy (słowniki posortowane po kluczu) z opisem do indeksu."""
+    for poczatek in range(0, len(wiersze), BLOK_WIERSZY):
+        porcja = wiersze[poczatek:poczatek + BLOK_WIERSZY]
+        dane = gzip.compress(''.join(json.dumps(w, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                     for w in porcja).encode('utf-8'), mtime=0)
+        daty = [w['history_date'] for w in porcja]
+        yield dane, {
+            'wiersze': len(porcja),
+            'sha256': hashlib.sha256(dane).hexdigest(),
+            'od': min(daty),
+            'do': max(daty),
+            'klucze': _przedzialy(w[klucz] for w in porcja),
+        }
+
+
+def _koniec(indeks):
+    return max((b['offset'] + b['dlugosc'] for b in indeks['bloki']), default=0)
+
+
+def _dopisz(typ, miesiac, wiersze):
+    """Dopisuje bloki do pliku miesiąca, a potem zapisuje indeks. Zwraca liczbę bajtów."""
+    katalog_typu = _katalog_typu(typ)
+    katalog_typu.mkdir(parents=True, exist_ok=True)
+    sciezka_indeksu = katalog_typu / (miesiac + SUFIKS_INDEKSU)
+    indeks = _wczytaj_indeks(sciezka_indeksu) or {'wersja': WERSJA_INDEKSU, 'plik': _plik_danych(miesiac, 1),
+                                                  'bloki': []}
+    indeks = dict(indeks, bloki=list(indeks['bloki']), skompaktowany=False)
+    sciezka = katalog_typu / indeks['plik']
+    koniec = _koniec(indeks)
+    with open(sciezka, 'r+b' if sciezka.exists() else 'wb') as plik:
+        # Ogon bez wpisu w indeksie pochodzi z przerwanego zapisu
+        plik.truncate(koniec)
+        plik.seek(koniec)
+        for dane, opis in _bloki(wiersze, TYPY[typ][1]):
+            indeks['bloki'].append(dict(opis, offset=plik.tell(), dlugosc=len(dane)))
+            plik.write(dane)
+        plik.flush()
+        os.fsync(plik.fileno())
+    _zapisz_indeks(sciezka_indeksu, indeks)
+    return _koniec(indeks) - koniec
+
+
+@contextmanager
+def _blokada():
+    """Wyłączność zapisu do archiwum między procesami (plik blokady)."""
+    katalog().mkdir(parents=True, exist_ok=True)
+    sciezka = katalog() / PLIK_BLOKADY
+    try:
+        deskryptor = os.open(sciezka, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        raise RuntimeError(f'The archive is locked by another run (remove {sciezka} if that run is gone)')
+    try:
+        os.write(deskryptor, str(os.getpid()).encode('ascii'))
+        yield
+    finally:
+        os.close(deskryptor)
+        os.unlink(sciezka)
+
+
+def archiwizuj(dni=None, typy=None, proba=False):
+    """Przenosi wpisy historii starsze niż `dni` do archiwum, miesiąc po miesiącu.
+
+    Zwraca ``{typ: (liczba wierszy, liczba bajtów)}``; przy ``proba`` tylko
+    liczy wiersze, nic nie zapisując.
+    """
+    granica = timezone.now() - timedelta(days=dni_retencji() if dni is None else dni)
+    wynik = {}
+    with nullcontext() if proba else _blokada():
+        for typ in typy or TYPY:
+            model, klucz = TYPY[typ]
+            stare = model.history.filter(history_date__lt=granica)
+            if proba:
+                wynik[typ] = (stare.count(), 0)
+                continue
+            pola = _pola(model)
+            wiersze_razem = bajty_razem = 0
+            for poczatek in stare.datetimes('history_date', 'month', tzinfo=strefa.utc):
+                koniec = (poczatek + timedelta(days=32)).replace(day=1)
+                obiekty = list(stare.filter(history_date__gte=poczatek, history_date__lt=koniec)
+                               .order_by(klucz, 'id', 'history_date', 'history_id'))
+                wiersze = [_wiersz(obiekt, pola) for obiekt in obiekty]
+                bajty_razem += _dopisz(typ, _miesiac(poczatek), wiersze)
+                # Dopiero po zapisaniu indeksu - wiersze są już w archiwum
+                ids = [obiekt.history_id for obiekt in obiekty]
+                with transaction.atomic():
+                    for i in range(0, len(ids), PORCJA_USUWANIA):
+                        model.history.filter(history_id__in=ids[i:i + PORCJA_USUWANIA]).delete()
+                wiersze_razem += len(ids)
+            wynik[typ] = (wiersze_razem, bajty_razem)
+    return wynik
+
+
+# --- Odczyt ---
+
+def _linie_bloku(plik, blok):
+    plik.seek(blok['offset'])
+    return gzip.decompress(plik.read(blok['dlugosc'])).decode('utf-8').splitlines()
+
+
+def _klucze_dziecka(dziecko):
+    return {'dziecko': dziecko.pk, 'matka': dziecko.matka_id, 'parametry': dziecko.pk, 'apgar': dziecko.pk}
+
+
+def typy_dziecka(dziecko):
+    """Typy historii, dla których dziecko może mieć wpisy w archiwum - tylko z indeksów, bez rozpakowywania."""
+    typy = set()
+    for typ, klucz in _klucze_dziecka(dziecko).items():
+        if klucz is not None and any(_zawiera(blok['klucze'], klucz)
+                                     for _, _, indeks in indeksy(typ) for blok in indeks['bloki']):
+            typy.add(typ)
+    return typy
+
+
+def _dolacz_uzytkownikow(obiekty, model):
+    """Ustawia obiekty użytkowników (autor, lekarz) jednym zapytaniem, jak `select_related`."""
+    uzytkownik = get_user_model()
+    pola = [pole for pole in _pola(model) if pole.is_relation and pole.related_model is uzytkownik]
+    ids = {getattr(obiekt, pole.attname) for obiekt in obiekty for pole in pola} - {None}
+    uzytkownicy = uzytkownik.objects.in_bulk(ids) if ids else {}
+    for obiekt in obiekty:
+        for pole in pola:
+            pole.set_cached_value(obiekt, uzytkownicy.get(getattr(obiekt, pole.attname)))
+
+
+def wiersze_dziecka(dziecko, typy=None):
+    """Zarchiwizowane wpisy historii dziecka: ``{typ: [wpis historii, ...]}``.
+
+    Rozpakowywane są tylko bloki, których przedziały kluczy obejmują dziecko
+    (albo jego matkę).
+    """
+    wynik = {}
+    for typ, klucz in _klucze_dziecka(dziecko).items():
+        if klucz is None or (typy is not None and typ not in typy):
+            continue
+        model, pole_klucza = TYPY[typ]
+        wiersze = {}
+        for _, sciezka_indeksu, indeks in indeksy(typ):
+            bloki = [blok for blok in indeks['bloki'] if _zawiera(blok['klucze'], klucz)]
+            if not bloki:
+                continue
+            # Wstępny filtr tekstowy - JSON jest dekodowany tylko dla linii z kluczem
+            wzorzec = f'"{pole_klucza}":{klucz},'
+            with open(sciezka_indeksu.with_name(indeks['plik']), 'rb') as plik:
+                for blok in bloki:
+                    for linia in _linie_bloku(plik, blok):
+                        if wzorzec in linia:
+                            dane = json.loads(linia)
+                            if dane[pole_klucza] == klucz:
+                                wiersze[dane['history_id']] = dane
+        obiekty = [_obiekt(model, dane) for dane in wiersze.values()]
+        _dolacz_uzytkownikow(obiekty, model)
+        wynik[typ] = obiekty
+    return wynik
+
+
+# --- Kompaktowanie i weryfikacja ---
+
+def _pliki_danych(katalog_typu, miesiac):
+    return sorted(katalog_typu.glob(f'{miesiac}.*.jsonl.gz'))
+
+
+def kompaktuj(typy=None):
+    """Przepisuje miesiące do nowych plików: posortowane bloki bez duplikatów.
+
+    Usuwa też nieindeksowane ogony i pliki, na które nie wskazuje indeks.
+    Miesiące bez zmian od poprzedniego kompaktowania są pomijane.
+    Zwraca ``{typ: {'miesiace', 'wiersze_przed', 'wiersze_po', 'bajty_przed', 'bajty_po'}}``.
+    """
+    wynik = {}
+    with _blokada():
+        for typ in typy or TYPY:
+            klucz = TYPY[typ][1]
+            liczby = dict.fromkeys(('miesiace', 'wiersze_przed', 'wiersze_po', 'bajty_przed', 'bajty_po'), 0)
+            for miesiac, sciezka_indeksu, indeks in indeksy(typ):
+                stary = sciezka_indeksu.with_name(indeks['plik'])
+                pliki = _pliki_danych(sciezka_indeksu.parent, miesiac)
+                if indeks.get('skompaktowany') and pliki == [stary] and stary.stat().st_size == _koniec(indeks):
+                    continue
+                wiersze = {}
+                with open(stary, 'rb') as plik:
+                    for blok in indeks['bloki']:
+                        for linia in _linie_bloku(plik, blok):
+                            dane = json.loads(linia)
+                            wiersze[dane['history_id']] = dane
+                numer = int(indeks['plik'].split('.')[1]) + 1
+                nowy_indeks = {'wersja': WERSJA_INDEKSU, 'plik': _plik_danych(miesiac, numer), 'bloki': [],
+                               'skompaktowany': True}
+                tresc = bytearray()
+                for dane, opis in _bloki(sorted(wiersze.values(), key=_klucz_sortowania(klucz)), klucz):
+                    nowy_indeks['bloki'].append(dict(opis, offset=len(tresc), dlugosc=len(dane)))
+                    tresc += dane
+                _zapisz_plik(sciezka_indeksu.with_name(nowy_indeks['plik']), bytes(tresc))
+                _zapisz_indeks(sciezka_indeksu, nowy_indeks)
+                for zbedny in pliki:
+                    if zbedny.name != nowy_indeks['plik']:
+                        liczby['bajty_przed'] += zbedny.stat().st_size
+                        zbedny.unlink()
+                liczby['miesiace'] += 1
+                liczby['wiersze_przed'] += sum(blok['wiersze'] for blok in indeks['bloki'])
+                liczby['wiersze_po'] += len(wiersze)
+                liczby['bajty_po'] += len(tresc)
+            wynik[typ] = liczby
+    return wynik
+
+
+def weryfikuj(typy=None, baza=False):
+    """Sprawdza pliki archiwum z indeksami; zwraca (błędy, ostrzeżenia, liczba wierszy).
+
+    Błędy: brak pliku, niezgodna suma SHA-256, uszkodzony gzip/JSON, liczba
+    wierszy, zakres dat lub kluczy inny niż w indeksie, wiersz z innego
+    miesiąca. Ostrzeżenia: nieindeksowany ogon pliku, pliki bez indeksu,
+    duplikaty ``history_id`` (do usunięcia kompaktowaniem), a przy ``baza``
+    także wiersze obecne jeszcze w tabeli historycznej.
+    """
+    bledy, ostrzezenia = [], []
+    razem = 0
+    for typ in typy or TYPY:
+        model, klucz = TYPY[typ]
+        miesiace = indeksy(typ)
+        zindeksowane = {miesiac for miesiac, _, _ in miesiace}
+        if _katalog_typu(typ).is_dir():
+            for plik in sorted(_katalog_typu(typ).glob('*.jsonl.gz')):
+                if plik.name.split('.')[0] not in zindeksowane:
+                    ostrzezenia.append(f'{typ}/{plik.name}: no index for this month')
+        for miesiac, sciezka_indeksu, indeks in miesiace:
+            sciezka = sciezka_indeksu.with_name(indeks['plik'])
+            opis = f'{typ}/{indeks["plik"]}'
+            if not sciezka.exists():
+                bledy.append(f'{opis}: data file is missing')
+                continue
+            history_ids = set()
+            with open(sciezka, 'rb') as plik:
+                for nr, blok in enumerate(indeks['bloki']):
+                    miejsce = f'{opis} block {nr}'
+                    plik.seek(blok['offset'])
+                    dane = plik.read(blok['dlugosc'])
+                    if hashlib.sha256(dane).hexdigest() != blok['sha256']:
+                        bledy.append(f'{miejsce}: SHA-256 mismatch')
+                        continue
+                    try:
+                        wiersze = [json.loads(linia) for linia in gzip.decompress(dane).decode('utf-8').splitlines()]
+                    except (OSError, EOFError, UnicodeDecodeError, ValueError) as e:
+                        bledy.append(f'{miejsce}: unreadable ({e})')
+                        continue
+                    if len(wiersze) != blok['wiersze']:
+                        bledy.append(f'{miejsce}: {len(wiersze)} rows, index says {blok["wiersze"]}')
+                    daty = [w['history_date'] for w in wiersze]
+                    if wiersze and (min(daty) != blok['od'] or max(daty) != blok['do']):
+                        bledy.append(f'{miejsce}: date range differs from the index')
+                    if any(_miesiac(datetime.fromisoformat(d)) != miesiac for d in daty):
+                        bledy.append(f'{miejsce}: rows from another month')
+                    if any(not _zawiera(blok['klucze'], w[klucz]) for w in wiersze):
+                        bledy.append(f'{miejsce}: keys outside the indexed ranges')
+                    for w in wiersze:
+                        if w['history_id'] in history_ids:
+                            ostrzezenia.append(f'{miejsce}: duplicate history_id {w["history_id"]}')
+                        history_ids.add(w['history_id'])
+                    razem += len(wiersze)
+            if sciezka.stat().st_size > _koniec(indeks):
+                ostrzezenia.append(f'{opis}: {sciezka.stat().st_size - _koniec(indeks)} unindexed trailing bytes')
+            for zbedny in _pliki_danych(sciezka_indeksu.parent, miesiac):
+                if zbedny.name != indeks['plik']:
+                    ostrzezenia.append(f'{typ}/{zbedny.name}: not referenced by the index')
+            if baza and history_ids:
+                ids = sorted(history_ids)
+                w_bazie = sum(model.history.filter(history_id__in=ids[i:i + PORCJA_USUWANIA]).count()
+                              for i in range(0, len(ids), PORCJA_USUWANIA))
+                if w_bazie:
+                    ostrzezenia.append(f'{opis}: {w_bazie} rows are still in the history table')
+    return bledy, ostrzezenia, razem
@@ -0,0 +1,47 @@
+"""Sprawdzenia konfiguracji (``manage.py check``) dla pamięci panelu raportów."""
+from django.conf import settings
+from django.core import checks
+
+from .pamiec_raportow import alias_fragmentow, alias_wersji
+
+# Backendy Django, które po przekroczeniu MAX_ENTRIES usuwają dowolne wpisy
+BACKENDY_Z_LIMITEM = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+DOMYSLNY_LIMIT_WPISOW = 300  # domyślne MAX_ENTRIES w Django
+# Strona raportów zapisuje 51 fragmentów (50 wierszy i tabelę) - limit na około 20 stron
+MIN_WPISOW_FRAGMENTOW = 1000
+
+
+def _limit_wpisow(alias):
+    """MAX_ENTRIES aliasu albo None, gdy backend nie usuwa wpisów po przekroczeniu limitu."""
+    konfiguracja = settings.CACHES.get(alias, {})
+    if konfiguracja.get('BACKEND') not in BACKENDY_Z_LIMITEM:
+        return None
+    return int(konfiguracja.get('OPTIONS', {}).get('MAX_ENTRIES', DOMYSLNY_LIMIT_WPISOW))
+
+
+@checks.register(checks.Tags.caches)
+def sprawdz_pamiec_raportow(app_configs, **kwargs):
+    ostrzezenia = []
+    fragmenty, wersje = alias_fragmentow(), alias_wersji()
+    if fragmenty not in settings.CACHES or wersje not in settings.CACHES:
+        return ostrzezenia  # brakujący alias zgłasza samo Django
+    limit = _limit_wpisow(fragmenty)
+    if limit is not None and limit < MIN_WPISOW_FRAGMENTOW:
+        ostrzezenia.append(checks.Warning(
+            f'The report cache "{fragmenty}" keeps at most {limit} entries; one reports page stores 51.',
+            hint=f'Set OPTIONS["MAX_ENTRIES"] of this cache to at least {MIN_WPISOW_FRAGMENTOW}.',
+            id='neonatology.W001',
+        ))
+    if wersje == fragmenty and limit is not None:
+        ostrzezenia.append(checks.Warning(
+            f'The report cache versions share the culled cache "{fragmenty}" with the fragments; '
+            'culling evicts version keys and makes every stored fragment unreachable.',
+            hint='Set RAPORTY_CACHE_WERSJE to a separate cache alias whose MAX_ENTRIES exceeds the number '
+                 'of babies.',
+            id='neonatology.W002',
+        ))
+    return ostrzezenia
@@ -0,0 +1,296 @@
+"""Równoległe parsowanie dużych plików CSV fragmentami bajtowymi.
+
+Plik jest dzielony na zakresy bajtów wyrównane do końca linii; każdy
+fragment jest dekodowany, parsowany i konwertowany w osobnym procesie.
+Wyniki wracają w kolejności pliku do jednego odbiorcy (zapis do bazy),
+a liczba fragmentów w toku jest ograniczona, więc zużycie pamięci nie
+zależy od rozmiaru pliku.
+
+Założenie: pola CSV nie zawierają znaków nowej linii (tak jak eksport
+szpitalny), dzięki czemu granica linii jest granicą rekordu.
+"""
+import csv
+import hashlib
+import heapq
+import io
+import os
+import pickle
+import tempfile
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+DOMYSLNY_ROZMIAR_FRAGMENTU = 8 * 1024 * 1024  # 8 MB
+# Ile przykładowych błędów zachować do raportu
+LIMIT_PRZYKLADOW_BLEDOW = 20
+# Sortowanie zewnętrzne: rekordów w pamięci i rekordów w jednym bloku pickle na dysku
+LIMIT_REKORDOW_W_PAMIECI = 200_000
+ROZMIAR_BLOKU_ZRZUTU = 1000
+
+Fragment = namedtuple('Fragment', ['start', 'koniec'])
+WynikFragmentu = namedtuple('WynikFragmentu', ['start', 'koniec', 'rekordy', 'wiersze', 'bledy'])
+
+
+def naglowek_csv(sciezka):
+    """Zwraca (nazwy kolumn, offset pierwszego wiersza danych)."""
+    with open(sciezka, 'rb') as plik:
+        linia = plik.readline()
+        return next(csv.reader([linia.decode('utf-8-sig')])), plik.tell()
+
+
+def _wartosc_kolumny(linia, indeks):
+    return next(csv.reader([linia.decode('utf-8')]))[indeks]
+
+
+def podziel_na_fragmenty(sciezka, rozmiar_fragmentu=DOMYSLNY_ROZMIAR_FRAGMENTU, start=None,
+                         kolumna_grupy=None):
+    """Generuje zakresy bajtów (`Fragment`) od `start` do końca pliku.
+
+    Jeśli podano `kolumna_grupy`, granica fragmentu jest przesuwana tak, aby
+    kolejne wiersze o tej samej wartości kolumny (np. wyniki APGAR jednego
+    dziecka) zawsze trafiały do jednego fragmentu.
+    """
+    pola, poczatek_danych = naglowek_csv(sciezka)
+    if start is None:
+        start = poczatek_danych
+    indeks_grupy = pola.index(kolumna_grupy) if kolumna_grupy else None
+    with open(sciezka, 'rb') as plik:
+        rozmiar = os.fstat(plik.fileno()).st_size
+        pozycja = start
+        while pozycja < rozmiar:
+            plik.seek(min(pozycja + rozmiar_fragmentu, rozmiar))
+            if plik.tell() < rozmiar:
+                plik.readline()  # dokończ bieżącą linię
+            koniec = plik.tell()
+            if indeks_grupy is not None and koniec < rozmiar:
+                # Dołącz całą grupę zaczynającą się na granicy fragmentu
+                grupa = None
+                while koniec < rozmiar:
+                    linia = plik.readline()
+                    if linia.strip():
+                        wartosc = _wartosc_kolumny(linia, indeks_grupy)
+                        if grupa is None:
+                            grupa = wartosc
+                        elif wartosc != grupa:
+                            break
+                    koniec = plik.tell()
+                plik.seek(koniec)
+            yield Fragment(pozycja, koniec)
+            pozycja = koniec
+
+
+def poczatek_grupy(sciezka, offset, kolumna_grupy):
+    """Offset pierwszego wiersza grupy, do której należy ostatni wiersz przed `offset`.
+
+    Pozwala wznowić czytanie od początku grupy, gdy po `offset` dopisano
+    kolejne wiersze tej samej grupy (np. wynik APGAR z 10. minuty).
+    """
+    pola, poczatek_danych = naglowek_csv(sciezka)
+    indeks_grupy = pola.index(kolumna_grupy)
+    okno = 64 * 1024
+    with open(sciezka, 'rb') as plik:
+        while True:
+            od = max(poczatek_danych, offset - okno)
+            plik.seek(od)
+            linie = plik.read(offset - od).splitlines(keepends=True)
+            if od > poczatek_danych:
+                linie = linie[1:]  # pierwsza linia okna może być niepełna
+            pozycja = offset
+            grupa = None
+            for linia in reversed(linie):
+                if linia.strip():
+                    wartosc = _wartosc_kolumny(linia, indeks_grupy)
+                    if grupa is None:
+                        grupa = wartosc
+                    elif wartosc != grupa:
+                        return pozycja
+                pozycja -= len(linia)
+            if od == poczatek_danych:
+                return poczatek_danych
+            okno *= 2
+
+
+def _inicjuj_proces(modul_ustawien):
+    # Przy starcie "spawn" (domyślnym na Windows i macOS) proces roboczy zaczyna od czystego
+    # interpretera, a konwertery `konwertuj_*` importują modele - Django musi być skonfigurowane
+    if modul_ustawien:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', modul_ustawien)
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def odcisk_wiersza(row, pola):
+    """Skrót treści wiersza CSV - pozwala pominąć niezmienione wiersze."""
+    tresc = '\x1f'.join(row.get(pole) or '' for pole in pola)
+    return hashlib.blake2b(tresc.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def parsuj_fragment(sciezka, fragment, pola, konwertuj, odciski=False):
+    """Parsuje i konwertuje jeden fragment (wykonywane w procesie roboczym).
+
+    Błędne wiersze nie przerywają importu - trafiają do `bledy` jako pary
+    (numer wiersza w fragmencie, opis). Przy ``odciski=True`` każdy rekord
+    dostaje klucz ``_odcisk`` z `odcisk_wiersza`.
+    """
+    with open(sciezka, 'rb') as plik:
+        plik.seek(fragment.start)
+        tekst = plik.read(fragment.koniec - fragment.start).decode('utf-8')
+
+    rekordy = []
+    bledy = []
+    wiersze = 0
+    for nr, row in enumerate(csv.DictReader(io.StringIO(tekst), fieldnames=pola)):
+        wiersze += 1
+        try:
+            rekord = konwertuj(row)
+            if odciski:
+                rekord['_odcisk'] = odcisk_wiersza(row, pola)
+            rekordy.append(rekord)
+        except (ValueError, KeyError, TypeError) as e:
+            bledy.append((nr, f'{type(e).__name__}: {e}'))
+    return WynikFragmentu(fragment.start, fragment.koniec, rekordy, wiersze, bledy)
+
+
+class CzytnikCSV:
+    """Strumień skonwertowanych rekordów z pliku CSV.
+
+    Przy ``procesy > 1`` fragmenty są parsowane w puli procesów, a najwyżej
+    ``2 * procesy`` fragmentów jest jednocześnie w toku. Iteracja zwraca
+    rekordy w kolejności pliku; `start` pozwala wznowić czytanie od offsetu.
+    """
+
+    def __init__(self, sciezka, konwertuj, procesy=1,
+                 rozmiar_fragmentu=DOMYSLNY_ROZMIAR_FRAGMENTU, start=None,
+                 kolumna_grupy=None, odciski=False):
+        self.sciezka = sciezka
+        self.konwertuj = konwertuj
+        self.procesy = procesy
+        self.rozmiar_fragmentu = rozmiar_fragmentu
+        self.start = start
+        self.kolumna_grupy = kolumna_grupy
+        self.odciski = odciski
+        self.wiersze = 0
+        self.bledne = 0
+        self.przyklady_bledow = []
+
+    def _wyniki(self):
+        pola = naglowek_csv(self.sciezka)[0]
+        fragmenty = podziel_na_fragmenty(self.sciezka, self.rozmiar_fragmentu, self.start,
+                                         self.kolumna_grupy)
+        if self.procesy <= 1:
+            for fragment in fragmenty:
+                yield parsuj_fragment(self.sciezka, fragment, pola, self.konwertuj, self.odciski)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.procesy, initializer=_inicjuj_proces,
+                                 initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),)) as pula:
+            w_toku = deque()
+            for fragment in fragmenty:
+                w_toku.append(pula.submit(parsuj_fragment, self.sciezka, fragment, pola,
+                                          self.konwertuj, self.odciski))
+                if len(w_toku) >= 2 * self.procesy:
+                    yield w_toku.popleft().result()
+            while w_toku:
+                yield w_toku.popleft().result()
+
+    def fragmenty(self):
+        """Generuje `WynikFragmentu` w kolejności pliku, aktualizując liczniki."""
+        for wynik in self._wyniki():
+            for nr, opis in wynik.bledy:
+                if len(self.przyklady_bledow) < LIMIT_PRZYKLADOW_BLEDOW:
+                    # +2: numeracja od 1 i wiersz nagłówka
+                    self.przyklady_bledow.append((self.wiersze + nr + 2, opis))
+            self.wiersze += wynik.wiersze
+            self.bledne += len(wynik.bledy)
+            yield wynik
+
+    def __iter__(self):
+        for wynik in self.fragmenty():
+            yield from wynik.rekordy
+
+
+def posortowany_po(sciezka, kolumna):
+    """Czy wiersze pliku są posortowane po `kolumna` (tekstowo albo liczbowo).
+
+    Wtedy wiersze o tej samej wartości leżą obok siebie. Sprawdzane jednym
+    przebiegiem bez pamiętania wartości - czytana jest tylko ta kolumna.
+    """
+    pola, poczatek_danych = naglowek_csv(sciezka)
+    indeks = pola.index(kolumna)
+    tekstowo = liczbowo = True
+    poprzednia = None
+    with open(sciezka, 'rb') as plik:
+        plik.seek(poczatek_danych)
+        for row in csv.reader(io.TextIOWrapper(plik, encoding='utf-8', newline='')):
+            if not row:
+                continue
+            wartosc = row[indeks]
+            if poprzednia is not None and wartosc != poprzednia:
+                tekstowo = tekstowo and wartosc > poprzednia
+                liczbowo = liczbowo and wartosc.isdigit() and poprzednia.isdigit() and int(wartosc) > int(poprzednia)
+                if not (tekstowo or liczbowo):
+                    return False
+            poprzednia = wartosc
+    return True
+
+
+def _zrzuc_porcje(rekordy):
+    plik = tempfile.TemporaryFile()
+    for i in range(0, len(rekordy), ROZMIAR_BLOKU_ZRZUTU):
+        pickle.dump(rekordy[i:i + ROZMIAR_BLOKU_ZRZUTU], plik, pickle.HIGHEST_PROTOCOL)
+    plik.seek(0)
+    return plik
+
+
+def _czytaj_porcje(plik):
+    while True:
+        try:
+            yield from pickle.load(plik)
+        except EOFError:
+            return
+
+
+def sortuj_zewnetrznie(rekordy, klucz, limit=LIMIT_REKORDOW_W_PAMIECI):
+    """Rekordy posortowane po `klucz` przy ograniczonej pamięci.
+
+    Co `limit` rekordów porcja jest sortowana i zrzucana do pliku
+    tymczasowego; na końcu posortowane porcje są scalane (`heapq.merge`).
+    Strumień mieszczący się w jednej porcji nie dotyka dysku.
+    """
+    porcja = []
+    pliki = []
+    try:
+        for rekord in rekordy:
+            porcja.append(rekord)
+            if len(porcja) >= limit:
+                porcja.sort(key=klucz)
+                pliki.append(_zrzuc_porcje(porcja))
+                porcja = []
+        porcja.sort(key=klucz)
+        yield from heapq.merge(*(_czytaj_porcje(plik) for plik in pliki), porcja, key=klucz)
+    finally:
+        for plik in pliki:
+            plik.close()
+
+
+def grupuj_apgar(rekordy, posortowane=True):
+    """Grupuje rekordy APGAR po dziecku: pary (id_noworodka, {minuta: wynik}).
+
+    W pamięci jest tylko bieżąca grupa, więc wiersze jednego dziecka muszą
+    leżeć obok siebie. Dla pliku nieposortowanego (``posortowane=False``,
+    zob. `posortowany_po`) rekordy przechodzą najpierw przez
+    `sortuj_zewnetrznie`.
+    """
+    if not posortowane:
+        rekordy = sortuj_zewnetrznie(rekordy, itemgetter('id_noworodka'))
+    id_noworodka, wyniki = None, None
+    for rekord in rekordy:
+        if wyniki is None or rekord['id_noworodka'] != id_noworodka:
+            if wyniki is not None:
+                yield id_noworodka, wyniki
+            id_noworodka, wyniki = rekord['id_noworodka'], {}
+        wyniki[rekord['minuta']] = rekord['wynik']
+    if wyniki is not None:
+        yield id_noworodka, wyniki
@@ -0,0 +1,412 @@
+"""Generator syntetycznych danych oddziału do testów wydajności.
+
+Dane są powtarzalne (ziarno NumPy + rozmiar porcji) i mają wiarygodne
+rozkłady: grupy krwi według częstości w Polsce, ok. 7% wcześniaków z
+mniejszą masą i niższym APGAR, spadek masy w pierwszych dniach życia,
+rodzeństwa, kilka pomiarów na dziecko wykonywanych przez różnych lekarzy.
+
+`GeneratorDanych.porcje()` zwraca kolejne porcje rekordów jako słowniki;
+`zapisz_do_bazy` zapisuje je porcjami przez `bulk_create` razem z
+historią (z datą i lekarzem każdego pomiaru oraz częścią poprawek "~"),
+a `zapisz_csv` - w formacie plików importowanych przez `import_all_csv`
+i `import_csv`.
+"""
+import csv
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from .models import Matka, Dziecko, ParametryZewnetrzne, APGARScore
+from .statystyki import przelicz_statystyki
+from .triage import odswiez_statusy
+from .wyszukiwanie import odswiez_hasla
+
+DOMYSLNY_ROZMIAR_PORCJI = 10_000
+DOMYSLNA_LICZBA_POMIAROW = 3
+DOMYSLNA_LICZBA_LEKARZY = 20
+PREFIKS_LEKARZA = 'lekarz_syntetyczny_'
+# Jaka część pomiarów dostaje później poprawkę (rekord historii "~")
+UDZIAL_POPRAWEK = 0.05
+
+IMIONA_MATEK = (
+    'Agnieszka', 'Aleksandra', 'Anna', 'Barbara', 'Beata', 'Dorota', 'Elżbieta', 'Ewa', 'Ewelina',
+    'Iwona', 'Joanna', 'Justyna', 'Karolina', 'Katarzyna', 'Magdalena', 'Małgorzata', 'Maria',
+    'Marta', 'Monika', 'Natalia', 'Patrycja', 'Paulina', 'Sylwia', 'Weronika', 'Zofia',
+)
+NAZWISKA_MATEK = (
+    'Nowak', 'Kowalska', 'Wiśniewska', 'Wójcik', 'Kowalczyk', 'Kamińska', 'Lewandowska', 'Zielińska',
+    'Szymańska', 'Woźniak', 'Dąbrowska', 'Kozłowska', 'Jankowska', 'Mazur', 'Kwiatkowska',
+    'Wojciechowska', 'Krawczyk', 'Kaczmarek', 'Piotrowska', 'Grabowska', 'Zając', 'Pawłowska',
+    'Michalska', 'Król', 'Wieczorek', 'Jabłońska', 'Wróbel', 'Nowakowska', 'Majewska', 'Olszewska',
+    'Stępień', 'Malinowska', 'Jaworska', 'Adamczyk', 'Dudek', 'Nowicka', 'Pawlak', 'Górska',
+    'Witkowska', 'Walczak',
+)
+IMIONA_CHLOPCOW = (
+    'Adam', 'Aleksander', 'Antoni', 'Franciszek', 'Filip', 'Igor', 'Jakub', 'Jan', 'Kacper',
+    'Leon', 'Michał', 'Mikołaj', 'Nikodem', 'Piotr', 'Stanisław', 'Szymon', 'Tymon', 'Wojciech',
+)
+IMIONA_DZIEWCZAT = (
+    'Alicja', 'Amelia', 'Antonina', 'Hanna', 'Helena', 'Julia', 'Laura', 'Lena', 'Maja', 'Maria',
+    'Nadia', 'Oliwia', 'Pola', 'Wiktoria', 'Zofia', 'Zuzanna', 'Emilia', 'Liliana',
+)
+GRUPY_KRWI = ('A Rh+', '0 Rh+', 'B Rh+', 'AB Rh+', 'A Rh-', '0 Rh-', 'B Rh-', 'AB Rh-')
+CZESTOSC_GRUP_KRWI = (0.32, 0.31, 0.15, 0.07, 0.06, 0.06, 0.02, 0.01)
+# Liczba dzieci matki: 1, 2 lub 3
+CZESTOSC_RODZENSTWA = (0.90, 0.08, 0.02)
+WAGI_PESEL = (1, 3, 7, 9, 1, 3, 7, 9, 1, 3)
+
+
+def _wagi_zipfa(n):
+    wagi = 1.0 / np.arange(1, n + 1)
+    return wagi / wagi.sum()
+
+
+def _nazwisko_dziecka(nazwisko, plec):
+    if plec == 'M' and nazwisko.endswith(('ska', 'cka', 'dzka')):
+        return nazwisko[:-1] + 'i'
+    return nazwisko
+
+
+def _data_czas(dzien, minuta):
+    wynik = datetime.combine(dzien, time()) + timedelta(minutes=minuta)
+    return timezone.make_aware(wynik) if settings.USE_TZ else wynik
+
+
+def pesel(data_urodzenia, numer):
+    """PESEL kobiety urodzonej `data_urodzenia`; `numer` (0-4999) rozróżnia osoby z tego dnia."""
+    miesiac = data_urodzenia.month + (20 if data_urodzenia.year >= 2000 else 0)
+    cyfry = f'{data_urodzenia.year % 100:02d}{miesiac:02d}{data_urodzenia.day:02d}{numer // 5:03d}{numer % 5 * 2}'
+    kontrolna = (10 - sum(int(c) * w for c, w in zip(cyfry, WAGI_PESEL)) % 10) % 10
+    return cyfry + str(kontrolna)
+
+
+class GeneratorDanych:
+    """Generuje `liczba_dzieci` dzieci z matkami, pomiarami i APGAR porcjami.
+
+    Dzieci rodzą się w ciągu `lata` lat kończących się `data_koncowa`.
+    Identyfikatory w rekordach (`id`, `id_matki`, `id_noworodka`) są
+    kolejnymi liczbami od 1 - jak w plikach eksportu CSV.
+    """
+
+    def __init__(self, liczba_dzieci, pomiary_na_dziecko=DOMYSLNA_LICZBA_POMIAROW, seed=0,
+                 rozmiar_porcji=DOMYSLNY_ROZMIAR_PORCJI, data_koncowa=date(2024, 12, 31), lata=3,
+                 liczba_lekarzy=DOMYSLNA_LICZBA_LEKARZY):
+        self.liczba_dzieci = liczba_dzieci
+        self.pomiary_na_dziecko = pomiary_na_dziecko
+        self.rng = np.random.default_rng(seed)
+        self.rozmiar_porcji = rozmiar_porcji
+        self.data_koncowa = data_koncowa
+        self.dni = 365 * lata
+        self.liczba_lekarzy = liczba_lekarzy
+        self.wagi_nazwisk = _wagi_zipfa(len(NAZWISKA_MATEK))
+        self.wagi_imion = _wagi_zipfa(len(IMIONA_MATEK))
+        # Kolejny wolny numer PESEL dla daty urodzenia matki
+        self.numery_pesel = {}
+        self.ostatnia_matka = 0
+        self.ostatnie_dziecko = 0
+        self.ostatni_pomiar = 0
+        self.ostatni_apgar = 0
+
+    def nowy_pesel(self, data_urodzenia):
+        numer = self.numery_pesel.get(data_urodzenia, 0)
+        self.numery_pesel[data_urodzenia] = numer + 1
+        return pesel(data_urodzenia, numer % 5000)
+
+    def porcje(self):
+        pozostalo = self.liczba_dzieci
+        while pozostalo > 0:
+            porcja = self._porcja(min(pozostalo, self.rozmiar_porcji))
+            pozostalo -= len(porcja['dzieci'])
+            yield porcja
+
+    def _porcja(self, n):
+        rng = self.rng
+        # Każda matka ma co najmniej jedno dziecko - n matek zawsze wystarczy
+        dzieci_matek = rng.choice(np.arange(1, 4), size=n, p=CZESTOSC_RODZENSTWA)
+        liczba_matek = int(np.searchsorted(np.cumsum(dzieci_matek), n)) + 1
+        dzieci_matek = dzieci_matek[:liczba_matek]
+        dzieci_matek[-1] -= int(dzieci_matek.sum()) - n
+
+        # --- Matki ---
+        wiek_matek = np.clip(rng.normal(30, 5, liczba_matek), 17, 47)
+        imiona = rng.choice(len(IMIONA_MATEK), size=liczba_matek, p=self.wagi_imion)
+        nazwiska = rng.choice(len(NAZWISKA_MATEK), size=liczba_matek, p=self.wagi_nazwisk)
+        grupy = rng.choice(len(GRUPY_KRWI), size=liczba_matek, p=CZESTOSC_GRUP_KRWI)
+        # Poród najmłodszego dziecka: liczba dni przed datą końcową
+        dni_porodu = rng.integers(0, self.dni, size=liczba_matek)
+        matki = []
+        for i in range(liczba_matek):
+            urodzenie_matki = self.data_koncowa - timedelta(days=int(dni_porodu[i] + wiek_matek[i] * 365.25))
+            self.ostatnia_matka += 1
+            matki.append({
+                'id': self.ostatnia_matka,
+                'data_urodzenia': urodzenie_matki,
+                'pesel': self.nowy_pesel(urodzenie_matki),
+                'imie': IMIONA_MATEK[imiona[i]],
+                'nazwisko': NAZWISKA_MATEK[nazwiska[i]],
+                'grupa_krwi': GRUPY_KRWI[grupy[i]],
+                'konflikt_serologiczny': GRUPY_KRWI[grupy[i]].endswith('-') and rng.random() < 0.1,
+            })
+
+        # --- Dzieci: starsze rodzeństwo co 1-4 lata wcześniej (także przed zakresem dat) ---
+        indeks_matki = np.repeat(np.arange(liczba_matek), dzieci_matek)
+        kolejnosc = np.concatenate([np.arange(k) for k in dzieci_matek])
+        dni_przed = dni_porodu[indeks_matki] + kolejnosc * rng.integers(365, 4 * 365, size=n)
+        plec_m = rng.random(n) < 0.51
+        wczesniak = rng.random(n) < 0.07
+        imie_chlopca = rng.integers(0, len(IMIONA_CHLOPCOW), size=n)
+        imie_dziewczynki = rng.integers(0, len(IMIONA_DZIEWCZAT), size=n)
+        grupa_dziecka = rng.choice(len(GRUPY_KRWI), size=n, p=CZESTOSC_GRUP_KRWI)
+        minuta_porodu = rng.integers(0, 24 * 60, size=n)
+
+        waga = np.where(wczesniak, rng.normal(2.1, 0.55, n), rng.normal(3.4, 0.45, n)).clip(0.6, 5.5)
+        wzrost = np.where(wczesniak, rng.normal(45, 3.5, n), rng.normal(54, 2.5, n)).clip(30, 62)
+        glowa = np.where(wczesniak, rng.normal(31, 2.0, n), rng.normal(34.5, 1.3, n)).clip(22, 40)
+        apgar_1 = np.where(wczesniak, rng.normal(6.5, 1.8, n), rng.normal(8.4, 1.1, n)).round().clip(0, 10)
+        apgar_5 = np.minimum(apgar_1 + rng.integers(0, 3, size=n), 10)
+        apgar_10 = np.minimum(apgar_5 + rng.integers(0, 2, size=n), 10)
+        liczba_pomiarow = np.minimum(1 + rng.poisson(max(self.pomiary_na_dziecko - 1, 0), size=n), 10)
+        lekarz_apgar = rng.integers(0, self.liczba_lekarzy, size=n)
+
+        dzieci, pomiary, apgary = [], [], []
+        for i in range(n):
+            matka = matki[indeks_matki[i]]
+            plec = 'M' if plec_m[i] else 'K'
+            data_urodzenia = self.data_koncowa - timedelta(days=int(dni_przed[i]))
+            urodzenie = _data_czas(data_urodzenia, int(minuta_porodu[i]))
+            self.ostatnie_dziecko += 1
+            dzieci.append({
+                'id': self.ostatnie_dziecko,
+                'id_matki': matka['id'],
+                'imie': (IMIONA_CHLOPCOW[imie_chlopca[i]] if plec == 'M' else IMIONA_DZIEWCZAT[imie_dziewczynki[i]]),
+                'nazwisko': _nazwisko_dziecka(matka['nazwisko'], plec),
+                'data_urodzenia': data_urodzenia,
+                'plec': plec,
+                'wczesniak': bool(wczesniak[i]),
+                'grupa_krwi': GRUPY_KRWI[grupa_dziecka[i]],
+                'created_at': urodzenie + timedelta(minutes=30),
+            })
+
+            k = int(liczba_pomiarow[i])
+            dni_pomiarow = np.arange(k)
+            # Fizjologiczny spadek masy do 4. doby (ok. 7%), potem przyrost ok. 1% na dobę
+            przebieg = np.where(dni_pomiarow <= 4, 1 - 0.0175 * dni_pomiarow, 0.93 + 0.01 * (dni_pomiarow - 4))
+            wagi = waga[i] * przebieg * rng.normal(1, 0.005, k)
+            natlenienie = (rng.normal(93, 3, k) if wczesniak[i] else rng.normal(97.5, 1.5, k)).round().clip(80, 100)
+            oddechy = rng.normal(50 if wczesniak[i] else 44, 8, k).round().clip(25, 90)
+            lekarze = rng.integers(0, self.liczba_lekarzy, size=k)
+            minuty = rng.integers(30, 12 * 60, size=k)
+            for d in range(k):
+                self.ostatni_pomiar += 1
+                pomiary.append({
+                    'id': self.ostatni_pomiar,
+                    'id_noworodka': self.ostatnie_dziecko,
+                    'data_pomiaru': urodzenie + timedelta(days=d, minutes=int(minuty[d])),
+                    'typ_pomiaru': 'URODZENIOWE' if d == 0 else 'KONTROLNE',
+                    'wzrost_cm': round(float(wzrost[i]) + 0.1 * d, 1),
+                    'waga_kg': round(float(wagi[d]), 3),
+                    'obwod_glowy_cm': round(float(glowa[i]) + 0.05 * d, 1),
+                    'czy_wczesniak': bool(wczesniak[i]),
+                    'oddechy_na_min': int(oddechy[d]),
+                    'natlenienie_spO2': int(natlenienie[d]),
+                    'lekarz': int(lekarze[d]),
+                    'poprawka': bool(rng.random() < UDZIAL_POPRAWEK),
+                })
+
+            self.ostatni_apgar += 1
+            apgary.append({
+                'id': self.ostatni_apgar,
+                'id_noworodka': self.ostatnie_dziecko,
+                'data_pomiaru': urodzenie + timedelta(minutes=10),
+                'apgar_1min': int(apgar_1[i]),
+                'apgar_5min': int(apgar_5[i]),
+                # Ocena w 10. minucie tylko przy niskim wyniku w 5. minucie
+                'apgar_10min': int(apgar_10[i]) if apgar_5[i] < 7 else None,
+                'lekarz': int(lekarz_apgar[i]),
+            })
+
+        return {'matki': matki, 'dzieci': dzieci, 'pomiary': pomiary, 'apgar': apgary}
+
+
+# --- Zapis do bazy ---
+
+def lekarze_syntetyczni(liczba=DOMYSLNA_LICZBA_LEKARZY):
+    """Konta lekarzy przypisywane pomiarom (tworzone przy pierwszym użyciu, bez hasła)."""
+    lekarze = []
+    for nr in range(1, liczba + 1):
+        lekarz, utworzony = User.objects.get_or_create(
+            username=f'{PREFIKS_LEKARZA}{nr:02d}', defaults={'first_name': 'Lekarz', 'last_name': f'{nr:02d}'})
+        if utworzony:
+            lekarz.set_unusable_password()
+            lekarz.save(update_fields=['password'])
+        lekarze.append(lekarz)
+    return lekarze
+
+
+@contextmanager
+def _bez_auto_now_add(*modele):
+    """Pozwala zapisać własne `data_pomiaru` (auto_now_add nadpisałoby je bieżącą datą)."""
+    pola = [model._meta.get_field('data_pomiaru') for model in modele]
+    for pole in pola:
+        pole.auto_now_add = False
+    try:
+        yield
+    finally:
+        for pole in pola:
+            pole.auto_now_add = True
+
+
+def _unikalne_pesele(generator, matki):
+    """Zmienia PESEL-e matek, które już są w bazie (np. przy drugim uruchomieniu)."""
+    while True:
+        zajete = set(Matka.objects.filter(pesel__in=[m['pesel'] for m in matki]).values_list('pesel', flat=True))
+        if not zajete:
+            return
+        for matka in matki:
+            if matka['pesel'] in zajete:
+                matka['pesel'] = generator.nowy_pesel(matka['data_urodzenia'])
+
+
+def _zapisz_porcje(generator, porcja, lekarze):
+    matki = porcja['matki']
+    _unikalne_pesele(generator, matki)
+    obiekty_matek = [
+        Matka(pesel=m['pesel'], imie=m['imie'], nazwisko=m['nazwisko'], grupa_krwi=m['grupa_krwi'],
+              konflikt_serologiczny=m['konflikt_serologiczny'])
+        for m in matki
+    ]
+    bulk_create_with_history(obiekty_matek, Matka, batch_size=1000)
+    pk_matek = {m['id']: obiekt.pk for m, obiekt in zip(matki, obiekty_matek)}
+
+    obiekty_dzieci = []
+    for d in porcja['dzieci']:
+        dziecko = Dziecko(imie=d['imie'], data_urodzenia=d['data_urodzenia'], plec=d['plec'],
+                          matka_id=pk_matek[d['id_matki']], grupa_krwi=d['grupa_krwi'], created_at=d['created_at'])
+        dziecko._history_date = d['created_at']
+        obiekty_dzieci.append(dziecko)
+    bulk_create_with_history(obiekty_dzieci, Dziecko, batch_size=1000)
+    pk_dzieci = {d['id']: obiekt.pk for d, obiekt in zip(porcja['dzieci'], obiekty_dzieci)}
+
+    obiekty_pomiarow, poprawki = [], []
+    for p in porcja['pomiary']:
+        pomiar = ParametryZewnetrzne(
+            dziecko_id=pk_dzieci[p['id_noworodka']], lekarz=lekarze[p['lekarz']],
+            data_pomiaru=p['data_pomiaru'], wzrost_cm=p['wzrost_cm'], waga_kg=p['waga_kg'],
+            czy_wczesniak=p['czy_wczesniak'], obwod_glowy_cm=p['obwod_glowy_cm'],
+            oddechy_na_min=p['oddechy_na_min'], natlenienie_spO2=p['natlenienie_spO2'],
+        )
+        pomiar._history_date = p['data_pomiaru']
+        pomiar._history_user = pomiar.lekarz
+        obiekty_pomiarow.append(pomiar)
+        if p['poprawka']:
+            poprawki.append(pomiar)
+
+    obiekty_apgar = []
+    for a in porcja['apgar']:
+        apgar = APGARScore(
+            dziecko_id=pk_dzieci[a['id_noworodka']], lekarz=lekarze[a['lekarz']],
+            data_pomiaru=a['data_pomiaru'], apgar_1min=a['apgar_1min'], apgar_5min=a['apgar_5min'],
+            apgar_10min=a['apgar_10min'],
+        )
+        apgar._history_date = a['data_pomiaru']
+        apgar._history_user = apgar.lekarz
+        obiekty_apgar.append(apgar)
+
+    with _bez_auto_now_add(ParametryZewnetrzne, APGARScore):
+        bulk_create_with_history(obiekty_pomiarow, ParametryZewnetrzne, batch_size=1000)
+        bulk_create_with_history(obiekty_apgar, APGARScore, batch_size=1000)
+
+    # Poprawka wpisana godzinę po pomiarze - rekord historii "~"
+    for pomiar in poprawki:
+        pomiar.waga_kg = round(pomiar.waga_kg + 0.01, 3)
+        pomiar._history_date = pomiar.data_pomiaru + timedelta(hours=1)
+    bulk_update_with_history(poprawki, ParametryZewnetrzne, ['waga_kg'], batch_size=1000)
+
+    odswiez_statusy(pk_dzieci.values())
+    odswiez_hasla(pk_matek.values(), pk_dzieci.values())
+    return len(obiekty_matek), len(obiekty_dzieci), len(obiekty_pomiarow), len(poprawki)
+
+
+def zapisz_do_bazy(generator, postep=None):
+    """Zapisuje wszystkie porcje generatora, każdą w osobnej transakcji.
+
+    `postep` jest wołany po każdej porcji z krotką (matki, dzieci, pomiary,
+    poprawki) zapisaną dotąd. Zwraca tę samą krotkę dla całości.
+    """
+    lekarze = lekarze_syntetyczni(generator.liczba_lekarzy)
+    razem = (0, 0, 0, 0)
+    for porcja in generator.porcje():
+        with transaction.atomic():
+            zapisane = _zapisz_porcje(generator, porcja, lekarze)
+        razem = tuple(a + b for a, b in zip(razem, zapisane))
+        if postep:
+            postep(razem)
+    # Porcje obejmują cały zakres dat - jedno przeliczenie zestawień zamiast przeliczania każdej porcji
+    przelicz_statystyki()
+    return razem
+
+
+# --- Zapis do plików CSV ---
+
+PLIKI_CSV = {
+    'matki.csv': ['id_matki', 'pesel_matki', 'imie', 'nazwisko', 'grupa_krwi'],
+    'noworodki.csv': ['id_noworodka', 'id_matki', 'imie', 'nazwisko', 'data_urodzenia', 'plec', 'wczesniak',
+                      'grupa_krwi'],
+    'pomiary.csv': ['id_pomiaru', 'id_noworodka', 'data_pomiaru', 'typ_pomiaru', 'waga_g', 'wzrost_cm',
+                    'obwod_glowy_cm'],
+    'wyniki_apgar.csv': ['id_apgar', 'id_noworodka', 'minuta', 'wynik'],
+    # Format łączony dla `import_csv` - jeden wiersz na dziecko (pierwszy pomiar)
+    'laczony.csv': ['pesel_matki', 'imie', 'data_urodzenia', 'plec', 'wzrost', 'waga', 'wczesniak', 'glowa',
+                    'oddechy', 'spo2', 'apgar1', 'apgar5', 'apgar10'],
+}
+
+
+def zapisz_csv(generator, katalog):
+    """Zapisuje dane generatora jako pliki z `PLIKI_CSV` w katalogu `katalog`."""
+    os.makedirs(katalog, exist_ok=True)
+    pliki = {nazwa: open(os.path.join(katalog, nazwa), 'w', encoding='utf-8', newline='') for nazwa in PLIKI_CSV}
+    try:
+        pisarze = {nazwa: csv.writer(plik) for nazwa, plik in pliki.items()}
+        for nazwa, kolumny in PLIKI_CSV.items():
+            pisarze[nazwa].writerow(kolumny)
+        id_apgar = 0
+        for porcja in generator.porcje():
+            pesele = {}
+            for m in porcja['matki']:
+                pesele[m['id']] = m['pesel']
+                pisarze['matki.csv'].writerow([m['id'], m['pesel'], m['imie'], m['nazwisko'], m['grupa_krwi']])
+            dzieci = {}
+            for d in porcja['dzieci']:
+                dzieci[d['id']] = d
+                pisarze['noworodki.csv'].writerow([
+                    d['id'], d['id_matki'], d['imie'], d['nazwisko'], d['data_urodzenia'].isoformat(), d['plec'],
+                    int(d['wczesniak']), d['grupa_krwi']])
+            pierwsze = {}
+            for p in porcja['pomiary']:
+                pierwsze.setdefault(p['id_noworodka'], p)
+                pisarze['pomiary.csv'].writerow([
+                    p['id'], p['id_noworodka'], p['data_pomiaru'].date().isoformat(), p['typ_pomiaru'],
+                    round(p['waga_kg'] * 1000), p['wzrost_cm'], p['obwod_glowy_cm']])
+            for a in porcja['apgar']:
+                for minuta in (1, 5, 10):
+                    wynik = a[f'apgar_{minuta}min']
+                    if wynik is not None:
+                        id_apgar += 1
+                        pisarze['wyniki_apgar.csv'].writerow([id_apgar, a['id_noworodka'], minuta, wynik])
+                d = dzieci[a['id_noworodka']]
+                p = pierwsze[a['id_noworodka']]
+                pisarze['laczony.csv'].writerow([
+                    pesele[d['id_matki']], d['imie'], d['data_urodzenia'].isoformat(), d['plec'],
+                    p['wzrost_cm'], p['waga_kg'], int(d['wczesniak']), p['obwod_glowy_cm'],
+                    p['oddechy_na_min'], p['natlenienie_spO2'], a['apgar_1min'], a['apgar_5min'],
+                    '' if a['apgar_10min'] is None else a['apgar_10min']])
+    finally:
+        for plik in pliki.values():
+            plik.close()
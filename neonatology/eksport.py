@@ -0,0 +1,193 @@
+"""Strumieniowy eksport raportu noworodków do CSV i XLSX.
+
+Dzieci są czytane kursorem (`QuerySet.iterator(chunk_size=...)`) razem z
+migawką statusu (ostatnie pomiary, werdykt), a każdy wiersz jest od razu
+zamieniany na bajty. Zużycie pamięci nie zależy więc od liczby wierszy -
+ani przy odpowiedzi HTTP (`StreamingHttpResponse`), ani przy zapisie do
+pliku. Opcjonalna kompresja gzip również działa przyrostowo.
+"""
+import csv
+import zipfile
+import zlib
+from datetime import date
+from xml.sax.saxutils import escape
+
+from .models import Dziecko, StatusDziecka
+
+DOMYSLNY_ROZMIAR_PORCJI = 2000
+# Co ile wierszy oddawać porcję bajtów do odpowiedzi
+WIERSZE_NA_PORCJE = 500
+FORMATY = ('csv', 'xlsx')
+
+KOLUMNY = [
+    'id', 'imie', 'data_urodzenia', 'plec', 'grupa_krwi', 'created_at',
+    'pesel_matki', 'nazwisko_matki', 'waga_kg', 'natlenienie_spO2', 'apgar_5min',
+    'liczba_pomiarow', 'liczba_apgar', 'status', 'werdykt',
+]
+
+
+def _data(wartosc):
+    try:
+        return date.fromisoformat(wartosc) if wartosc else None
+    except ValueError:
+        return None
+
+
+def filtruj_dzieci(dzieci, parametry):
+    """Filtry wspólne dla panelu raportów i eksportu.
+
+    `parametry` to słownik (np. ``request.GET``) z kluczami ``status``,
+    ``grupa_krwi``, ``data_od`` i ``data_do`` (zakres daty urodzenia, ISO).
+    Nieprawidłowe wartości są ignorowane.
+    """
+    status = parametry.get('status', '')
+    if status in dict(StatusDziecka.STATUS_CHOICES):
+        dzieci = dzieci.filter(status__status=status)
+    grupa_krwi = parametry.get('grupa_krwi', '').strip()
+    if grupa_krwi:
+        dzieci = dzieci.filter(grupa_krwi=grupa_krwi)
+    data_od = _data(parametry.get('data_od'))
+    if data_od:
+        dzieci = dzieci.filter(data_urodzenia__gte=data_od)
+    data_do = _data(parametry.get('data_do'))
+    if data_do:
+        dzieci = dzieci.filter(data_urodzenia__lte=data_do)
+    return dzieci
+
+
+def wiersze_eksportu(parametry, rozmiar_porcji=DOMYSLNY_ROZMIAR_PORCJI):
+    """Generuje wiersze (listy wartości w kolejności `KOLUMNY`) bez nagłówka."""
+    dzieci = filtruj_dzieci(Dziecko.objects.all(), parametry).order_by('-created_at', '-id').values_list(
+        'id', 'imie', 'data_urodzenia', 'plec', 'grupa_krwi', 'created_at',
+        'matka__pesel', 'matka__nazwisko', 'status__waga_kg', 'status__natlenienie_spO2',
+        'status__apgar_5min', 'status__liczba_pomiarow', 'status__liczba_apgar',
+        'status__status', 'status__werdykt',
+    )
+    for wiersz in dzieci.iterator(chunk_size=rozmiar_porcji):
+        yield ['' if wartosc is None else wartosc for wartosc in wiersz]
+
+
+class _Bufor:
+    """Obiekt plikopodobny, który zbiera zapisane bajty do odebrania."""
+
+    def __init__(self):
+        self.czesci = []
+        self.pozycja = 0
+
+    def write(self, dane):
+        if isinstance(dane, str):
+            dane = dane.encode('utf-8')
+        self.czesci.append(bytes(dane))
+        self.pozycja += len(dane)
+        return len(dane)
+
+    def tell(self):
+        return self.pozycja
+
+    def flush(self):
+        pass
+
+    def odbierz(self):
+        dane = b''.join(self.czesci)
+        self.czesci = []
+        return dane
+
+
+def strumien_csv(wiersze):
+    """Zamienia wiersze na porcje bajtów CSV (UTF-8 z BOM dla Excela)."""
+    bufor = _Bufor()
+    pisarz = csv.writer(bufor)
+    bufor.write('\ufeff')
+    pisarz.writerow(KOLUMNY)
+    yield bufor.odbierz()
+    for nr, wiersz in enumerate(wiersze, 1):
+        pisarz.writerow(wiersz)
+        if nr % WIERSZE_NA_PORCJE == 0:
+            yield bufor.odbierz()
+    yield bufor.odbierz()
+
+
+def _komorka(wartosc):
+    if isinstance(wartosc, bool):
+        return f'<c t="b"><v>{int(wartosc)}</v></c>'
+    if isinstance(wartosc, (int, float)):
+        return f'<c><v>{wartosc}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(wartosc))}</t></is></c>'
+
+
+_XLSX_STALE = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Raporty" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def strumien_xlsx(wiersze):
+    """Zamienia wiersze na porcje bajtów pliku XLSX.
+
+    Arkusz jest pisany wprost do archiwum ZIP otwartego na buforze bez
+    możliwości przewijania (ZIP z deskryptorami danych), z tekstem w
+    komórkach `inlineStr` - bez tabeli współdzielonych napisów w pamięci.
+    """
+    bufor = _Bufor()
+    with zipfile.ZipFile(bufor, 'w', compression=zipfile.ZIP_DEFLATED) as archiwum:
+        for nazwa, tresc in _XLSX_STALE.items():
+            archiwum.writestr(nazwa, tresc)
+        with archiwum.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as arkusz:
+            arkusz.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            arkusz.write(('<row>' + ''.join(_komorka(k) for k in KOLUMNY) + '</row>').encode('utf-8'))
+            for wiersz in wiersze:
+                arkusz.write(('<row>' + ''.join(_komorka(w) for w in wiersz) + '</row>').encode('utf-8'))
+                if len(bufor.czesci) >= 64:
+                    yield bufor.odbierz()
+            arkusz.write(b'</sheetData></worksheet>')
+        yield bufor.odbierz()
+    yield bufor.odbierz()
+
+
+def gzipuj(strumien):
+    """Kompresuje strumień bajtów do formatu gzip w locie."""
+    kompresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = nagłówek gzip
+    for porcja in strumien:
+        dane = kompresor.compress(porcja)
+        if dane:
+            yield dane
+    yield kompresor.flush()
+
+
+def strumien_eksportu(parametry, format='csv', gzip=False, rozmiar_porcji=DOMYSLNY_ROZMIAR_PORCJI):
+    """Zwraca generator bajtów eksportu w wybranym formacie."""
+    wiersze = wiersze_eksportu(parametry, rozmiar_porcji)
+    strumien = strumien_xlsx(wiersze) if format == 'xlsx' else strumien_csv(wiersze)
+    return gzipuj(strumien) if gzip else strumien
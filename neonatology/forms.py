@@ -1,5 +1,118 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka
+from .obchod import MAKS_WIERSZY
+
+
+_SKRYPT_WYBORU_MATKI = mark_safe("""<script>
+(function() {
+    document.querySelectorAll('.wybor-matki:not([data-gotowy])').forEach(function(pole) {
+        pole.dataset.gotowy = '1';
+        const id = pole.querySelector('input[type="hidden"]');
+        const tekst = pole.querySelector('input[type="text"]');
+        const lista = pole.querySelector('ul');
+        let zapytanie = '', kursor = null, licznik = 0, opoznienie = null;
+
+        function wybierz(wartosc, etykieta) {
+            id.value = wartosc;
+            tekst.value = etykieta;
+            lista.hidden = true;
+            id.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+
+        function pobierz(dopisz) {
+            const nr = ++licznik;
+            const adres = new URL(pole.dataset.url, window.location.href);
+            adres.searchParams.set('q', zapytanie);
+            if (dopisz && kursor) adres.searchParams.set('po', kursor);
+            fetch(adres, {headers: {'Accept': 'application/json'}})
+                .then(odpowiedz => odpowiedz.json())
+                .then(function(dane) {
+                    if (nr !== licznik) return;  // nieaktualna odpowiedź
+                    if (!dopisz) lista.replaceChildren();
+                    const wiecej = lista.querySelector('.wiecej');
+                    if (wiecej) wiecej.remove();
+                    dane.wyniki.forEach(function(wynik) {
+                        const li = document.createElement('li');
+                        li.textContent = wynik.etykieta;
+                        li.addEventListener('mousedown', function(e) {
+                            e.preventDefault();
+                            wybierz(wynik.id, wynik.etykieta);
+                        });
+                        lista.appendChild(li);
+                    });
+                    kursor = dane.nastepna;
+                    if (kursor) {
+                        const li = document.createElement('li');
+                        li.className = 'wiecej';
+                        li.textContent = 'Pokaż więcej…';
+                        li.addEventListener('mousedown', function(e) {
+                            e.preventDefault();
+                            pobierz(true);
+                        });
+                        lista.appendChild(li);
+                    }
+                    lista.hidden = !lista.children.length;
+                });
+        }
+
+        tekst.addEventListener('input', function() {
+            if (id.value) {
+                id.value = '';
+                id.dispatchEvent(new Event('change', {bubbles: true}));
+            }
+            zapytanie = tekst.value;
+            clearTimeout(opoznienie);
+            opoznienie = setTimeout(function() { pobierz(false); }, 200);
+        });
+        tekst.addEventListener('focus', function() {
+            if (!id.value) pobierz(false);
+        });
+        tekst.addEventListener('blur', function() { lista.hidden = true; });
+    });
+})();
+</script>""")
+
+
+class WyborMatki(forms.Widget):
+    """Pole wyboru matki z podpowiedziami pobieranymi z widoku `podpowiedzi_matek`.
+
+    W przeciwieństwie do `Select` renderuje tylko aktualnie wybraną matkę
+    (ukryte pole z id i pole tekstowe z etykietą), więc rozmiar strony nie
+    zależy od liczby matek w bazie.
+    """
+
+    def __init__(self, attrs=None, placeholder=''):
+        super().__init__(attrs)
+        self.placeholder = placeholder
+
+    def _etykieta(self, value):
+        if isinstance(value, Matka):
+            return str(value)
+        if value in (None, ''):
+            return ''
+        try:
+            matka = Matka.objects.filter(pk=value).first()
+        except (TypeError, ValueError, ValidationError):
+            return ''
+        return str(matka) if matka else ''
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        pk = value.pk if isinstance(value, Matka) else value
+        return format_html(
+            '<span class="wybor-matki" data-url="{}" style="position: relative; display: inline-block;">'
+            '<input type="hidden" name="{}" value="{}">'
+            '<input type="text" id="{}" value="{}" placeholder="{}" autocomplete="off" size="40">'
+            '<ul hidden style="position: absolute; z-index: 10; left: 0; right: 0; margin: 0; padding: 0; '
+            'list-style: none; background: #fff; border: 1px solid #ccc; max-height: 240px; overflow-y: auto; '
+            'cursor: pointer;"></ul></span>{}',
+            reverse('podpowiedzi_matek'), name, '' if pk is None else pk, attrs.get('id', ''),
+            self._etykieta(value), self.placeholder, _SKRYPT_WYBORU_MATKI,
+        )
 
 
 class MatkaForm(forms.ModelForm):
@@ -31,10 +144,12 @@ class DzieckoForm(forms.ModelForm):
             'grupa_krwi': 'Grupa krwi dziecka'
         }
     
+    # Walidacja pobiera tylko wysłaną matkę (queryset.get(pk=...)), a widżet
+    # nie iteruje po `choices` - lista matek nie jest ładowana
     matka = forms.ModelChoiceField(
         queryset=Matka.objects.all(),
         required=False,
-        empty_label="Wybierz istniejącą matkę lub dodaj nową poniżej",
+        widget=WyborMatki(placeholder="Wybierz istniejącą matkę lub dodaj nową poniżej"),
         label='Istniejąca matka'
     )
 
@@ -62,3 +177,50 @@ class APGARScoreForm(forms.ModelForm):
             'apgar_5min': 'Wynik po 5 minutach',
             'apgar_10min': 'Wynik po 10 minutach'
         }
+
+
+# Pola, których wpisanie oznacza, że wiersz obchodu ma zostać zapisany
+POLA_OBCHODU = ('waga_kg', 'natlenienie_spO2')
+
+
+class WierszObchoduForm(ParametryZewnetrzneForm):
+    """Jeden wiersz obchodu - nowy pomiar dziecka wskazanego ukrytym polem."""
+    dziecko = forms.IntegerField(widget=forms.HiddenInput)
+
+    def has_changed(self):
+        # Pola przepisane z ostatniego pomiaru nie liczą się - wiersz bez wagi i SpO2 jest pomijany
+        return any(self[pole].value() not in (None, '') for pole in POLA_OBCHODU)
+
+
+class BaseObchodFormSet(forms.BaseFormSet):
+    """Formularz obchodu; po walidacji `dzieci` to słownik pk -> dziecko wpisanych wierszy."""
+
+    def _construct_form(self, i, **kwargs):
+        # Każdy wiersz może zostać pusty (dziecko nie było badane)
+        return super()._construct_form(i, empty_permitted=True, **kwargs)
+
+    def wypelnione(self):
+        return [form for form in self.forms if form.has_changed()]
+
+    def clean(self):
+        self.dzieci = {}
+        if any(self.errors):
+            return
+        ids = [form.cleaned_data['dziecko'] for form in self.wypelnione()]
+        self.dzieci = Dziecko.objects.in_bulk(ids)
+        widziane = set()
+        for form in self.wypelnione():
+            pk = form.cleaned_data['dziecko']
+            if pk not in self.dzieci:
+                form.add_error(None, 'Dziecko nie istnieje.')
+            elif pk in widziane:
+                form.add_error(None, 'Dziecko występuje w obchodzie więcej niż raz.')
+            widziane.add(pk)
+        if any(self.errors):
+            raise ValidationError('Popraw zaznaczone wiersze.')
+
+
+ObchodFormSet = forms.formset_factory(
+    WierszObchoduForm, formset=BaseObchodFormSet, extra=0,
+    max_num=MAKS_WIERSZY, validate_max=True, absolute_max=MAKS_WIERSZY,
+)
@@ -0,0 +1,185 @@
+"""Oś czasu zmian dziecka (widok `historia_zmian`).
+
+Każda tabela historyczna jest czytana jednym zapytaniem, posortowana po
+(id, history_date), więc poprzednią wersję rekordu daje sąsiedni wiersz
+zamiast `prev_record` (osobne zapytanie na każdy wpis). Nazwiska matek
+są pobierane jednym `in_bulk`, a posortowane strumienie wpisów łączy
+`heapq.merge`. `ahistoria_dziecka` czyta tabele historyczne przez async
+ORM, wszystkie naraz (`asyncio.gather`).
+
+Wpisy przeniesione do archiwum (archiwum_historii.py) są czytane tylko na
+życzenie (``archiwum=True``) - łączone z wpisami z bazy, żeby opisy zmian
+na granicy archiwum porównywały właściwe wersje.
+"""
+import asyncio
+import heapq
+from itertools import groupby
+from operator import attrgetter, itemgetter
+
+from . import archiwum_historii
+from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka
+
+# Typy, których opis zależy od poprzedniej wersji
+_OPIS_Z_POPRZEDNIEJ = ('dziecko', 'matka')
+
+
+def _posortowane(historia):
+    return historia.order_by('id', 'history_date', 'history_id')
+
+
+def _wersje(wiersze):
+    """Zwraca listy (wersja, poprzednia wersja) dla każdego obiektu, od najnowszej.
+
+    `wiersze` - wpisy historii posortowane przez `_posortowane`.
+    """
+    for _, wersje in groupby(wiersze, key=attrgetter('id')):
+        wersje = list(wersje)
+        yield [(wersja, wersje[i - 1] if i else None) for i, wersja in reversed(list(enumerate(wersje)))]
+
+
+def _nazwa_matki(matki, matka_id):
+    matka = matki.get(matka_id)
+    return matka.imie + " " + matka.nazwisko if matka else "Brak"
+
+
+def _opis_dziecka(history_item, prev, matki):
+    changes = []
+    if prev:
+        # Porównaj z poprzednią wersją
+        if history_item.imie != prev.imie:
+            changes.append(f"Imię: '{prev.imie}' → '{history_item.imie}'")
+        if history_item.data_urodzenia != prev.data_urodzenia:
+            changes.append(f"Data urodzenia: {prev.data_urodzenia} → {history_item.data_urodzenia}")
+        if history_item.plec != prev.plec:
+            changes.append(f"Płeć: {prev.get_plec_display()} → {history_item.get_plec_display()}")
+        if history_item.grupa_krwi != prev.grupa_krwi:
+            changes.append(f"Grupa krwi: '{prev.grupa_krwi}' → '{history_item.grupa_krwi}'")
+        if history_item.matka_id != prev.matka_id:
+            changes.append(f"Matka: {_nazwa_matki(matki, prev.matka_id)} → {_nazwa_matki(matki, history_item.matka_id)}")
+    else:
+        # Pierwsza wersja
+        changes.append(f"Pierwsza wersja - Imię: {history_item.imie}, Data urodzenia: {history_item.data_urodzenia}, Płeć: {history_item.get_plec_display()}")
+    return '; '.join(changes) if changes else 'Utworzenie rekordu dziecka'
+
+
+def _opis_matki(history_item, prev, matki):
+    changes = []
+    if prev:
+        if history_item.pesel != prev.pesel:
+            changes.append(f"PESEL: '{prev.pesel}' → '{history_item.pesel}'")
+        if history_item.imie != prev.imie:
+            changes.append(f"Imię: '{prev.imie}' → '{history_item.imie}'")
+        if history_item.nazwisko != prev.nazwisko:
+            changes.append(f"Nazwisko: '{prev.nazwisko}' → '{history_item.nazwisko}'")
+        if history_item.grupa_krwi != prev.grupa_krwi:
+            changes.append(f"Grupa krwi: '{prev.grupa_krwi}' → '{history_item.grupa_krwi}'")
+        if history_item.konflikt_serologiczny != prev.konflikt_serologiczny:
+            prev_konflikt = "Tak" if prev.konflikt_serologiczny else "Nie"
+            curr_konflikt = "Tak" if history_item.konflikt_serologiczny else "Nie"
+            changes.append(f"Konflikt serologiczny: {prev_konflikt} → {curr_konflikt}")
+    else:
+        changes.append(f"Pierwsza wersja matki - {history_item.imie} {history_item.nazwisko}")
+    return '; '.join(changes) if changes else 'Utworzenie rekordu matki'
+
+
+def _opis_parametrow(history_item, prev, matki):
+    return (f"Waga: {history_item.waga_kg} kg, Wzrost: {history_item.wzrost_cm} cm, "
+            f"Natlenienie: {history_item.natlenienie_spO2}%, "
+            f"Oddechy: {history_item.oddechy_na_min}/min")
+
+
+def _opis_apgar(history_item, prev, matki):
+    return (f"1min: {history_item.apgar_1min}, 5min: {history_item.apgar_5min}"
+            f"{', 10min: ' + str(history_item.apgar_10min) if history_item.apgar_10min else ''}")
+
+
+def _wpisy(wersje, typ, model_type, opis, autor, matki, zarchiwizowane):
+    for history_item, prev in wersje:
+        if (prev is None and history_item.history_type != '+' and model_type in zarchiwizowane
+                and model_type in _OPIS_Z_POPRZEDNIEJ):
+            # Wersja nie jest pierwsza, a poprzednia jest w archiwum - porównanie wymaga jego odczytu
+            opis_zmiany = 'Wcześniejsze wersje w archiwum'
+        else:
+            opis_zmiany = opis(history_item, prev, matki)
+        yield {
+            'data': history_item.history_date,
+            'lekarz': getattr(history_item, autor),
+            'typ': typ,
+            'opis': opis_zmiany,
+            'object': history_item,
+            'model_type': model_type,
+        }
+
+
+def _zrodla(dziecko):
+    """Tabele historyczne dziecka: (zapytanie, typ, model_type, opis, pole autora)."""
+    zrodla = [
+        (Dziecko.history.filter(id=dziecko.pk).select_related('history_user'),
+         'Dziecko', 'dziecko', _opis_dziecka, 'history_user'),
+    ]
+    if dziecko.matka_id:
+        zrodla.append((Matka.history.filter(id=dziecko.matka_id).select_related('history_user'),
+                       'Matka', 'matka', _opis_matki, 'history_user'))
+    zrodla += [
+        (ParametryZewnetrzne.history.filter(id__in=dziecko.parametry.values('id')).select_related('lekarz'),
+         'Parametry', 'parametry', _opis_parametrow, 'lekarz'),
+        (APGARScore.history.filter(id__in=dziecko.apgar.values('id')).select_related('lekarz'),
+         'APGAR', 'apgar', _opis_apgar, 'lekarz'),
+    ]
+    return zrodla
+
+
+def _id_matek(wczytane):
+    """Matki występujące w historii dziecka (pierwsze źródło)."""
+    return {wersja.matka_id for obiekt in wczytane[0][0] for wersja, _ in obiekt if wersja.matka_id}
+
+
+def _polacz(wczytane, matki, zarchiwizowane=frozenset()):
+    # Każdy obiekt daje strumień posortowany malejąco po dacie - łączenie k-drogowe
+    strumienie = [
+        _wpisy(wersje, typ, model_type, opis, autor, matki, zarchiwizowane)
+        for obiekty, typ, model_type, opis, autor in wczytane
+        for wersje in obiekty
+    ]
+    return list(heapq.merge(*strumienie, key=itemgetter('data'), reverse=True))
+
+
+def _z_archiwum(wiersze, zarchiwizowane):
+    """Wiersze z bazy i z archiwum w kolejności `_posortowane`, bez duplikatów ``history_id``."""
+    wiersze = {wiersz.history_id: wiersz for wiersz in zarchiwizowane} | {wiersz.history_id: wiersz for wiersz in wiersze}
+    return sorted(wiersze.values(), key=attrgetter('id', 'history_date', 'history_id'))
+
+
+def historia_dziecka(dziecko, zarchiwizowane=frozenset(), archiwum=False):
+    """Zwraca wpisy historii dziecka, jego matki, pomiarów i APGAR od najnowszych.
+
+    `zarchiwizowane` - typy historii z wpisami w archiwum
+    (`archiwum_historii.typy_dziecka`). Przy ``archiwum=True`` zwraca tylko
+    wpisy z archiwum.
+    """
+    zrodla = _zrodla(dziecko)
+    if archiwum:
+        z_archiwum = archiwum_historii.wiersze_dziecka(dziecko, zarchiwizowane)
+        wiersze = [_z_archiwum(_posortowane(historia), z_archiwum.get(model_type, ()))
+                   for historia, _, model_type, *_ in zrodla]
+    else:
+        wiersze = [list(_posortowane(historia)) for historia, *_ in zrodla]
+    wczytane = [(list(_wersje(w)), *reszta) for w, (_, *reszta) in zip(wiersze, zrodla)]
+    # Matki występujące w historii dziecka - jednym zapytaniem
+    matki = Matka.objects.in_bulk(_id_matek(wczytane))
+    if archiwum:
+        return [wpis for wpis in _polacz(wczytane, matki) if getattr(wpis['object'], 'z_archiwum', False)]
+    return _polacz(wczytane, matki, zarchiwizowane)
+
+
+async def _alista(zapytanie):
+    return [wiersz async for wiersz in zapytanie]
+
+
+async def ahistoria_dziecka(dziecko, zarchiwizowane=frozenset()):
+    """Asynchroniczna wersja `historia_dziecka` (bez archiwum) - tabele historyczne są czytane współbieżnie."""
+    zrodla = _zrodla(dziecko)
+    wiersze = await asyncio.gather(*(_alista(_posortowane(historia)) for historia, *_ in zrodla))
+    wczytane = [(list(_wersje(w)), *reszta) for w, (_, *reszta) in zip(wiersze, zrodla)]
+    matki = await Matka.objects.ain_bulk(_id_matek(wczytane))
+    return _polacz(wczytane, matki, zarchiwizowane)
@@ -0,0 +1,367 @@
+"""Przyrostowy, wznawialny import eksportu CSV.
+
+Dla każdego pliku źródłowego zapisywany jest punkt kontrolny (offset bajtowy,
+liczba wierszy, skrót SHA-256 prefiksu i całego pliku), a dla każdego
+wiersza - odcisk treści powiązany z rekordem w bazie. Dzięki temu:
+
+- niezmieniony plik jest pomijany po porównaniu skrótu,
+- plik dopisany na końcu (typowa nocna delta) lub przerwany import jest
+  czytany od ostatniego zatwierdzonego fragmentu,
+- w pozostałych przypadkach niezmienione wiersze są pomijane po odcisku,
+  bez zapytań do tabel z danymi.
+
+Każdy fragment pliku jest zapisywany w osobnej transakcji razem z punktem
+kontrolnym i przeliczeniem danych pochodnych (migawki statusu, indeks
+wyszukiwania, zestawienia) zmienionych rekordów, więc po przerwaniu import
+wznawia się od ostatniej porcji, a zatwierdzone wiersze nie zostają z
+nieaktualnymi migawkami.
+"""
+import hashlib
+import os
+
+from django.db import transaction
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from .csv_chunks import DOMYSLNY_ROZMIAR_FRAGMENTU, CzytnikCSV, poczatek_grupy, posortowany_po
+from .importer import (
+    DOMYSLNY_ROZMIAR_PORCJI, Statystyka,
+    konwertuj_matke, konwertuj_noworodka, konwertuj_pomiar, konwertuj_apgar,
+)
+from .models import (
+    Matka, Dziecko, ParametryZewnetrzne, APGARScore,
+    PunktKontrolnyImportu, OdciskWiersza,
+)
+from .pamiec_raportow import uniewaznij_liste
+from .statystyki import odswiez_statystyki_dzieci
+from .triage import odswiez_statusy
+from .wyszukiwanie import odswiez_hasla
+
+ROZMIAR_BLOKU_HASHA = 1024 * 1024
+
+
+def hash_pliku(sciezka, do_bajtu=None):
+    """SHA-256 pliku (lub jego prefiksu do `do_bajtu`)."""
+    hasz = hashlib.sha256()
+    pozostalo = do_bajtu
+    with open(sciezka, 'rb') as plik:
+        while pozostalo is None or pozostalo > 0:
+            blok = plik.read(ROZMIAR_BLOKU_HASHA if pozostalo is None else min(ROZMIAR_BLOKU_HASHA, pozostalo))
+            if not blok:
+                break
+            hasz.update(blok)
+            if pozostalo is not None:
+                pozostalo -= len(blok)
+    return hasz
+
+
+class ZrodloMatek:
+    nazwa = 'matki'
+    model = Matka
+    konwertuj = staticmethod(konwertuj_matke)
+    kolumna_grupy = None
+    rodzic = None
+    pola = ['pesel', 'imie', 'nazwisko', 'grupa_krwi']
+
+    def klucz(self, dane, rodzic_id):
+        return dane['pesel']
+
+    def istniejace(self, klucze):
+        return dict(Matka.objects.filter(pesel__in=list(klucze)).values_list('pesel', 'pk'))
+
+    def ustaw(self, obiekt, dane, rodzic_id):
+        for pole in self.pola:
+            setattr(obiekt, pole, dane[pole])
+
+    def nowy(self, dane, rodzic_id):
+        obiekt = Matka(konflikt_serologiczny=False)
+        self.ustaw(obiekt, dane, rodzic_id)
+        return obiekt
+
+    def dzieci_obiektu(self, obiekt):
+        return Dziecko.objects.filter(matka_id=obiekt.pk).values_list('pk', flat=True)
+
+
+class ZrodloNoworodkow(ZrodloMatek):
+    nazwa = 'noworodki'
+    model = Dziecko
+    konwertuj = staticmethod(konwertuj_noworodka)
+    rodzic = ('id_matki', 'matki')
+    pola = ['imie', 'data_urodzenia', 'plec', 'matka']
+
+    def klucz(self, dane, rodzic_id):
+        return (dane['imie'], dane['data_urodzenia'])
+
+    def istniejace(self, klucze):
+        imiona = {imie for imie, _ in klucze}
+        daty = {data for _, data in klucze}
+        return {
+            (imie, data): pk
+            for imie, data, pk in Dziecko.objects.filter(imie__in=imiona, data_urodzenia__in=daty)
+            .values_list('imie', 'data_urodzenia', 'pk')
+            if (imie, data) in klucze
+        }
+
+    def ustaw(self, obiekt, dane, rodzic_id):
+        obiekt.imie = dane['imie']
+        obiekt.data_urodzenia = dane['data_urodzenia']
+        obiekt.plec = dane['plec']
+        obiekt.matka_id = rodzic_id
+
+    def nowy(self, dane, rodzic_id):
+        obiekt = Dziecko()
+        self.ustaw(obiekt, dane, rodzic_id)
+        return obiekt
+
+    def dzieci_obiektu(self, obiekt):
+        return [obiekt.pk]
+
+
+class ZrodloPomiarow(ZrodloNoworodkow):
+    nazwa = 'pomiary'
+    model = ParametryZewnetrzne
+    konwertuj = staticmethod(konwertuj_pomiar)
+    rodzic = ('id_noworodka', 'noworodki')
+    pola = ['dziecko', 'wzrost_cm', 'waga_kg', 'obwod_glowy_cm']
+
+    def klucz(self, dane, rodzic_id):
+        return (rodzic_id, dane['wzrost_cm'], dane['waga_kg'], dane['obwod_glowy_cm'])
+
+    def istniejace(self, klucze):
+        return {
+            (dziecko_id, wzrost, waga, obwod): pk
+            for dziecko_id, wzrost, waga, obwod, pk in ParametryZewnetrzne.objects
+            .filter(dziecko_id__in={k[0] for k in klucze})
+            .values_list('dziecko_id', 'wzrost_cm', 'waga_kg', 'obwod_glowy_cm', 'pk')
+            if (dziecko_id, wzrost, waga, obwod) in klucze
+        }
+
+    def ustaw(self, obiekt, dane, rodzic_id):
+        obiekt.dziecko_id = rodzic_id
+        obiekt.wzrost_cm = dane['wzrost_cm']
+        obiekt.waga_kg = dane['waga_kg']
+        obiekt.obwod_glowy_cm = dane['obwod_glowy_cm']
+
+    def nowy(self, dane, rodzic_id):
+        obiekt = ParametryZewnetrzne(lekarz=None, czy_wczesniak=False, oddechy_na_min=30, natlenienie_spO2=95)
+        self.ustaw(obiekt, dane, rodzic_id)
+        return obiekt
+
+    def dzieci_obiektu(self, obiekt):
+        return [obiekt.dziecko_id]
+
+
+class ZrodloApgar(ZrodloPomiarow):
+    """Wyniki APGAR - jednym rekordem źródłowym jest grupa wierszy dziecka."""
+    nazwa = 'apgar'
+    model = APGARScore
+    konwertuj = staticmethod(konwertuj_apgar)
+    kolumna_grupy = 'id_noworodka'
+    pola = ['dziecko', 'apgar_1min', 'apgar_5min', 'apgar_10min']
+
+    def klucz(self, dane, rodzic_id):
+        return (rodzic_id, dane['wyniki'].get(1))
+
+    def istniejace(self, klucze):
+        return {
+            (dziecko_id, apgar_1min): pk
+            for dziecko_id, apgar_1min, pk in APGARScore.objects
+            .filter(dziecko_id__in={k[0] for k in klucze})
+            .values_list('dziecko_id', 'apgar_1min', 'pk')
+            if (dziecko_id, apgar_1min) in klucze
+        }
+
+    def ustaw(self, obiekt, dane, rodzic_id):
+        obiekt.dziecko_id = rodzic_id
+        obiekt.apgar_1min = dane['wyniki'][1]
+        obiekt.apgar_5min = dane['wyniki'][5]
+        obiekt.apgar_10min = dane['wyniki'].get(10)
+
+    def nowy(self, dane, rodzic_id):
+        obiekt = APGARScore(lekarz=None)
+        self.ustaw(obiekt, dane, rodzic_id)
+        return obiekt
+
+
+def grupuj_apgar_z_odciskiem(rekordy):
+    """Skleja wiersze APGAR dziecka w jeden rekord z łącznym odciskiem."""
+    grupy = {}
+    for rekord in rekordy:
+        grupa = grupy.setdefault(rekord['id_noworodka'], {
+            'id_zrodla': rekord['id_noworodka'], 'id_noworodka': rekord['id_noworodka'],
+            'wyniki': {}, 'odciski': [],
+        })
+        grupa['wyniki'][rekord['minuta']] = rekord['wynik']
+        grupa['odciski'].append(rekord['_odcisk'])
+    for grupa in grupy.values():
+        tresc = ''.join(sorted(grupa.pop('odciski')))
+        grupa['_odcisk'] = hashlib.blake2b(tresc.encode('ascii'), digest_size=16).hexdigest()
+        yield grupa
+
+
+ZRODLA = [
+    ('matki.csv', ZrodloMatek()),
+    ('noworodki.csv', ZrodloNoworodkow()),
+    ('pomiary.csv', ZrodloPomiarow()),
+    ('wyniki_apgar.csv', ZrodloApgar()),
+]
+
+
+class ImportPrzyrostowy:
+    """Importuje pliki `ZRODLA`, zapisując tylko nowe lub zmienione wiersze."""
+
+    def __init__(self, rozmiar_porcji=DOMYSLNY_ROZMIAR_PORCJI, procesy=1,
+                 rozmiar_fragmentu=DOMYSLNY_ROZMIAR_FRAGMENTU):
+        self.rozmiar_porcji = rozmiar_porcji
+        self.procesy = procesy
+        self.rozmiar_fragmentu = rozmiar_fragmentu
+
+    def importuj_plik(self, sciezka, zrodlo):
+        """Importuje jeden plik; zwraca (`Statystyka`, `CzytnikCSV` lub None)."""
+        stat = Statystyka(zrodlo.nazwa)
+        stat.zmienione = 0
+        stat.tryb = 'full scan'
+        pelny_hash = hash_pliku(sciezka).hexdigest()
+        punkt, _ = PunktKontrolnyImportu.objects.get_or_create(plik=sciezka)
+        if punkt.zakonczony and punkt.hash_pliku == pelny_hash:
+            stat.tryb = 'unchanged'
+            return stat.zakoncz(), None
+        if zrodlo.kolumna_grupy and not posortowany_po(sciezka, zrodlo.kolumna_grupy):
+            # Grupa rozrzucona po fragmentach dałaby niepełne rekordy, a każdy fragment ma własny commit
+            raise ValueError(f'{sciezka} is not sorted by {zrodlo.kolumna_grupy}; sort it or import it with --bulk')
+
+        start = None
+        hasz_prefiksu = hashlib.sha256()
+        if punkt.offset and os.path.getsize(sciezka) >= punkt.offset:
+            # Za offsetem mogły zostać dopisane wiersze ostatniej grupy - wznów od jej początku
+            start_grupy = punkt.offset
+            if zrodlo.kolumna_grupy:
+                start_grupy = poczatek_grupy(sciezka, punkt.offset, zrodlo.kolumna_grupy)
+            hasz = hash_pliku(sciezka, start_grupy)
+            sprawdzany = hasz.copy()
+            with open(sciezka, 'rb') as plik:
+                plik.seek(start_grupy)
+                powtorzone = plik.read(punkt.offset - start_grupy)
+            sprawdzany.update(powtorzone)
+            if sprawdzany.hexdigest() == punkt.hash_prefiksu:
+                start = start_grupy
+                hasz_prefiksu = hasz
+                punkt.wiersz -= len(powtorzone.splitlines())
+                stat.tryb = f'resumed at byte {start}'
+        if start is None:
+            punkt.offset = 0
+            punkt.wiersz = 0
+
+        czytnik = CzytnikCSV(
+            sciezka, zrodlo.konwertuj, procesy=self.procesy, rozmiar_fragmentu=self.rozmiar_fragmentu,
+            start=start, kolumna_grupy=zrodlo.kolumna_grupy, odciski=True,
+        )
+        with open(sciezka, 'rb') as plik:
+            for wynik in czytnik.fragmenty():
+                if start is None:
+                    # Nagłówek wchodzi do skrótu prefiksu przy pierwszym fragmencie
+                    plik.seek(0)
+                    hasz_prefiksu.update(plik.read(wynik.start))
+                    start = wynik.start
+                plik.seek(wynik.start)
+                hasz_prefiksu.update(plik.read(wynik.koniec - wynik.start))
+
+                rekordy = wynik.rekordy
+                if zrodlo.nazwa == 'apgar':
+                    rekordy = list(grupuj_apgar_z_odciskiem(rekordy))
+                with transaction.atomic():
+                    dzieci, matki = set(), set()
+                    for i in range(0, len(rekordy), self.rozmiar_porcji):
+                        self._zapisz_porcje(zrodlo, rekordy[i:i + self.rozmiar_porcji], stat, dzieci, matki)
+                    self._odswiez_pochodne(dzieci, matki)
+                    punkt.offset = wynik.koniec
+                    punkt.wiersz += wynik.wiersze
+                    punkt.hash_prefiksu = hasz_prefiksu.hexdigest()
+                    punkt.zakonczony = False
+                    punkt.save()
+
+        punkt.zakonczony = True
+        punkt.hash_pliku = pelny_hash
+        punkt.save()
+        return stat.zakoncz(), czytnik
+
+    def _odswiez_pochodne(self, dzieci, matki):
+        # bulk_create/bulk_update nie wysyłają sygnałów
+        odswiez_statusy(dzieci)
+        odswiez_hasla(matki, dzieci)
+        odswiez_statystyki_dzieci(dzieci)
+
+    def _zapisz_porcje(self, zrodlo, rekordy, stat, dzieci, matki):
+        """Zapisuje porcję rekordów; dotknięte dzieci i matki dopisuje do `dzieci` i `matki`."""
+        stat.wiersze += len(rekordy)
+        znane = {
+            o.id_zrodla: o
+            for o in OdciskWiersza.objects.filter(zrodlo=zrodlo.nazwa, id_zrodla__in=[r['id_zrodla'] for r in rekordy])
+        }
+        do_zapisu = [r for r in rekordy if r['id_zrodla'] not in znane or znane[r['id_zrodla']].odcisk != r['_odcisk']]
+        stat.pominiete += len(rekordy) - len(do_zapisu)
+        if not do_zapisu:
+            return
+
+        # Rekord nadrzędny (matka dziecka, dziecko pomiaru) z odcisków poprzednich plików
+        rodzice = {}
+        if zrodlo.rodzic:
+            kolumna, zrodlo_rodzica = zrodlo.rodzic
+            rodzice = dict(OdciskWiersza.objects.filter(
+                zrodlo=zrodlo_rodzica, id_zrodla__in={r[kolumna] for r in do_zapisu},
+            ).values_list('id_zrodla', 'obiekt_id'))
+
+        nowe, zmienione, odciski_nowe, odciski_zmienione = {}, [], [], []
+        obiekty_zmienione = zrodlo.model.objects.in_bulk(
+            [znane[r['id_zrodla']].obiekt_id for r in do_zapisu if r['id_zrodla'] in znane])
+        for dane in do_zapisu:
+            rodzic_id = rodzice.get(dane[zrodlo.rodzic[0]]) if zrodlo.rodzic else None
+            if zrodlo.nazwa == 'apgar' and None in (dane['wyniki'].get(1), dane['wyniki'].get(5)):
+                # Bez odcisku - po dopisaniu brakujących wierszy grupa zostanie wczytana ponownie
+                stat.niepelne += 1
+                continue
+            if zrodlo.rodzic and rodzic_id is None:
+                stat.pominiete += 1
+                continue
+            odcisk = znane.get(dane['id_zrodla'])
+            obiekt = obiekty_zmienione.get(odcisk.obiekt_id) if odcisk else None
+            if obiekt is not None:
+                zrodlo.ustaw(obiekt, dane, rodzic_id)
+                zmienione.append(obiekt)
+                odcisk.odcisk = dane['_odcisk']
+                odciski_zmienione.append(odcisk)
+                stat.zmienione += 1
+            else:
+                nowe.setdefault(zrodlo.klucz(dane, rodzic_id), []).append((dane, rodzic_id, odcisk))
+
+        # Nowe wiersze: najpierw dopasuj istniejące rekordy po kluczu naturalnym
+        istniejace = zrodlo.istniejace(set(nowe)) if nowe else {}
+        do_utworzenia = {}
+        for klucz, wiersze in nowe.items():
+            if klucz not in istniejace:
+                do_utworzenia[klucz] = zrodlo.nowy(*wiersze[0][:2])
+        if do_utworzenia:
+            bulk_create_with_history(list(do_utworzenia.values()), zrodlo.model, batch_size=self.rozmiar_porcji)
+            stat.utworzone += len(do_utworzenia)
+        if zmienione:
+            bulk_update_with_history(zmienione, zrodlo.model, zrodlo.pola, batch_size=self.rozmiar_porcji)
+            if zrodlo.model is Dziecko:
+                # Zmieniona data urodzenia przesuwa dziecko między stronami filtrowanymi po dacie
+                uniewaznij_liste()
+
+        for klucz, wiersze in nowe.items():
+            pk = istniejace[klucz] if klucz in istniejace else do_utworzenia[klucz].pk
+            for dane, _, odcisk in wiersze:
+                if odcisk is None:
+                    odciski_nowe.append(OdciskWiersza(
+                        zrodlo=zrodlo.nazwa, id_zrodla=dane['id_zrodla'], odcisk=dane['_odcisk'], obiekt_id=pk))
+                else:
+                    # Rekord, na który wskazywał odcisk, już nie istnieje
+                    odcisk.odcisk, odcisk.obiekt_id = dane['_odcisk'], pk
+                    odciski_zmienione.append(odcisk)
+        OdciskWiersza.objects.bulk_create(odciski_nowe, batch_size=self.rozmiar_porcji)
+        OdciskWiersza.objects.bulk_update(odciski_zmienione, ['odcisk', 'obiekt_id'], batch_size=self.rozmiar_porcji)
+
+        for obiekt in zmienione + list(do_utworzenia.values()):
+            dzieci.update(zrodlo.dzieci_obiektu(obiekt))
+            if zrodlo.model is Matka:
+                matki.add(obiekt.pk)
@@ -0,0 +1,303 @@
+"""Zbiorczy (bulk) import danych z eksportu CSV.
+
+Wiersze są konwertowane czystymi funkcjami `konwertuj_*`, a `ImportZbiorczy`
+zapisuje je porcjami przez `bulk_create` razem z historią simple_history.
+Istniejące klucze naturalne (PESEL matki, imię + data urodzenia dziecka)
+są wczytywane raz na początku, więc import nie odpytuje bazy dla każdego
+wiersza.
+"""
+import time
+from datetime import date
+
+from simple_history.utils import bulk_create_with_history
+
+from .models import Matka, Dziecko, ParametryZewnetrzne, APGARScore
+
+DOMYSLNY_ROZMIAR_PORCJI = 1000
+
+
+# --- Konwersja wierszy CSV ---
+
+def konwertuj_matke(row):
+    return {
+        'id_zrodla': row['id_matki'],
+        'pesel': row['pesel_matki'],
+        'imie': row['imie'],
+        'nazwisko': row['nazwisko'],
+        'grupa_krwi': row['grupa_krwi'],
+    }
+
+
+def konwertuj_noworodka(row):
+    return {
+        'id_zrodla': row['id_noworodka'],
+        'id_matki': row['id_matki'],
+        'imie': row['imie'],
+        'data_urodzenia': date.fromisoformat(row['data_urodzenia']),
+        'plec': row['plec'],
+    }
+
+
+def konwertuj_pomiar(row):
+    return {
+        'id_zrodla': row['id_pomiaru'],
+        'id_noworodka': row['id_noworodka'],
+        'wzrost_cm': float(row['wzrost_cm']),
+        'waga_kg': float(row['waga_g']) / 1000,
+        'obwod_glowy_cm': float(row['obwod_glowy_cm']),
+    }
+
+
+def konwertuj_apgar(row):
+    return {
+        'id_noworodka': row['id_noworodka'],
+        'minuta': int(row['minuta']),
+        'wynik': int(row['wynik']),
+    }
+
+
+def konwertuj_wiersz_laczony(row):
+    """Wiersz pliku dla `import_csv` (matka, dziecko, pomiar i APGAR naraz)."""
+    return {
+        'pesel_matki': row['pesel_matki'],
+        'imie': row['imie'],
+        'data_urodzenia': date.fromisoformat(row['data_urodzenia']),
+        'plec': row['plec'],
+        'wzrost_cm': float(row['wzrost']),
+        'waga_kg': float(row['waga']),
+        'czy_wczesniak': row['wczesniak'] == '1',
+        'obwod_glowy_cm': float(row['glowa']),
+        'oddechy_na_min': int(row['oddechy']),
+        'natlenienie_spO2': int(row['spo2']),
+        'apgar_1min': int(row['apgar1']),
+        'apgar_5min': int(row['apgar5']),
+        'apgar_10min': int(row['apgar10']) if row['apgar10'] else None,
+    }
+
+
+class Statystyka:
+    """Licznik wierszy i czasu dla jednego pliku."""
+
+    def __init__(self, nazwa):
+        self.nazwa = nazwa
+        self.wiersze = 0
+        self.utworzone = 0
+        self.pominiete = 0
+        self.niepelne = 0  # grupy APGAR bez wyniku z 1. lub 5. minuty
+        self._start = time.perf_counter()
+        self.czas = 0.0
+
+    def zakoncz(self):
+        self.czas = time.perf_counter() - self._start
+        return self
+
+    @property
+    def wiersze_na_sekunde(self):
+        return self.wiersze / self.czas if self.czas else 0.0
+
+    def __str__(self):
+        niepelne = f', {self.niepelne} incomplete' if self.niepelne else ''
+        return (f'{self.nazwa}: {self.wiersze} rows, {self.utworzone} created, '
+                f'{self.pominiete} skipped{niepelne} in {self.czas:.2f}s ({self.wiersze_na_sekunde:.0f} rows/s)')
+
+
+class ImportZbiorczy:
+    """Zapisuje skonwertowane wiersze porcjami, z historią tworzoną zbiorczo.
+
+    Wywołujący odpowiada za otoczenie całego importu jedną transakcją.
+    Identyfikatory dzieci i matek, których dotyczył import, są zbierane w
+    `zmienione_dzieci` i `zmienione_matki`, aby po imporcie przeliczyć dane
+    pochodne (bulk_create nie wysyła sygnałów post_save).
+    """
+
+    def __init__(self, rozmiar_porcji=DOMYSLNY_ROZMIAR_PORCJI):
+        self.rozmiar_porcji = rozmiar_porcji
+        self.matki = dict(Matka.objects.values_list('pesel', 'pk'))
+        self.dzieci = {
+            (imie, data_urodzenia): pk
+            for imie, data_urodzenia, pk in Dziecko.objects.values_list('imie', 'data_urodzenia', 'pk')
+        }
+        self.pomiary = set(ParametryZewnetrzne.objects.values_list(
+            'dziecko_id', 'wzrost_cm', 'waga_kg', 'obwod_glowy_cm'))
+        self.apgar = set(APGARScore.objects.values_list('dziecko_id', 'apgar_1min'))
+        # id z pliku źródłowego -> pk w bazie
+        self.id_matek = {}
+        self.id_dzieci = {}
+        self.zmienione_dzieci = set()
+        self.zmienione_matki = set()
+
+    def _zapisz(self, model, obiekty):
+        if obiekty:
+            bulk_create_with_history(obiekty, model, batch_size=self.rozmiar_porcji)
+
+    def importuj_matki(self, wiersze):
+        stat = Statystyka('matki')
+        oczekujace = {}
+
+        def zapisz():
+            self._zapisz(Matka, list(oczekujace.values()))
+            for pesel, matka in oczekujace.items():
+                self.matki[pesel] = matka.pk
+                self.zmienione_matki.add(matka.pk)
+            oczekujace.clear()
+
+        zrodla = []
+        for dane in wiersze:
+            stat.wiersze += 1
+            pesel = dane['pesel']
+            zrodla.append((dane['id_zrodla'], pesel))
+            if pesel in self.matki or pesel in oczekujace:
+                stat.pominiete += 1
+                continue
+            oczekujace[pesel] = Matka(
+                pesel=pesel, imie=dane['imie'], nazwisko=dane['nazwisko'],
+                grupa_krwi=dane['grupa_krwi'], konflikt_serologiczny=False,
+            )
+            stat.utworzone += 1
+            if len(oczekujace) >= self.rozmiar_porcji:
+                zapisz()
+        zapisz()
+        for id_zrodla, pesel in zrodla:
+            self.id_matek[id_zrodla] = self.matki[pesel]
+        return stat.zakoncz()
+
+    def importuj_noworodki(self, wiersze):
+        stat = Statystyka('noworodki')
+        oczekujace = {}
+
+        def zapisz():
+            self._zapisz(Dziecko, list(oczekujace.values()))
+            for klucz, dziecko in oczekujace.items():
+                self.dzieci[klucz] = dziecko.pk
+                self.zmienione_dzieci.add(dziecko.pk)
+            oczekujace.clear()
+
+        zrodla = []
+        for dane in wiersze:
+            stat.wiersze += 1
+            matka_id = self.id_matek.get(dane['id_matki'])
+            if matka_id is None:
+                stat.pominiete += 1
+                continue
+            klucz = (dane['imie'], dane['data_urodzenia'])
+            zrodla.append((dane['id_zrodla'], klucz))
+            if klucz in self.dzieci or klucz in oczekujace:
+                stat.pominiete += 1
+                continue
+            oczekujace[klucz] = Dziecko(
+                imie=dane['imie'], data_urodzenia=dane['data_urodzenia'],
+                plec=dane['plec'], matka_id=matka_id,
+            )
+            stat.utworzone += 1
+            if len(oczekujace) >= self.rozmiar_porcji:
+                zapisz()
+        zapisz()
+        for id_zrodla, klucz in zrodla:
+            self.id_dzieci[id_zrodla] = self.dzieci[klucz]
+        return stat.zakoncz()
+
+    def importuj_pomiary(self, wiersze):
+        stat = Statystyka('pomiary')
+        oczekujace = []
+        for dane in wiersze:
+            stat.wiersze += 1
+            dziecko_id = self.id_dzieci.get(dane['id_noworodka'])
+            klucz = (dziecko_id, dane['wzrost_cm'], dane['waga_kg'], dane['obwod_glowy_cm'])
+            if dziecko_id is None or klucz in self.pomiary:
+                stat.pominiete += 1
+                continue
+            self.pomiary.add(klucz)
+            oczekujace.append(ParametryZewnetrzne(
+                dziecko_id=dziecko_id, lekarz=None,
+                wzrost_cm=dane['wzrost_cm'], waga_kg=dane['waga_kg'],
+                czy_wczesniak=False, obwod_glowy_cm=dane['obwod_glowy_cm'],
+                oddechy_na_min=30, natlenienie_spO2=95,
+            ))
+            self.zmienione_dzieci.add(dziecko_id)
+            stat.utworzone += 1
+            if len(oczekujace) >= self.rozmiar_porcji:
+                self._zapisz(ParametryZewnetrzne, oczekujace)
+                oczekujace = []
+        self._zapisz(ParametryZewnetrzne, oczekujace)
+        return stat.zakoncz()
+
+    def importuj_apgar(self, grupy):
+        """Zapisuje wyniki APGAR; `grupy` to pary (id_noworodka, {minuta: wynik}).
+
+        `wiersze` liczy wiersze CSV, a `utworzone`/`pominiete` - rekordy APGAR;
+        grupy bez wyniku z 1. lub 5. minuty są liczone osobno w `niepelne`.
+        """
+        stat = Statystyka('apgar')
+        oczekujace = []
+        for id_noworodka, wyniki in grupy:
+            stat.wiersze += len(wyniki)
+            dziecko_id = self.id_dzieci.get(id_noworodka)
+            klucz = (dziecko_id, wyniki.get(1))
+            if None in (wyniki.get(1), wyniki.get(5)):
+                stat.niepelne += 1
+                continue
+            if dziecko_id is None or klucz in self.apgar:
+                stat.pominiete += 1
+                continue
+            self.apgar.add(klucz)
+            oczekujace.append(APGARScore(
+                dziecko_id=dziecko_id, lekarz=None,
+                apgar_1min=wyniki[1], apgar_5min=wyniki[5], apgar_10min=wyniki.get(10),
+            ))
+            self.zmienione_dzieci.add(dziecko_id)
+            stat.utworzone += 1
+            if len(oczekujace) >= self.rozmiar_porcji:
+                self._zapisz(APGARScore, oczekujace)
+                oczekujace = []
+        self._zapisz(APGARScore, oczekujace)
+        return stat.zakoncz()
+
+    def importuj_wiersze_laczone(self, rekordy):
+        """Zapisuje rekordy z `konwertuj_wiersz_laczony` - każdy to nowe dziecko."""
+        stat = Statystyka('wiersze')
+        porcja = []
+        for dane in rekordy:
+            stat.wiersze += 1
+            porcja.append(dane)
+            if len(porcja) >= self.rozmiar_porcji:
+                self._zapisz_laczone(porcja)
+                porcja = []
+        self._zapisz_laczone(porcja)
+        stat.utworzone = stat.wiersze
+        return stat.zakoncz()
+
+    def _zapisz_laczone(self, porcja):
+        nowe_matki = {}
+        for dane in porcja:
+            pesel = dane['pesel_matki']
+            if pesel not in self.matki and pesel not in nowe_matki:
+                nowe_matki[pesel] = Matka(pesel=pesel, imie='Unknown', nazwisko='Unknown')
+        self._zapisz(Matka, list(nowe_matki.values()))
+        for pesel, matka in nowe_matki.items():
+            self.matki[pesel] = matka.pk
+            self.zmienione_matki.add(matka.pk)
+
+        dzieci = [
+            Dziecko(imie=dane['imie'], data_urodzenia=dane['data_urodzenia'],
+                    plec=dane['plec'], matka_id=self.matki[dane['pesel_matki']])
+            for dane in porcja
+        ]
+        self._zapisz(Dziecko, dzieci)
+        self._zapisz(ParametryZewnetrzne, [
+            ParametryZewnetrzne(
+                dziecko_id=dziecko.pk, lekarz=None,
+                wzrost_cm=dane['wzrost_cm'], waga_kg=dane['waga_kg'],
+                czy_wczesniak=dane['czy_wczesniak'], obwod_glowy_cm=dane['obwod_glowy_cm'],
+                oddechy_na_min=dane['oddechy_na_min'], natlenienie_spO2=dane['natlenienie_spO2'],
+            )
+            for dziecko, dane in zip(dzieci, porcja)
+        ])
+        self._zapisz(APGARScore, [
+            APGARScore(
+                dziecko_id=dziecko.pk, lekarz=None,
+                apgar_1min=dane['apgar_1min'], apgar_5min=dane['apgar_5min'],
+                apgar_10min=dane['apgar_10min'],
+            )
+            for dziecko, dane in zip(dzieci, porcja)
+        ])
+        self.zmienione_dzieci.update(dziecko.pk for dziecko in dzieci)
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from neonatology.archiwum_historii import TYPY, archiwizuj, dni_retencji, katalog
+
+
+class Command(BaseCommand):
+    help = ('Move history rows (babies, mothers, measurements, APGAR) older than the retention period '
+            'into append-only monthly gzip JSONL archive files')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS',
+                            help='Archive rows older than this many days (default: ARCHIWUM_HISTORII_DNI or 365)')
+        parser.add_argument('--model', choices=TYPY, action='append', help='Only this history table (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        dni = options['older_than'] if options['older_than'] is not None else dni_retencji()
+        if dni < 0:
+            raise CommandError('--older-than must not be negative')
+        start = time.perf_counter()
+        try:
+            wynik = archiwizuj(dni, options['model'], proba=options['dry_run'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        for typ, (wiersze, bajty) in wynik.items():
+            if options['dry_run']:
+                self.stdout.write(f'{typ:<10} {wiersze:>9} rows older than {dni} days')
+            else:
+                self.stdout.write(f'{typ:<10} {wiersze:>9} rows archived ({bajty / 1024:.0f} KiB)')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Archived to {katalog()} in {time.perf_counter() - start:.1f}s'))
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from neonatology.reguly import REGULY, ocen_wsadowo
+
+
+def _ocen_petla(wagi, natlenienia, apgary):
+    """Ocena wiersz po wierszu - punkt odniesienia dla wersji wektorowej."""
+    kody = []
+    for waga, natlenienie, apgar in zip(wagi, natlenienia, apgary):
+        wartosci = {'waga_kg': waga, 'natlenienie_spO2': natlenienie, 'apgar_5min': apgar}
+        kod = 0
+        for regula in REGULY:
+            if wartosci[regula.pole] < regula.prog:
+                kod |= regula.kod
+        kody.append(kod)
+    return kody
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark of the vectorized rule engine against a per-row loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                            help='Number of rows to evaluate in each run')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        for n in options['sizes']:
+            wagi = rng.normal(3.3, 0.6, n)
+            natlenienia = rng.integers(85, 101, n).astype(np.float64)
+            apgary = rng.integers(3, 11, n).astype(np.float64)
+            listy = (wagi.tolist(), natlenienia.tolist(), apgary.tolist())
+
+            start = time.perf_counter()
+            oczekiwane = _ocen_petla(*listy)
+            czas_petli = time.perf_counter() - start
+
+            start = time.perf_counter()
+            kody = ocen_wsadowo(wagi, natlenienia, apgary)
+            czas_wektorowy = time.perf_counter() - start
+
+            if kody.tolist() != oczekiwane:
+                self.stdout.write(self.style.ERROR(f'{n} rows: vectorized result differs from loop'))
+                continue
+            self.stdout.write(
+                f'{n:>10} rows: loop {czas_petli * 1000:9.1f} ms, '
+                f'vectorized {czas_wektorowy * 1000:7.2f} ms, '
+                f'speedup x{czas_petli / czas_wektorowy:.0f}'
+            )
@@ -0,0 +1,214 @@
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from neonatology.dane_syntetyczne import GeneratorDanych, zapisz_csv
+from neonatology.models import Dziecko, Matka, ParametryZewnetrzne, APGARScore
+from neonatology.pamiec_raportow import uniewaznij_wszystko
+from neonatology.stronicowanie import PO, PaginatorKursorowy
+
+# Głębokość "głębokiej" strony raportów jako ułamek wszystkich dzieci
+GLEBOKOSC_STRONY = 0.9
+
+
+def _wersja_kodu():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def _w_katalogu(katalog):
+    # import_all_csv czyta pliki z bieżącego katalogu
+    poprzedni = os.getcwd()
+    os.chdir(katalog)
+    try:
+        yield
+    finally:
+        os.chdir(poprzedni)
+
+
+def _podsumuj(czasy, zapytania):
+    czasy_ms = [c * 1000 for c in czasy]
+    return {
+        'runs': len(czasy_ms),
+        'min_ms': round(min(czasy_ms), 3),
+        'median_ms': round(statistics.median(czasy_ms), 3),
+        'mean_ms': round(statistics.fmean(czasy_ms), 3),
+        'max_ms': round(max(czasy_ms), 3),
+        'queries': zapytania,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Time the hot paths (dashboard pages, statistics, child details, history, admin panel, CSV imports) '
+            'against the current database and write the results as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='benchmark.json', help='JSON results file')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per view (after one warm-up run)')
+        parser.add_argument('--import-babies', type=int, default=5000,
+                            help='Size of the generated CSV files for the import benchmarks (0 to skip)')
+        parser.add_argument('--compare', metavar='FILE', help='Previous results file to compare against')
+
+    def handle(self, *args, **options):
+        if not Dziecko.objects.exists():
+            raise CommandError('The database is empty; run generuj_dane first')
+        self.fabryka = RequestFactory()
+        self.repeat = max(options['repeat'], 1)
+
+        wyniki = {}
+        for nazwa, sciezka, uzytkownik, z_pamiecia in self.widoki():
+            warianty = [(nazwa, None)]
+            if z_pamiecia:
+                # Panel raportów: bez pamięci fragmentów (unieważnianej przed każdym przebiegiem) i z trafieniami
+                warianty = [(nazwa, uniewaznij_wszystko), (f'{nazwa} (cached)', None)]
+            for nazwa_wyniku, przed_przebiegiem in warianty:
+                wyniki[nazwa_wyniku] = self.zmierz_widok(sciezka, uzytkownik, przed_przebiegiem)
+                self.wypisz(nazwa_wyniku, wyniki[nazwa_wyniku])
+        if options['import_babies'] > 0:
+            for nazwa, wynik in self.zmierz_importy(options['import_babies']).items():
+                wyniki[nazwa] = wynik
+                self.wypisz(nazwa, wynik)
+
+        raport = {
+            'commit': _wersja_kodu(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': {
+                'mothers': Matka.objects.count(),
+                'babies': Dziecko.objects.count(),
+                'measurements': ParametryZewnetrzne.objects.count(),
+                'apgar': APGARScore.objects.count(),
+                'measurement_history': ParametryZewnetrzne.history.count(),
+            },
+            'results': wyniki,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as plik:
+            json.dump(raport, plik, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if options['compare']:
+            self.porownaj(options['compare'], wyniki)
+
+    def widoki(self):
+        """Mierzone widoki dobrane do danych w bazie: (nazwa, ścieżka, użytkownik, czy używa pamięci raportów)."""
+        dzieci = Dziecko.objects.all()
+        # Dziecko z największą liczbą pomiarów - najgorszy przypadek dla szczegółów i historii
+        dziecko_id = (ParametryZewnetrzne.objects.values('dziecko_id').annotate(n=Count('id'))
+                      .order_by('-n', 'dziecko_id').values_list('dziecko_id', flat=True).first()
+                      or dzieci.values_list('pk', flat=True).first())
+        lekarz_id = (ParametryZewnetrzne.objects.exclude(lekarz=None).values('lekarz_id').annotate(n=Count('id'))
+                     .order_by('-n', 'lekarz_id').values_list('lekarz_id', flat=True).first())
+        lekarz = User.objects.get(pk=lekarz_id) if lekarz_id else User.objects.order_by('pk').first()
+        if lekarz is None:
+            raise CommandError('No users in the database; run generuj_dane first')
+
+        paginator = PaginatorKursorowy(dzieci, 50)
+        gleboko = int(dzieci.count() * GLEBOKOSC_STRONY)
+        kursor = paginator.zakoduj(dzieci.order_by(*paginator.ordering)[gleboko])
+        raporty = reverse('raporty')
+        return [
+            ('raporty: first page', raporty, lekarz, True),
+            ('raporty: deep page', f'{raporty}?{PO}={kursor}', lekarz, True),
+            ('raporty: status filter', f'{raporty}?status=Hospitalizacja', lekarz, True),
+            ('raporty: sorted by status', f'{raporty}?sortuj=status', lekarz, True),
+            ('statystyki: last year', reverse('statystyki'), lekarz, False),
+            ('szczegoly_noworodka', reverse('szczegoly_noworodka', args=[dziecko_id]), lekarz, False),
+            ('historia_zmian', reverse('historia_zmian', args=[dziecko_id]), lekarz, False),
+            ('krzywe_wzrastania', reverse('krzywe_wzrastania', args=[dziecko_id]), lekarz, False),
+            ('panel_admina', reverse('panel_admina'), lekarz, False),
+        ]
+
+    def zmierz_widok(self, sciezka, uzytkownik, przed_przebiegiem=None):
+        """Czasy widoku; `przed_przebiegiem` jest wołane przed każdym przebiegiem, poza pomiarem czasu."""
+        dopasowanie = resolve(sciezka.split('?')[0])
+        czasy = []
+        zapytania = None
+        for nr in range(self.repeat + 1):
+            if przed_przebiegiem:
+                przed_przebiegiem()
+            request = self.fabryka.get(sciezka)
+            request.user = uzytkownik or AnonymousUser()
+            request.session = {}
+            request._messages = FallbackStorage(request)
+            with CaptureQueriesContext(connection) as przechwycone:
+                start = time.perf_counter()
+                response = dopasowanie.func(request, *dopasowanie.args, **dopasowanie.kwargs)
+                czas = time.perf_counter() - start
+            if response.status_code != 200:
+                raise CommandError(f'{sciezka} returned {response.status_code}')
+            if nr:  # pierwszy przebieg rozgrzewa pamięci podręczne
+                czasy.append(czas)
+            zapytania = len(przechwycone)
+        return _podsumuj(czasy, zapytania)
+
+    def zmierz_importy(self, liczba_dzieci):
+        """Czas obu importów CSV (tryb --bulk) na wygenerowanych plikach; zmiany są wycofywane."""
+        wyniki = {}
+        with tempfile.TemporaryDirectory() as katalog:
+            # Inne ziarno niż domyślne, żeby import nie pomijał dzieci już obecnych w bazie
+            zapisz_csv(GeneratorDanych(liczba_dzieci, seed=12345), katalog)
+            importy = [
+                ('import_all_csv --bulk', lambda: call_command('import_all_csv', bulk=True, stdout=io.StringIO())),
+                ('import_csv --bulk', lambda: call_command('import_csv', os.path.join(katalog, 'laczony.csv'),
+                                                          bulk=True, stdout=io.StringIO())),
+            ]
+            with _w_katalogu(katalog):
+                for nazwa, importuj in importy:
+                    czasy = []
+                    zapytania = None
+                    # Importy są kosztowne - jeden przebieg na powtórzenie bez rozgrzewania
+                    for _ in range(min(self.repeat, 3)):
+                        with transaction.atomic():
+                            with CaptureQueriesContext(connection) as przechwycone:
+                                start = time.perf_counter()
+                                importuj()
+                                czasy.append(time.perf_counter() - start)
+                            transaction.set_rollback(True)
+                        zapytania = len(przechwycone)
+                    wyniki[nazwa] = dict(_podsumuj(czasy, zapytania), babies=liczba_dzieci,
+                                         babies_per_second=round(liczba_dzieci / statistics.median(czasy)))
+        return wyniki
+
+    def wypisz(self, nazwa, wynik):
+        self.stdout.write(f'{nazwa:<36} median {wynik["median_ms"]:10.1f} ms  '
+                          f'min {wynik["min_ms"]:10.1f} ms  {wynik["queries"]:>6} queries')
+
+    def porownaj(self, sciezka, wyniki):
+        with open(sciezka, encoding='utf-8') as plik:
+            poprzednie = json.load(plik)
+        self.stdout.write(f'\nCompared with {sciezka} (commit {poprzednie.get("commit")}):')
+        for nazwa, wynik in wyniki.items():
+            stary = poprzednie.get('results', {}).get(nazwa)
+            if not stary:
+                self.stdout.write(f'{nazwa:<36} new')
+                continue
+            zmiana = wynik['median_ms'] / stary['median_ms'] if stary['median_ms'] else float('inf')
+            linia = (f'{nazwa:<36} {stary["median_ms"]:10.1f} -> {wynik["median_ms"]:10.1f} ms  x{zmiana:.2f}  '
+                     f'queries {stary["queries"]} -> {wynik["queries"]}')
+            if zmiana > 1.2 or wynik['queries'] > stary['queries']:
+                self.stdout.write(self.style.WARNING(linia))
+            else:
+                self.stdout.write(linia)
@@ -0,0 +1,48 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from neonatology.eksport import DOMYSLNY_ROZMIAR_PORCJI, FORMATY, strumien_eksportu
+from neonatology.models import StatusDziecka
+from neonatology.repliki import strumien_z_repliki
+
+
+class Command(BaseCommand):
+    help = 'Stream all children with latest measurements, status and verdict to a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help='Output file (default: stdout)')
+        parser.add_argument('--format', choices=FORMATY, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--status', choices=[s for s, _ in StatusDziecka.STATUS_CHOICES], default='')
+        parser.add_argument('--blood-group', default='', help='Only children with this grupa_krwi')
+        parser.add_argument('--from', dest='data_od', default='', help='Born on or after (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='data_do', default='', help='Born on or before (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=DOMYSLNY_ROZMIAR_PORCJI,
+                            help='Rows fetched from the database per cursor round-trip')
+        parser.add_argument('--primary', action='store_true',
+                            help='Read from the primary database even when a replica is configured')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-' and (options['gzip'] or options['format'] == 'xlsx') and sys.stdout.isatty():
+            raise CommandError('Refusing to write binary output to a terminal; use --output')
+        parametry = {
+            'status': options['status'],
+            'grupa_krwi': options['blood_group'],
+            'data_od': options['data_od'],
+            'data_do': options['data_do'],
+        }
+        strumien = strumien_eksportu(parametry, format=options['format'], gzip=options['gzip'],
+                                     rozmiar_porcji=options['chunk_size'])
+        if not options['primary']:
+            strumien = strumien_z_repliki(strumien)
+
+        if options['output'] == '-':
+            for porcja in strumien:
+                sys.stdout.buffer.write(porcja)
+            sys.stdout.buffer.flush()
+            return
+        rozmiar = 0
+        with open(options['output'], 'wb') as plik:
+            for porcja in strumien:
+                plik.write(porcja)
+                rozmiar += len(porcja)
+        self.stdout.write(self.style.SUCCESS(f"Exported to {options['output']} ({rozmiar} bytes)"))
@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from neonatology.dane_syntetyczne import (
+    DOMYSLNA_LICZBA_LEKARZY, DOMYSLNA_LICZBA_POMIAROW, DOMYSLNY_ROZMIAR_PORCJI,
+    GeneratorDanych, PLIKI_CSV, zapisz_csv, zapisz_do_bazy,
+)
+
+
+class Command(BaseCommand):
+    help = ('Generate a reproducible synthetic dataset (mothers, babies, measurements, APGAR, history) '
+            'in the database or as CSV files')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--babies', type=int, default=10_000,
+                            help='Number of babies to generate (e.g. 10000, 100000, 1000000)')
+        parser.add_argument('--measurements', type=float, default=DOMYSLNA_LICZBA_POMIAROW,
+                            help='Average number of measurements per baby')
+        parser.add_argument('--years', type=int, default=3, help='Births are spread over this many years')
+        parser.add_argument('--doctors', type=int, default=DOMYSLNA_LICZBA_LEKARZY,
+                            help='Number of synthetic doctor accounts the measurements are assigned to')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=DOMYSLNY_ROZMIAR_PORCJI,
+                            help='Babies generated and committed per batch (part of what makes a run reproducible)')
+        parser.add_argument('--csv', metavar='DIR',
+                            help=f'Write {", ".join(PLIKI_CSV)} to DIR instead of the database')
+
+    def handle(self, *args, **options):
+        if options['babies'] < 1:
+            raise CommandError('--babies must be positive')
+        generator = GeneratorDanych(
+            options['babies'], pomiary_na_dziecko=options['measurements'], seed=options['seed'],
+            rozmiar_porcji=options['batch_size'], lata=options['years'], liczba_lekarzy=options['doctors'],
+        )
+        start = time.perf_counter()
+
+        if options['csv']:
+            zapisz_csv(generator, options['csv'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Wrote {generator.ostatnia_matka} mothers, {generator.ostatnie_dziecko} babies, '
+                f'{generator.ostatni_pomiar} measurements to {options["csv"]} '
+                f'in {time.perf_counter() - start:.1f}s'))
+            return
+
+        def postep(zapisane):
+            czas = time.perf_counter() - start
+            self.stdout.write(f'{zapisane[1]} babies ({zapisane[1] / czas:.0f}/s)')
+
+        matki, dzieci, pomiary, poprawki = zapisz_do_bazy(generator, postep)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {matki} mothers, {dzieci} babies, {pomiary} measurements ({poprawki} corrected), '
+            f'{dzieci} APGAR scores in {time.perf_counter() - start:.1f}s'))
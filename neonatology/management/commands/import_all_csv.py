@@ -1,12 +1,42 @@
 import csv
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from neonatology.models import Matka, Dziecko, ParametryZewnetrzne, APGARScore
+from neonatology.csv_chunks import DOMYSLNY_ROZMIAR_FRAGMENTU, CzytnikCSV, grupuj_apgar, posortowany_po
+from neonatology.importer import (
+    DOMYSLNY_ROZMIAR_PORCJI, ImportZbiorczy,
+    konwertuj_matke, konwertuj_noworodka, konwertuj_pomiar, konwertuj_apgar,
+)
+from neonatology.import_przyrostowy import ZRODLA, ImportPrzyrostowy
+from neonatology.statystyki import odswiez_statystyki_dzieci
+from neonatology.triage import odswiez_statusy
+from neonatology.wyszukiwanie import odswiez_hasla
 from django.utils import timezone
 
 class Command(BaseCommand):
     help = 'Import data from CSV files: matki.csv, noworodki.csv, pomiary.csv, wyniki_apgar.csv'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--bulk', action='store_true',
+                            help='Use bulk_create in a single transaction instead of per-row get_or_create')
+        parser.add_argument('--batch-size', type=int, default=DOMYSLNY_ROZMIAR_PORCJI,
+                            help='Rows per bulk_create batch (bulk mode only)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes used to parse and convert CSV chunks (implies --bulk when > 1)')
+        parser.add_argument('--chunk-size', type=int, default=DOMYSLNY_ROZMIAR_FRAGMENTU,
+                            help='Size of one parsed CSV chunk in bytes')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Import only new or changed rows, committing per chunk and resuming '
+                                 'from the last checkpoint of each file')
+
     def handle(self, *args, **options):
+        if options['incremental']:
+            self.import_przyrostowy(options['batch_size'], options['workers'], options['chunk_size'])
+            return
+        if options['bulk'] or options['workers'] > 1:
+            self.import_zbiorczy(options['batch_size'], options['workers'], options['chunk_size'])
+            return
+
         # Import matki
         matka_dict = {}
         with open('matki.csv', 'r', encoding='utf-8') as file:
@@ -90,4 +120,50 @@ class Command(BaseCommand):
                 )
         self.stdout.write('Imported apgar')
 
-        self.stdout.write(self.style.SUCCESS('Successfully imported all data from CSV files'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('Successfully imported all data from CSV files'))
+
+    def import_zbiorczy(self, rozmiar_porcji, procesy, rozmiar_fragmentu):
+        def czytnik(sciezka, konwertuj):
+            return CzytnikCSV(sciezka, konwertuj, procesy=procesy, rozmiar_fragmentu=rozmiar_fragmentu)
+
+        with transaction.atomic():
+            importer = ImportZbiorczy(rozmiar_porcji)
+            pliki = [
+                ('matki.csv', konwertuj_matke, importer.importuj_matki),
+                ('noworodki.csv', konwertuj_noworodka, importer.importuj_noworodki),
+                ('pomiary.csv', konwertuj_pomiar, importer.importuj_pomiary),
+                ('wyniki_apgar.csv', konwertuj_apgar,
+                 lambda rekordy: importer.importuj_apgar(
+                     grupuj_apgar(rekordy, posortowany_po('wyniki_apgar.csv', 'id_noworodka')))),
+            ]
+            for sciezka, konwertuj, importuj in pliki:
+                rekordy = czytnik(sciezka, konwertuj)
+                self.stdout.write(str(importuj(rekordy)))
+                self.zglos_bledy(sciezka, rekordy)
+
+            # bulk_create nie wysyła sygnałów - przelicz migawki statusu, indeks wyszukiwania i zestawienia
+            odswiez_statusy(importer.zmienione_dzieci)
+            odswiez_hasla(importer.zmienione_matki, importer.zmienione_dzieci)
+            odswiez_statystyki_dzieci(importer.zmienione_dzieci)
+
+        self.stdout.write(self.style.SUCCESS('Successfully imported all data from CSV files'))
+
+    def import_przyrostowy(self, rozmiar_porcji, procesy, rozmiar_fragmentu):
+        importer = ImportPrzyrostowy(rozmiar_porcji, procesy, rozmiar_fragmentu)
+        for sciezka, zrodlo in ZRODLA:
+            try:
+                stat, czytnik = importer.importuj_plik(sciezka, zrodlo)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f'{stat}, {stat.zmienione} updated [{stat.tryb}]')
+            if czytnik:
+                self.zglos_bledy(sciezka, czytnik)
+        # Migawki statusu, indeks wyszukiwania i zestawienia są przeliczane w transakcji każdego fragmentu
+        self.stdout.write(self.style.SUCCESS('Successfully imported all data from CSV files'))
+
+    def zglos_bledy(self, sciezka, czytnik):
+        if not czytnik.bledne:
+            return
+        self.stdout.write(self.style.WARNING(f'{sciezka}: {czytnik.bledne} invalid rows skipped'))
+        for nr, opis in czytnik.przyklady_bledow:
+            self.stdout.write(f'  line {nr}: {opis}')
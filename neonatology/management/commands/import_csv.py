@@ -1,6 +1,12 @@
 import csv
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from neonatology.models import Dziecko, ParametryZewnetrzne, APGARScore, Matka
+from neonatology.csv_chunks import DOMYSLNY_ROZMIAR_FRAGMENTU, CzytnikCSV
+from neonatology.importer import DOMYSLNY_ROZMIAR_PORCJI, ImportZbiorczy, konwertuj_wiersz_laczony
+from neonatology.statystyki import odswiez_statystyki_dzieci
+from neonatology.triage import odswiez_statusy
+from neonatology.wyszukiwanie import odswiez_hasla
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -9,9 +15,20 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Path to the CSV file')
+        parser.add_argument('--bulk', action='store_true',
+                            help='Use batched bulk_create in a single transaction instead of per-row saves')
+        parser.add_argument('--batch-size', type=int, default=DOMYSLNY_ROZMIAR_PORCJI,
+                            help='Rows per bulk_create batch (bulk mode only)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes used to parse and convert CSV chunks (implies --bulk when > 1)')
+        parser.add_argument('--chunk-size', type=int, default=DOMYSLNY_ROZMIAR_FRAGMENTU,
+                            help='Size of one parsed CSV chunk in bytes')
 
     def handle(self, *args, **options):
         csv_file = options['csv_file']
+        if options['bulk'] or options['workers'] > 1:
+            self.import_zbiorczy(csv_file, options['batch_size'], options['workers'], options['chunk_size'])
+            return
         try:
             with open(csv_file, 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
@@ -53,4 +70,24 @@ class Command(BaseCommand):
 
             self.stdout.write(self.style.SUCCESS('Successfully imported data from CSV'))
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error importing data: {str(e)}'))
\ No newline at end of file
+            self.stdout.write(self.style.ERROR(f'Error importing data: {str(e)}'))
+
+    def import_zbiorczy(self, csv_file, rozmiar_porcji, procesy, rozmiar_fragmentu):
+        rekordy = CzytnikCSV(csv_file, konwertuj_wiersz_laczony, procesy=procesy,
+                             rozmiar_fragmentu=rozmiar_fragmentu)
+        try:
+            with transaction.atomic():
+                importer = ImportZbiorczy(rozmiar_porcji)
+                self.stdout.write(str(importer.importuj_wiersze_laczone(rekordy)))
+                odswiez_statusy(importer.zmienione_dzieci)
+                odswiez_hasla(importer.zmienione_matki, importer.zmienione_dzieci)
+                odswiez_statystyki_dzieci(importer.zmienione_dzieci)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error importing data: {str(e)}'))
+            return
+
+        if rekordy.bledne:
+            self.stdout.write(self.style.WARNING(f'{rekordy.bledne} invalid rows skipped'))
+            for nr, opis in rekordy.przyklady_bledow:
+                self.stdout.write(f'  line {nr}: {opis}')
+        self.stdout.write(self.style.SUCCESS('Successfully imported data from CSV'))
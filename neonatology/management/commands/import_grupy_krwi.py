@@ -0,0 +1,56 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from simple_history.utils import bulk_update_with_history
+from neonatology.importer import DOMYSLNY_ROZMIAR_PORCJI
+from neonatology.models import Dziecko
+from neonatology.triage import odswiez_statusy
+
+
+class Command(BaseCommand):
+    help = 'Sync child blood groups (grupa_krwi) from noworodki.csv, updating only changed rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default='noworodki.csv', help='CSV file with id_noworodka and grupa_krwi columns')
+        parser.add_argument('--batch-size', type=int, default=DOMYSLNY_ROZMIAR_PORCJI,
+                            help='Rows per bulk_update batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        # Obecny stan: id -> grupa krwi, jednym zapytaniem
+        obecne = dict(Dziecko.objects.values_list('id', 'grupa_krwi'))
+
+        nowe = {}
+        bledne_dane = 0
+        try:
+            with open(options['file'], 'r', encoding='utf-8') as csvfile:
+                for row in csv.DictReader(csvfile):
+                    try:
+                        nowe[int(row['id_noworodka'])] = row['grupa_krwi'].strip()
+                    except (ValueError, KeyError, AttributeError):
+                        bledne_dane += 1
+        except FileNotFoundError:
+            raise CommandError(f"File {options['file']} not found")
+
+        nie_znalezione = sum(1 for pk in nowe if pk not in obecne)
+        zmiany = {pk: grupa for pk, grupa in nowe.items() if pk in obecne and obecne[pk] != grupa}
+
+        if not options['dry_run'] and zmiany:
+            ids = sorted(zmiany)
+            rozmiar = options['batch_size']
+            with transaction.atomic():
+                for i in range(0, len(ids), rozmiar):
+                    dzieci = list(Dziecko.objects.filter(pk__in=ids[i:i + rozmiar]))
+                    for dziecko in dzieci:
+                        dziecko.grupa_krwi = zmiany[dziecko.pk]
+                    bulk_update_with_history(dzieci, Dziecko, ['grupa_krwi'], batch_size=rozmiar)
+                # bulk_update nie wysyła sygnałów - grupa krwi wpływa na konflikt serologiczny
+                # i na filtr grupy krwi w panelu raportów
+                odswiez_statusy(zmiany, zmiana_listy=True)
+
+        self.stdout.write(f'Rows read: {len(nowe) + bledne_dane}')
+        self.stdout.write(f"{'Would update' if options['dry_run'] else 'Updated'}: {len(zmiany)}")
+        self.stdout.write(f'Unchanged: {len(nowe) - len(zmiany) - nie_znalezione}')
+        self.stdout.write(f'Not found: {nie_znalezione}')
+        self.stdout.write(f'Invalid rows: {bledne_dane}')
+        self.stdout.write(self.style.SUCCESS('Dry run, nothing saved' if options['dry_run'] else 'Blood group sync finished'))
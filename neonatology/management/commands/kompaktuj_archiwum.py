@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from neonatology.archiwum_historii import TYPY, kompaktuj
+
+
+class Command(BaseCommand):
+    help = ('Rewrite each monthly history archive as sorted, de-duplicated blocks and drop '
+            'unindexed leftovers from interrupted runs')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=TYPY, action='append', help='Only this history table (repeatable)')
+
+    def handle(self, *args, **options):
+        try:
+            wynik = kompaktuj(options['model'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        for typ, liczby in wynik.items():
+            self.stdout.write(f'{typ:<10} {liczby["miesiace"]:>4} months  '
+                              f'rows {liczby["wiersze_przed"]} -> {liczby["wiersze_po"]}  '
+                              f'{liczby["bajty_przed"] / 1024:.0f} -> {liczby["bajty_po"] / 1024:.0f} KiB')
+        self.stdout.write(self.style.SUCCESS('Archive compacted'))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from neonatology.repliki import odswiez_replike
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database to the read replica file with the SQLite backup API '
+            '(a local stand-in for database replication)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, metavar='SECONDS',
+                            help='Keep refreshing at this interval until interrupted')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                rozmiar, czas = odswiez_replike()
+            except (RuntimeError, OSError) as e:
+                raise CommandError(str(e))
+            self.stdout.write(f'Replica refreshed: {rozmiar / 1024 / 1024:.1f} MB in {czas:.2f} s')
+            if not options['every']:
+                return
+            try:
+                time.sleep(options['every'])
+            except KeyboardInterrupt:
+                return
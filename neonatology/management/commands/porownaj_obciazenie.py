@@ -0,0 +1,180 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from types import ModuleType
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from neonatology import views, widoki_async
+from neonatology.models import Dziecko, ParametryZewnetrzne
+from neonatology.urls import wzorce
+
+WIDOKI = ('raporty', 'szczegoly_noworodka', 'historia_zmian', 'szczegoly_matki')
+
+
+def _percentyl(czasy, p):
+    czasy = sorted(czasy)
+    return czasy[min(int(len(czasy) * p / 100), len(czasy) - 1)]
+
+
+def _host():
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+@contextmanager
+def _widoki_odczytu(odczyt):
+    # Adresy aplikacji z wybranymi widokami odczytu, niezależnie od WIDOKI_ASYNC
+    urlconf = ModuleType('neonatology_porownaj_obciazenie_urls')
+    urlconf.urlpatterns = wzorce(odczyt)
+    with override_settings(ROOT_URLCONF=urlconf):
+        yield
+
+
+class Command(BaseCommand):
+    help = ('Compare the read views under concurrent load through the real request handlers and the '
+            'MIDDLEWARE chain: sync views behind WSGIHandler on a thread pool against the async views '
+            'behind ASGIHandler on one event loop')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per view and mode')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Worker threads (sync) or requests in flight (async)')
+        parser.add_argument('--view', choices=WIDOKI, action='append', help='Only this view (repeatable)')
+
+    def handle(self, *args, **options):
+        if not Dziecko.objects.exists():
+            raise CommandError('The database is empty; run generuj_dane first')
+        uzytkownik = User.objects.order_by('pk').first()
+        liczba = max(options['requests'], 1)
+        rownolegle = max(options['concurrency'], 1)
+
+        # Middleware tylko synchroniczne wymusza pod ASGI adaptację (wątek na żądanie)
+        tylko_sync = [sciezka for sciezka in settings.MIDDLEWARE
+                      if not getattr(import_string(sciezka), 'async_capable', False)]
+        if tylko_sync:
+            self.stdout.write(self.style.WARNING(
+                'Sync-only middleware (adapted under ASGI): ' + ', '.join(tylko_sync)))
+
+        # Zalogowany klient: ciasteczko sesji idzie przez SessionMiddleware i AuthenticationMiddleware
+        klient = Client()
+        klient.force_login(uzytkownik)
+        self.ciasteczka = '; '.join(f'{nazwa}={ciastko.value}' for nazwa, ciastko in klient.cookies.items())
+        self.host = _host()
+        try:
+            self.stdout.write(f'{liczba} requests per view, concurrency {rownolegle}')
+            self.stdout.write(f'{"view":<22}{"mode":<7}{"req/s":>9}{"p50 ms":>10}{"p95 ms":>10}')
+            for nazwa in options['view'] or WIDOKI:
+                sciezka = self.sciezka(nazwa)
+                for tryb, zmierz in (('sync', self.zmierz_sync), ('async', self.zmierz_async)):
+                    czas_calkowity, czasy = zmierz(sciezka, liczba, rownolegle)
+                    self.stdout.write(f'{nazwa:<22}{tryb:<7}{liczba / czas_calkowity:>9.1f}'
+                                      f'{_percentyl(czasy, 50) * 1000:>10.1f}{_percentyl(czasy, 95) * 1000:>10.1f}')
+        finally:
+            klient.logout()
+
+    def sciezka(self, nazwa):
+        """Ścieżka widoku - dziecko z największą liczbą pomiarów i jego matka."""
+        dziecko_id = (ParametryZewnetrzne.objects.values('dziecko_id').annotate(n=Count('id'))
+                      .order_by('-n', 'dziecko_id').values_list('dziecko_id', flat=True).first()
+                      or Dziecko.objects.values_list('pk', flat=True).first())
+        if nazwa == 'raporty':
+            argumenty = ()
+        elif nazwa == 'szczegoly_matki':
+            matka_id = (Dziecko.objects.exclude(matka=None).order_by('pk')
+                        .values_list('matka_id', flat=True).first())
+            if matka_id is None:
+                raise CommandError('No babies with a mother in the database')
+            argumenty = (matka_id,)
+        else:
+            argumenty = (dziecko_id,)
+        return reverse(nazwa, args=argumenty)
+
+    def sprawdz(self, sciezka, status):
+        if status != 200:
+            raise CommandError(f'{sciezka} returned {status}')
+
+    def zmierz_sync(self, sciezka, liczba, rownolegle):
+        sciezka_url, _, zapytanie = sciezka.partition('?')
+
+        def obsluz(handler):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': sciezka_url, 'QUERY_STRING': zapytanie,
+                'SERVER_NAME': self.host, 'SERVER_PORT': '80', 'HTTP_HOST': self.host,
+                'HTTP_COOKIE': self.ciasteczka, 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(),
+            }
+            statusy = []
+            start = time.perf_counter()
+            odpowiedz = handler(environ, lambda status, naglowki, exc_info=None: statusy.append(status))
+            try:
+                for _ in odpowiedz:
+                    pass
+            finally:
+                # Jak serwer WSGI: close() wysyła request_finished (zamknięcie połączeń z bazą)
+                odpowiedz.close()
+            czas = time.perf_counter() - start
+            self.sprawdz(sciezka, int(statusy[0].split()[0]))
+            return czas
+
+        with _widoki_odczytu(views), ThreadPoolExecutor(max_workers=rownolegle) as pula:
+            handler = WSGIHandler()
+            list(pula.map(obsluz, [handler] * rownolegle))  # rozgrzewanie
+            start = time.perf_counter()
+            czasy = list(pula.map(obsluz, [handler] * liczba))
+            return time.perf_counter() - start, czasy
+
+    def zmierz_async(self, sciezka, liczba, rownolegle):
+        sciezka_url, _, zapytanie = sciezka.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': sciezka_url, 'raw_path': sciezka_url.encode(), 'root_path': '',
+            'query_string': zapytanie.encode(),
+            'headers': [(b'host', self.host.encode()), (b'cookie', self.ciasteczka.encode())],
+            'client': ('127.0.0.1', 0), 'server': (self.host, 80),
+        }
+
+        async def obsluz(handler, semafor):
+            wyslano_tresc = False
+            wiadomosci = []
+
+            async def receive():
+                nonlocal wyslano_tresc
+                if not wyslano_tresc:
+                    wyslano_tresc = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Klient się nie rozłącza - handler anuluje nasłuch po wysłaniu odpowiedzi
+                await asyncio.Future()
+
+            async def send(wiadomosc):
+                wiadomosci.append(wiadomosc)
+
+            async with semafor:
+                start = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                czas = time.perf_counter() - start
+            self.sprawdz(sciezka, wiadomosci[0]['status'])
+            return czas
+
+        async def przebieg():
+            handler = ASGIHandler()
+            semafor = asyncio.Semaphore(rownolegle)
+            await asyncio.gather(*(obsluz(handler, semafor) for _ in range(rownolegle)))  # rozgrzewanie
+            start = time.perf_counter()
+            czasy = await asyncio.gather(*(obsluz(handler, semafor) for _ in range(liczba)))
+            return time.perf_counter() - start, czasy
+
+        with _widoki_odczytu(widoki_async):
+            return asyncio.run(przebieg())
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from neonatology.wyszukiwanie import przebuduj_indeks
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the patient search index (PESEL, mother surname, child name) from scratch'
+
+    def handle(self, *args, **options):
+        liczba = przebuduj_indeks()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt: {liczba} entries'))
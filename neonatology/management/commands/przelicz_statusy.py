@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from neonatology.triage import przelicz_wszystkie_statusy, ROZMIAR_PORCJI
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the StatusDziecka snapshot table from current measurements and APGAR scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ROZMIAR_PORCJI,
+                            help='Number of children recomputed per query')
+
+    def handle(self, *args, **options):
+        zapisane = przelicz_wszystkie_statusy(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt status snapshots: {zapisane} total'))
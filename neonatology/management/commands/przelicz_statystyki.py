@@ -0,0 +1,14 @@
+import time
+from django.core.management.base import BaseCommand
+from neonatology.statystyki import przelicz_statystyki
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the daily rollup tables behind the statistics dashboard (births, measurements, APGAR) '
+            'from the measurement tables')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        liczby = przelicz_statystyki()
+        opis = ', '.join(f'{model}: {liczba}' for model, liczba in liczby.items())
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily rollups ({opis}) in {time.perf_counter() - start:.1f}s'))
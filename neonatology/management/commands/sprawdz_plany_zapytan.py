@@ -0,0 +1,92 @@
+import re
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from neonatology.eksport import filtruj_dzieci
+from neonatology.models import Dziecko, Matka, ParametryZewnetrzne, APGARScore, StatusDziecka, HasloWyszukiwania
+from neonatology.queries import dzieci_z_ostatnimi_pomiarami, zapytanie_ostatnich_zmian
+from neonatology.reguly import HOSPITALIZACJA
+from neonatology.stronicowanie import PaginatorKursorowy
+
+# Pełny skan tabeli w planie zapytania, zależnie od bazy
+PELNY_SKAN = {
+    # "SCAN tabela" bez "USING [COVERING] INDEX"; pomija podzapytania i CONSTANT ROW.
+    # Przejście po indeksie (SCAN ... USING INDEX) jest dozwolone - przy ORDER BY
+    # z LIMIT kończy się po jednej stronie wyników.
+    'sqlite': re.compile(r'\bSCAN (?!\(|CONSTANT ROW)(\w+)(?: AS \w+)?(?! USING)\s*$', re.MULTILINE),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'mysql': re.compile(r'\btype[=:]\s*"?ALL"?'),
+}
+SORTOWANIE = re.compile(r'USE TEMP B-TREE FOR ORDER BY|Sort Key|Using filesort')
+
+
+def gorace_zapytania():
+    """Zapytania wykonywane przez widoki przy każdym wyświetleniu strony."""
+    dziecko_id = Dziecko.objects.values_list('pk', flat=True).first() or 1
+    matka_id = Matka.objects.values_list('pk', flat=True).first() or 1
+    uzytkownik = User.objects.order_by('pk').first() or User(pk=1)
+    teraz = timezone.now()
+
+    dzieci = Dziecko.objects.select_related('matka', 'status')
+    strona = PaginatorKursorowy(dzieci, 50)
+    return [
+        ('raporty: first page', dzieci.order_by('-created_at', '-id')[:51]),
+        ('raporty: cursor page',
+         dzieci.filter(strona._warunek([teraz, dziecko_id], dalej=True)).order_by('-created_at', '-id')[:51]),
+        ('raporty: status filter',
+         filtruj_dzieci(dzieci, {'status': HOSPITALIZACJA}).order_by('-created_at', '-id')[:51]),
+        ('status snapshot: latest measurements',
+         dzieci_z_ostatnimi_pomiarami().filter(pk__in=[dziecko_id])),
+        ('szczegoly_noworodka: measurements', ParametryZewnetrzne.objects.filter(dziecko_id=dziecko_id)),
+        ('szczegoly_noworodka: APGAR', APGARScore.objects.filter(dziecko_id=dziecko_id)),
+        ('szczegoly_matki: children',
+         Dziecko.objects.filter(matka_id=matka_id).order_by('-data_urodzenia', '-id')[:51]),
+        ('historia_zmian: child history',
+         Dziecko.history.filter(id=dziecko_id).order_by('id', 'history_date', 'history_id')),
+        ('historia_zmian: measurement history',
+         ParametryZewnetrzne.history.filter(id__in=ParametryZewnetrzne.objects.filter(dziecko_id=dziecko_id).values('id'))),
+        ('panel_admina: my children',
+         Dziecko.objects.filter(pk__in=ParametryZewnetrzne.objects.filter(lekarz=uzytkownik).values('dziecko_id'))
+         .order_by('-created_at', '-id')[:51]),
+        ('panel_admina: recent changes', zapytanie_ostatnich_zmian(uzytkownik)),
+        ('admin: measurements by doctor and date',
+         ParametryZewnetrzne.objects.filter(lekarz=uzytkownik, data_pomiaru__gte=teraz)),
+        ('mother autocomplete: prefix page',
+         HasloWyszukiwania.objects.filter(typ='matka', tekst__gte='kow', tekst__lt='kox')
+         .order_by('typ', 'tekst', 'obiekt_id')[:21]),
+        ('mother autocomplete: alphabetical page', Matka.objects.order_by('nazwisko', 'imie', 'id')[:21]),
+        ('mother lookup by surname', Matka.objects.filter(nazwisko='Kowalska').order_by('nazwisko', 'imie')),
+        ('status snapshot by status', StatusDziecka.objects.filter(status=HOSPITALIZACJA)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot queries of the views and fail if any of them uses a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan of every query')
+
+    def handle(self, *args, **options):
+        wzorzec = PELNY_SKAN.get(connection.vendor)
+        if wzorzec is None:
+            raise CommandError(f'Plan checks are not implemented for {connection.vendor}')
+
+        bledy = []
+        for nazwa, queryset in gorace_zapytania():
+            plan = queryset.explain()
+            skany = wzorzec.findall(plan)
+            if skany:
+                bledy.append(nazwa)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {nazwa}: {", ".join(skany)}'))
+            elif SORTOWANIE.search(plan):
+                self.stdout.write(self.style.WARNING(f'SORT       {nazwa}'))
+            else:
+                self.stdout.write(f'ok         {nazwa}')
+            if options['verbose_plans'] or skany:
+                for linia in plan.splitlines():
+                    self.stdout.write(f'    {linia}')
+
+        if bledy:
+            raise CommandError(f'{len(bledy)} hot queries use a full table scan')
+        self.stdout.write(self.style.SUCCESS('All hot queries use indexes'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from neonatology.archiwum_historii import TYPY, weryfikuj
+
+
+class Command(BaseCommand):
+    help = ('Check the history archive against its indexes: checksums, row counts, date and key ranges, '
+            'leftover and unreferenced files')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=TYPY, action='append', help='Only this history table (repeatable)')
+        parser.add_argument('--database', action='store_true',
+                            help='Also report archived rows that are still in the history tables')
+
+    def handle(self, *args, **options):
+        bledy, ostrzezenia, wiersze = weryfikuj(options['model'], baza=options['database'])
+        for ostrzezenie in ostrzezenia:
+            self.stdout.write(self.style.WARNING(ostrzezenie))
+        for blad in bledy:
+            self.stderr.write(self.style.ERROR(blad))
+        if bledy:
+            raise CommandError(f'{len(bledy)} errors in the archive')
+        self.stdout.write(self.style.SUCCESS(f'Archive OK: {wiersze} rows, {len(ostrzezenia)} warnings'))
@@ -0,0 +1,237 @@
+"""Metryki wydajności widoków w formacie Prometheusa.
+
+`MetrykiMiddleware` mierzy dla każdego żądania czas całkowity, liczbę i
+czas zapytań SQL (wrapper `execute_wrappers` dołączany do każdego
+połączenia) oraz czas renderowania szablonów i dopisuje je do histogramów
+z etykietą nazwy widoku (`resolver_match.view_name`). Pomiar bieżącego
+żądania jest w zmiennej kontekstowej, więc obejmuje też zapytania i
+szablony wykonywane przez `sync_to_async` w widokach asynchronicznych.
+Histogramy są trzymane w pamięci procesu; widok `/metrics` zwraca je w
+formacie tekstowym Prometheusa.
+
+Ustawienia (opcjonalne):
+
+- ``METRYKI_PROG_WOLNEGO_ZADANIA`` - próg w sekundach; wolniejsze żądania
+  są logowane (logger ``neonatology.metryki``) razem z najczęściej
+  powtarzanymi zapytaniami. Domyślnie wyłączone.
+- ``METRYKI_DOZWOLONE_ADRESY`` - adresy, z których `/metrics` jest
+  dostępne bez logowania (domyślnie localhost); personel ma dostęp zawsze.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+from . import pamiec_raportow
+
+logger = logging.getLogger(__name__)
+
+BRAK_WIDOKU = '<nierozpoznany>'
+# Ile powtarzanych zapytań pokazać w logu wolnego żądania
+POWTORZENIA_W_LOGU = 5
+
+PROGI_CZASU = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROGI_LICZBY_ZAPYTAN = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """Histogram Prometheusa z jedną etykietą (`widok`), bezpieczny wątkowo."""
+
+    def __init__(self, nazwa, opis, progi):
+        self.nazwa = nazwa
+        self.opis = opis
+        self.progi = tuple(progi)
+        self._serie = {}
+        self._blokada = threading.Lock()
+
+    def obserwuj(self, widok, wartosc):
+        with self._blokada:
+            seria = self._serie.get(widok)
+            if seria is None:
+                # liczniki przedziałów (ostatni to +Inf) i suma
+                seria = self._serie[widok] = [[0] * (len(self.progi) + 1), 0.0]
+            seria[0][bisect_left(self.progi, wartosc)] += 1
+            seria[1] += wartosc
+
+    def wyczysc(self):
+        with self._blokada:
+            self._serie.clear()
+
+    def migawka(self):
+        with self._blokada:
+            return {widok: (list(liczniki), suma) for widok, (liczniki, suma) in self._serie.items()}
+
+    def eksportuj(self):
+        """Linie formatu tekstowego Prometheusa (przedziały skumulowane)."""
+        linie = [f'# HELP {self.nazwa} {self.opis}', f'# TYPE {self.nazwa} histogram']
+        for widok, (liczniki, suma) in sorted(self.migawka().items()):
+            etykieta = _etykieta(widok)
+            narastajaco = 0
+            for prog, liczba in zip(self.progi + ('+Inf',), liczniki):
+                narastajaco += liczba
+                linie.append(f'{self.nazwa}_bucket{{widok="{etykieta}",le="{prog}"}} {narastajaco}')
+            linie.append(f'{self.nazwa}_sum{{widok="{etykieta}"}} {suma!r}')
+            linie.append(f'{self.nazwa}_count{{widok="{etykieta}"}} {narastajaco}')
+        return linie
+
+
+def _etykieta(wartosc):
+    return wartosc.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+CZAS_ZADANIA = Histogram('neonatology_request_duration_seconds', 'Wall time of a request.', PROGI_CZASU)
+LICZBA_ZAPYTAN = Histogram('neonatology_request_sql_queries', 'SQL queries per request.', PROGI_LICZBY_ZAPYTAN)
+CZAS_SQL = Histogram('neonatology_request_sql_duration_seconds', 'Time spent in SQL per request.', PROGI_CZASU)
+CZAS_SZABLONOW = Histogram('neonatology_request_template_duration_seconds',
+                           'Time spent rendering templates per request.', PROGI_CZASU)
+HISTOGRAMY = (CZAS_ZADANIA, LICZBA_ZAPYTAN, CZAS_SQL, CZAS_SZABLONOW)
+
+
+class PomiarZadania:
+    """Liczniki jednego żądania, zbierane przez wrapper SQL i renderowanie szablonów."""
+
+    def __init__(self, zbieraj_zapytania=False):
+        self.liczba_zapytan = 0
+        self.czas_sql = 0.0
+        self.czas_szablonow = 0.0
+        self.glebokosc_szablonow = 0
+        self.zapytania = Counter() if zbieraj_zapytania else None
+
+    def __call__(self, execute, sql, params, many, context):
+        # Sygnatura wrappera `connection.execute_wrapper`
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.czas_sql += time.perf_counter() - start
+            self.liczba_zapytan += 1
+            if self.zapytania is not None:
+                # SQL z placeholderami - te same zapytania z innymi parametrami są zliczane razem
+                self.zapytania[sql] += 1
+
+
+_pomiar = ContextVar('neonatology_pomiar_zadania', default=None)
+_oryginalny_render = Template.render
+
+
+def _sql_z_pomiarem(execute, sql, params, many, context):
+    pomiar = _pomiar.get()
+    if pomiar is None:
+        return execute(sql, params, many, context)
+    return pomiar(execute, sql, params, many, context)
+
+
+def _dolacz_pomiar_sql(connection, **kwargs):
+    # Wrapper zostaje w połączeniu na stałe; poza żądaniem tylko przekazuje zapytanie dalej
+    if _sql_z_pomiarem not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_z_pomiarem)
+
+
+def _render_z_pomiarem(self, context):
+    pomiar = _pomiar.get()
+    if pomiar is None:
+        return _oryginalny_render(self, context)
+    # Liczy się tylko szablon najwyższego poziomu - {% include %} renderuje się w jego czasie
+    pomiar.glebokosc_szablonow += 1
+    start = time.perf_counter()
+    try:
+        return _oryginalny_render(self, context)
+    finally:
+        pomiar.glebokosc_szablonow -= 1
+        if not pomiar.glebokosc_szablonow:
+            pomiar.czas_szablonow += time.perf_counter() - start
+
+
+class MetrykiMiddleware:
+    """Mierzy czas, zapytania SQL i renderowanie szablonów każdego żądania.
+
+    Powinien być pierwszy na liście ``MIDDLEWARE``, żeby obejmował czas
+    pozostałych middleware (sesje, uwierzytelnianie). Działa synchronicznie
+    i asynchronicznie - pod ASGI nie wymusza adaptacji łańcucha middleware
+    do trybu synchronicznego.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prog_wolnego = getattr(settings, 'METRYKI_PROG_WOLNEGO_ZADANIA', None)
+        Template.render = _render_z_pomiarem
+        connection_created.connect(_dolacz_pomiar_sql, dispatch_uid='neonatology.metryki')
+        for polaczenie in connections.all(initialized_only=True):
+            _dolacz_pomiar_sql(polaczenie)
+        self.asynchroniczny = iscoroutinefunction(get_response)
+        if self.asynchroniczny:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asynchroniczny:
+            return self.__acall__(request)
+        pomiar = PomiarZadania(zbieraj_zapytania=self.prog_wolnego is not None)
+        token = _pomiar.set(pomiar)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _pomiar.reset(token)
+        # Przy StreamingHttpResponse treść (i jej zapytania) powstaje już po pomiarze
+        self.zapisz(request, time.perf_counter() - start, pomiar)
+        return response
+
+    async def __acall__(self, request):
+        pomiar = PomiarZadania(zbieraj_zapytania=self.prog_wolnego is not None)
+        token = _pomiar.set(pomiar)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pomiar.reset(token)
+        self.zapisz(request, time.perf_counter() - start, pomiar)
+        return response
+
+    def zapisz(self, request, czas, pomiar):
+        widok = request.resolver_match.view_name if request.resolver_match else BRAK_WIDOKU
+        CZAS_ZADANIA.obserwuj(widok, czas)
+        LICZBA_ZAPYTAN.obserwuj(widok, pomiar.liczba_zapytan)
+        CZAS_SQL.obserwuj(widok, pomiar.czas_sql)
+        CZAS_SZABLONOW.obserwuj(widok, pomiar.czas_szablonow)
+
+        if self.prog_wolnego is not None and czas >= self.prog_wolnego:
+            self.zaloguj_wolne(request, widok, czas, pomiar)
+
+    def zaloguj_wolne(self, request, widok, czas, pomiar):
+        powtarzane = [(sql, n) for sql, n in pomiar.zapytania.most_common(POWTORZENIA_W_LOGU) if n > 1]
+        logger.warning(
+            'Slow request %s %s (%s): %.3f s, %d SQL queries in %.3f s, templates %.3f s%s',
+            request.method, request.path, widok, czas, pomiar.liczba_zapytan, pomiar.czas_sql,
+            pomiar.czas_szablonow,
+            ''.join(f'\n  {n}x {sql}' for sql, n in powtarzane),
+        )
+
+
+def eksport_prometheus():
+    """Wszystkie histogramy i liczniki pamięci raportów w formacie tekstowym Prometheusa."""
+    linie = []
+    for histogram in HISTOGRAMY:
+        linie.extend(histogram.eksportuj())
+    nazwa = 'neonatology_report_cache_requests_total'
+    linie += [f'# HELP {nazwa} Report cache lookups by fragment and result.', f'# TYPE {nazwa} counter']
+    for (fragment, wynik), liczba in sorted(pamiec_raportow.statystyki().items()):
+        linie.append(f'{nazwa}{{fragment="{fragment}",wynik="{wynik}"}} {liczba}')
+    return '\n'.join(linie) + '\n'
+
+
+def dostep_do_metryk(request):
+    """Czy żądanie może odczytać `/metrics` (personel albo adres z listy dozwolonych)."""
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    dozwolone = getattr(settings, 'METRYKI_DOZWOLONE_ADRESY', ('127.0.0.1', '::1'))
+    return request.META.get('REMOTE_ADDR') in dozwolone
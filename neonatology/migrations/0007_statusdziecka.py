@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('neonatology', '0006_historicaldziecko_historicalmatka'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusDziecka',
+            fields=[
+                ('dziecko', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='status', serialize=False, to='neonatology.dziecko')),
+                ('status', models.CharField(choices=[('Hospitalizacja', 'Hospitalizacja'), ('Monitorowanie', 'Monitorowanie'), ('Parametry w normie', 'Parametry w normie')], default='Parametry w normie', max_length=20)),
+                ('werdykt', models.TextField()),
+                ('waga_kg', models.FloatField(blank=True, null=True)),
+                ('natlenienie_spO2', models.IntegerField(blank=True, null=True)),
+                ('apgar_5min', models.IntegerField(blank=True, null=True)),
+                ('liczba_pomiarow', models.IntegerField(default=0)),
+                ('liczba_apgar', models.IntegerField(default=0)),
+                ('konflikt_serologiczny', models.BooleanField(default=False)),
+                ('zaktualizowano', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'dziecko'], name='statusdziecka_status_idx')],
+            },
+        ),
+    ]
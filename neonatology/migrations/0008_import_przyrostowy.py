@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('neonatology', '0007_statusdziecka'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PunktKontrolnyImportu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plik', models.CharField(max_length=255, unique=True)),
+                ('offset', models.BigIntegerField(default=0, help_text='Bajt, do którego import jest zatwierdzony')),
+                ('wiersz', models.BigIntegerField(default=0, help_text='Liczba zatwierdzonych wierszy danych')),
+                ('hash_prefiksu', models.CharField(blank=True, help_text='SHA-256 bajtów [0, offset)', max_length=64)),
+                ('hash_pliku', models.CharField(blank=True, help_text='SHA-256 całego pliku przy ostatnim imporcie', max_length=64)),
+                ('zakonczony', models.BooleanField(default=False)),
+                ('zaktualizowano', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OdciskWiersza',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zrodlo', models.CharField(max_length=20)),
+                ('id_zrodla', models.CharField(max_length=64)),
+                ('odcisk', models.CharField(max_length=32)),
+                ('obiekt_id', models.BigIntegerField(help_text='Klucz główny rekordu utworzonego z wiersza')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('zrodlo', 'id_zrodla'), name='odciskwiersza_zrodlo_id_uniq')],
+            },
+        ),
+    ]
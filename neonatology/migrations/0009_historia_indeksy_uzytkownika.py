@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('neonatology', '0008_import_przyrostowy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historicalapgarscore',
+            index=models.Index(fields=['lekarz', '-history_date'], name='neonatology_lekarz__5664cd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicaldziecko',
+            index=models.Index(fields=['history_user', '-history_date'], name='neonatology_history_61e580_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicalparametryzewnetrzne',
+            index=models.Index(fields=['lekarz', '-history_date'], name='neonatology_lekarz__e322db_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('neonatology', '0009_historia_indeksy_uzytkownika'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apgarscore',
+            index=models.Index(fields=['dziecko', '-data_pomiaru', '-id'], name='apgar_dziecko_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apgarscore',
+            index=models.Index(fields=['lekarz', 'data_pomiaru'], name='apgar_lekarz_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dziecko',
+            index=models.Index(fields=['-created_at', '-id'], name='dziecko_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dziecko',
+            index=models.Index(fields=['matka', '-data_urodzenia', '-id'], name='dziecko_matka_urodz_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matka',
+            index=models.Index(fields=['nazwisko', 'imie'], name='matka_nazwisko_imie_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parametryzewnetrzne',
+            index=models.Index(fields=['dziecko', '-data_pomiaru', '-id'], name='parametry_dziecko_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parametryzewnetrzne',
+            index=models.Index(fields=['lekarz', 'data_pomiaru'], name='parametry_lekarz_data_idx'),
+        ),
+    ]
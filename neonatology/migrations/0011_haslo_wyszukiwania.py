@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('neonatology', '0010_indeksy_zlozone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HasloWyszukiwania',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('typ', models.CharField(choices=[('matka', 'Matka'), ('dziecko', 'Dziecko')], max_length=7)),
+                ('obiekt_id', models.BigIntegerField()),
+                ('pole', models.CharField(max_length=10)),
+                ('tekst', models.CharField(help_text='Słowo małymi literami, bez znaków diakrytycznych', max_length=100)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tekst', 'typ', 'obiekt_id'], name='haslo_tekst_idx'), models.Index(fields=['typ', 'obiekt_id'], name='haslo_obiekt_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('neonatology', '0011_haslo_wyszukiwania'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='haslowyszukiwania',
+            index=models.Index(fields=['typ', 'tekst', 'obiekt_id'], name='haslo_typ_tekst_idx'),
+        ),
+    ]
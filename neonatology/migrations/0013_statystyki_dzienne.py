@@ -0,0 +1,74 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('neonatology', '0012_haslo_typ_tekst_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApgarDnia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dzien', models.DateField()),
+                ('apgar_5min', models.IntegerField()),
+                ('liczba', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PomiaryDnia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dzien', models.DateField()),
+                ('pomiary', models.IntegerField(default=0)),
+                ('niskie_spo2', models.IntegerField(default=0, help_text='Pomiary z SpO2 poniżej progu')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UrodzeniaDnia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dzien', models.DateField(unique=True)),
+                ('urodzenia', models.IntegerField(default=0)),
+                ('zwazone', models.IntegerField(default=0, help_text='Dzieci z co najmniej jednym pomiarem')),
+                ('niska_waga', models.IntegerField(default=0, help_text='Dzieci, których pierwszy pomiar wagi jest poniżej progu')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dziecko',
+            index=models.Index(fields=['data_urodzenia'], name='dziecko_urodzenia_idx'),
+        ),
+        migrations.AddField(
+            model_name='apgardnia',
+            name='lekarz',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='pomiarydnia',
+            name='lekarz',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='apgardnia',
+            index=models.Index(fields=['lekarz', 'dzien'], name='apgardnia_lekarz_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='apgardnia',
+            constraint=models.UniqueConstraint(fields=('dzien', 'lekarz', 'apgar_5min'), name='apgardnia_dzien_lekarz_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='pomiarydnia',
+            index=models.Index(fields=['lekarz', 'dzien'], name='pomiarydnia_lekarz_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pomiarydnia',
+            constraint=models.UniqueConstraint(fields=('dzien', 'lekarz'), name='pomiarydnia_dzien_lekarz_uniq'),
+        ),
+    ]
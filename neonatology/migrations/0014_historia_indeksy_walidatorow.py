@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('neonatology', '0013_statystyki_dzienne'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historicalapgarscore',
+            index=models.Index(fields=['dziecko', '-history_date'], name='neonatology_dziecko_b18c3f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicaldziecko',
+            index=models.Index(fields=['id', '-history_date'], name='neonatology_id_c43404_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicaldziecko',
+            index=models.Index(fields=['matka', '-history_date'], name='neonatology_matka_i_a4ef00_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicalmatka',
+            index=models.Index(fields=['id', '-history_date'], name='neonatology_id_a3e685_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicalparametryzewnetrzne',
+            index=models.Index(fields=['dziecko', '-history_date'], name='neonatology_dziecko_34c511_idx'),
+        ),
+    ]
@@ -4,6 +4,25 @@ from django.utils import timezone
 from simple_history import register
 from simple_history.models import HistoricalRecords
 
+
+class HistoriaZIndeksami(HistoricalRecords):
+    """`HistoricalRecords` z dodatkowymi indeksami tabeli historycznej.
+
+    `indeksy` to krotki pól, np. ``(('lekarz', '-history_date'),)`` - pozwalają
+    czytać najnowsze zmiany danego użytkownika bez sortowania całej tabeli.
+    """
+
+    def __init__(self, *args, indeksy=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.indeksy = indeksy
+
+    def get_meta_options(self, model):
+        meta_fields = super().get_meta_options(model)
+        meta_fields['indexes'] = tuple(meta_fields.get('indexes', ())) + tuple(
+            models.Index(fields=list(pola)) for pola in self.indeksy)
+        return meta_fields
+
+
 # --- 1. Tabela Matka (Mother) ---
 class Matka(models.Model):
     pesel = models.CharField(max_length=11, unique=True)
@@ -12,7 +31,13 @@ class Matka(models.Model):
     grupa_krwi = models.CharField(max_length=5, blank=True)
     konflikt_serologiczny = models.BooleanField(default=False, help_text='Czy występuje konflikt serologiczny (np. Rh)')
 
-    history = HistoricalRecords()
+    # Najnowsza zmiana matki - walidator stron szczegółów (warunkowe.py)
+    history = HistoriaZIndeksami(indeksy=[('id', '-history_date')])
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nazwisko', 'imie'], name='matka_nazwisko_imie_idx'),
+        ]
 
     def __str__(self):
         return f"{self.imie} {self.nazwisko} ({self.pesel})"
@@ -27,7 +52,17 @@ class Dziecko(models.Model):
     matka = models.ForeignKey(Matka, on_delete=models.CASCADE, related_name='dzieci', blank=True, null=True)
     grupa_krwi = models.CharField(max_length=5, blank=True, help_text='Grupa krwi dziecka (np. A+, B-, 0+)')
 
-    history = HistoricalRecords()
+    history = HistoriaZIndeksami(indeksy=[('history_user', '-history_date'), ('id', '-history_date'),
+                                          ('matka', '-history_date')])
+
+    class Meta:
+        indexes = [
+            # Listy (raporty, eksport, admin) sortowane po (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='dziecko_created_idx'),
+            models.Index(fields=['matka', '-data_urodzenia', '-id'], name='dziecko_matka_urodz_idx'),
+            # Przeliczanie urodzeń danego dnia (statystyki.py) i filtry daty urodzenia
+            models.Index(fields=['data_urodzenia'], name='dziecko_urodzenia_idx'),
+        ]
 
     def __str__(self):
         return f"{self.imie} ({self.data_urodzenia})"
@@ -45,7 +80,14 @@ class ParametryZewnetrzne(models.Model):
     oddechy_na_min = models.IntegerField()
     natlenienie_spO2 = models.IntegerField()
 
-    history = HistoricalRecords()
+    history = HistoriaZIndeksami(indeksy=[('lekarz', '-history_date'), ('dziecko', '-history_date')])
+
+    class Meta:
+        indexes = [
+            # Najnowszy rekord dziecka: ORDER BY data_pomiaru DESC, id DESC
+            models.Index(fields=['dziecko', '-data_pomiaru', '-id'], name='parametry_dziecko_data_idx'),
+            models.Index(fields=['lekarz', 'data_pomiaru'], name='parametry_lekarz_data_idx'),
+        ]
 
     def __str__(self):
         return f"Parametry dla {self.dziecko.imie} z {self.data_pomiaru.date()}"
@@ -60,7 +102,141 @@ class APGARScore(models.Model):
     apgar_5min = models.IntegerField(help_text="Wynik po 5 minutach")
     apgar_10min = models.IntegerField(null=True, blank=True)
 
-    history = HistoricalRecords()
+    history = HistoriaZIndeksami(indeksy=[('lekarz', '-history_date'), ('dziecko', '-history_date')])
+
+    class Meta:
+        indexes = [
+            # Najnowszy rekord dziecka: ORDER BY data_pomiaru DESC, id DESC
+            models.Index(fields=['dziecko', '-data_pomiaru', '-id'], name='apgar_dziecko_data_idx'),
+            models.Index(fields=['lekarz', 'data_pomiaru'], name='apgar_lekarz_data_idx'),
+        ]
 
     def __str__(self):
         return f"APGAR dla {self.dziecko.imie}: {self.apgar_5min} (5min)"
+
+# --- 4. Migawka statusu dziecka (utrzymywana przez sygnały, zob. triage.py) ---
+class StatusDziecka(models.Model):
+    # Kolejność alfabetyczna wartości odpowiada kolejności pilności
+    HOSPITALIZACJA = 'Hospitalizacja'
+    MONITOROWANIE = 'Monitorowanie'
+    W_NORMIE = 'Parametry w normie'
+    STATUS_CHOICES = [
+        (HOSPITALIZACJA, 'Hospitalizacja'),
+        (MONITOROWANIE, 'Monitorowanie'),
+        (W_NORMIE, 'Parametry w normie'),
+    ]
+
+    dziecko = models.OneToOneField(Dziecko, on_delete=models.CASCADE, primary_key=True, related_name='status')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=W_NORMIE)
+    werdykt = models.TextField()
+    waga_kg = models.FloatField(null=True, blank=True)
+    natlenienie_spO2 = models.IntegerField(null=True, blank=True)
+    apgar_5min = models.IntegerField(null=True, blank=True)
+    liczba_pomiarow = models.IntegerField(default=0)
+    liczba_apgar = models.IntegerField(default=0)
+    konflikt_serologiczny = models.BooleanField(default=False)
+    zaktualizowano = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'dziecko'], name='statusdziecka_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dziecko_id}: {self.status}"
+
+# --- 5. Stan importu przyrostowego (zob. import_przyrostowy.py) ---
+class PunktKontrolnyImportu(models.Model):
+    plik = models.CharField(max_length=255, unique=True)
+    offset = models.BigIntegerField(default=0, help_text='Bajt, do którego import jest zatwierdzony')
+    wiersz = models.BigIntegerField(default=0, help_text='Liczba zatwierdzonych wierszy danych')
+    hash_prefiksu = models.CharField(max_length=64, blank=True, help_text='SHA-256 bajtów [0, offset)')
+    hash_pliku = models.CharField(max_length=64, blank=True, help_text='SHA-256 całego pliku przy ostatnim imporcie')
+    zakonczony = models.BooleanField(default=False)
+    zaktualizowano = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.plik} @ {self.offset}"
+
+
+class OdciskWiersza(models.Model):
+    zrodlo = models.CharField(max_length=20)
+    id_zrodla = models.CharField(max_length=64)
+    odcisk = models.CharField(max_length=32)
+    obiekt_id = models.BigIntegerField(help_text='Klucz główny rekordu utworzonego z wiersza')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['zrodlo', 'id_zrodla'], name='odciskwiersza_zrodlo_id_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.zrodlo}:{self.id_zrodla}"
+
+
+# --- 6. Indeks wyszukiwania pacjentów (utrzymywany przez sygnały, zob. wyszukiwanie.py) ---
+class HasloWyszukiwania(models.Model):
+    TYP_CHOICES = [('matka', 'Matka'), ('dziecko', 'Dziecko')]
+    typ = models.CharField(max_length=7, choices=TYP_CHOICES)
+    obiekt_id = models.BigIntegerField()
+    pole = models.CharField(max_length=10)
+    tekst = models.CharField(max_length=100, help_text='Słowo małymi literami, bez znaków diakrytycznych')
+
+    class Meta:
+        indexes = [
+            # Wyszukiwanie prefiksowe: tekst >= 'kow' AND tekst < 'kox'
+            models.Index(fields=['tekst', 'typ', 'obiekt_id'], name='haslo_tekst_idx'),
+            # To samo w obrębie jednego typu (podpowiedzi matek w formularzu dziecka)
+            models.Index(fields=['typ', 'tekst', 'obiekt_id'], name='haslo_typ_tekst_idx'),
+            models.Index(fields=['typ', 'obiekt_id'], name='haslo_obiekt_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.typ}:{self.obiekt_id} {self.pole}={self.tekst}"
+
+
+# --- 7. Zestawienia dzienne dla statystyk (utrzymywane przez sygnały, zob. statystyki.py) ---
+class UrodzeniaDnia(models.Model):
+    dzien = models.DateField(unique=True)
+    urodzenia = models.IntegerField(default=0)
+    zwazone = models.IntegerField(default=0, help_text='Dzieci z co najmniej jednym pomiarem')
+    niska_waga = models.IntegerField(default=0, help_text='Dzieci, których pierwszy pomiar wagi jest poniżej progu')
+
+    def __str__(self):
+        return f"{self.dzien}: {self.urodzenia}"
+
+
+class PomiaryDnia(models.Model):
+    dzien = models.DateField()
+    lekarz = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='+')
+    pomiary = models.IntegerField(default=0)
+    niskie_spo2 = models.IntegerField(default=0, help_text='Pomiary z SpO2 poniżej progu')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dzien', 'lekarz'], name='pomiarydnia_dzien_lekarz_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['lekarz', 'dzien'], name='pomiarydnia_lekarz_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dzien} {self.lekarz_id}: {self.pomiary}"
+
+
+class ApgarDnia(models.Model):
+    dzien = models.DateField()
+    lekarz = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='+')
+    apgar_5min = models.IntegerField()
+    liczba = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dzien', 'lekarz', 'apgar_5min'], name='apgardnia_dzien_lekarz_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['lekarz', 'dzien'], name='apgardnia_lekarz_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dzien} {self.lekarz_id}: APGAR {self.apgar_5min} x{self.liczba}"
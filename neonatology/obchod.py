@@ -0,0 +1,90 @@
+"""Obchód - zbiorcze wprowadzanie pomiarów dla wielu dzieci naraz.
+
+Cały formularz obchodu jest walidowany razem, a wpisane wiersze zapisywane
+w jednej transakcji: pomiary i ich wiersze historii idą porcjami przez
+`bulk_create_with_history`. `bulk_create` nie wysyła sygnałów post_save,
+więc migawki statusu i zestawienia statystyk są przeliczane tu, raz dla
+wszystkich dzieci. Werdykt każdego wiersza jest liczony jednym wywołaniem
+`ocen_wsadowo` dla całego obchodu.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+
+from .eksport import filtruj_dzieci
+from .models import Dziecko, ParametryZewnetrzne, StatusDziecka
+from .queries import POLA_PRZENOSZONE, dzieci_do_obchodu
+from .reguly import ocen_wsadowo, status_z_kodu, tekst_werdyktu
+from .statystyki import dzien, odswiez_statystyki
+from .triage import odswiez_statusy
+
+# Najwięcej dzieci na jednym formularzu obchodu
+MAKS_WIERSZY = 100
+# Domyślnie obchód obejmuje dzieci urodzone w ostatnich dniach
+DNI_OBCHODU = 7
+ROZMIAR_PORCJI = 500
+
+
+def dzieci_obchodu(parametry):
+    """Dzieci do formularza obchodu i informacja, czy lista została ucięta.
+
+    `parametry` - filtry jak w panelu raportów (`filtruj_dzieci`); bez
+    ``data_od`` i ``data_do`` brane są dzieci z ostatnich `DNI_OBCHODU` dni.
+    """
+    dzieci = filtruj_dzieci(Dziecko.objects.all(), parametry)
+    if not parametry.get('data_od') and not parametry.get('data_do'):
+        dzieci = dzieci.filter(data_urodzenia__gte=timezone.localdate() - timedelta(days=DNI_OBCHODU))
+    dzieci = list(dzieci_do_obchodu(dzieci).order_by('data_urodzenia', 'id')[:MAKS_WIERSZY + 1])
+    return dzieci[:MAKS_WIERSZY], len(dzieci) > MAKS_WIERSZY
+
+
+def wartosci_poczatkowe(dzieci):
+    """Dane początkowe wierszy: id dziecka i pola przepisane z ostatniego pomiaru (waga i SpO2 puste)."""
+    poczatkowe = []
+    for dziecko in dzieci:
+        wiersz = {'dziecko': dziecko.pk}
+        for pole in POLA_PRZENOSZONE:
+            wartosc = getattr(dziecko, f'ost_{pole}')
+            if wartosc is not None:
+                wiersz[pole] = wartosc
+        poczatkowe.append(wiersz)
+    return poczatkowe
+
+
+def zapisz_obchod(pomiary, lekarz):
+    """Zapisuje niezapisane pomiary obchodu i przelicza dane pochodne w jednej transakcji.
+
+    Zwraca zapisane pomiary (``data_pomiaru`` ustawia `auto_now_add` przy wstawianiu).
+    """
+    for pomiar in pomiary:
+        pomiar.lekarz = lekarz
+    ids = {pomiar.dziecko_id for pomiar in pomiary}
+    with transaction.atomic():
+        bulk_create_with_history(pomiary, ParametryZewnetrzne, batch_size=ROZMIAR_PORCJI, default_user=lekarz)
+        odswiez_statusy(ids)
+        odswiez_statystyki(dzieci_ids=ids,
+                           pomiary={(dzien(pomiar.data_pomiaru), pomiar.lekarz_id) for pomiar in pomiary})
+    return pomiary
+
+
+def werdykty_obchodu(pomiary):
+    """Lista (pomiar, status, werdykt) - reguły oceniane naraz dla wszystkich wierszy.
+
+    APGAR po 5 minutach to ostatni wynik dziecka z migawki statusu (brak = wartość
+    domyślna reguły, jak w `sprawdz_parametry`).
+    """
+    apgar = dict(StatusDziecka.objects.filter(dziecko_id__in={p.dziecko_id for p in pomiary})
+                 .values_list('dziecko_id', 'apgar_5min'))
+    kody = ocen_wsadowo(
+        np.array([p.waga_kg for p in pomiary], dtype=np.float64),
+        np.array([p.natlenienie_spO2 for p in pomiary], dtype=np.float64),
+        np.array([apgar.get(p.dziecko_id) for p in pomiary], dtype=np.float64),
+    )
+    return [
+        (pomiar, status_z_kodu(kod),
+         tekst_werdyktu(kod, waga_kg=pomiar.waga_kg, natlenienie_spO2=pomiar.natlenienie_spO2))
+        for pomiar, kod in zip(pomiary, kody.tolist())
+    ]
@@ -0,0 +1,203 @@
+"""Wersjonowana pamięć podręczna panelu raportów.
+
+W pamięci podręcznej Django (domyślnie alias ``default``; działa z
+``LocMemCache`` i ``FileBasedCache``) trzymane są dwa rodzaje fragmentów:
+
+- wiersz tabeli dziecka - klucz zawiera wersję dziecka, więc po zmianie
+  dziecka, jego matki, pomiaru lub APGAR stary wiersz przestaje być
+  używany, a niezmienione wiersze nigdy nie są liczone ponownie;
+- cała tabela strony (wiersze + stronicowanie) dla danych parametrów GET -
+  klucz zawiera wersję listy (skład i kolejność stron), a wpis pamięta
+  wersje pokazanych dzieci i jest ważny, dopóki żadna z nich się nie zmieni.
+
+Wersje to liczniki (``time.time_ns()``) podbijane po zatwierdzeniu
+transakcji przez `odswiez_statusy` i sygnały zapisu/usunięcia. Klucz
+wersji, który wypadł z pamięci, dostaje nową wartość - fragmenty zapisane
+pod starą wersją nie zostaną wtedy omyłkowo użyte.
+
+Fragmenty policzone z odczytów z repliki (repliki.py) są zapisywane tylko
+wtedy, gdy wszystkie ich wersje są starsze niż migawka repliki
+(`pozycja_repliki`, zapisywana przez `odswiez_replike`): replika zawiera
+już zmianę, po której podbito wersję, a późniejsza zmiana podbije ją
+ponownie. Fragmenty zmienione po migawce są liczone z repliki bez zapisu
+aż do następnego odświeżenia; przy replice bez znanej pozycji (replikacja
+serwera baz danych) nic nie jest zapisywane.
+
+Klucze wersji nie mają czasu życia i muszą przetrwać dłużej niż fragmenty:
+backendy z limitem wpisów (``MAX_ENTRIES``) usuwają przy przepełnieniu
+dowolne klucze, a wersja utworzona od nowa osieroca wszystkie fragmenty
+zapisane pod poprzednią. Dlatego wersje mogą leżeć w osobnym aliasie
+(``RAPORTY_CACHE_WERSJE``) z limitem większym niż liczba dzieci - ostrzega o
+tym `checks.sprawdz_pamiec_raportow`.
+
+Ustawienia (opcjonalne): ``RAPORTY_CACHE`` (alias pamięci fragmentów),
+``RAPORTY_CACHE_WERSJE`` (alias pamięci wersji, domyślnie ten sam) i
+``RAPORTY_CACHE_TIMEOUT`` (czas życia fragmentów w sekundach).
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .repliki import czyta_z_repliki, pozycja_repliki
+
+PREFIKS = 'raporty'
+DOMYSLNY_CZAS_ZYCIA = 24 * 3600
+KLUCZ_POKOLENIA = f'{PREFIKS}:pokolenie'
+KLUCZ_LISTY = f'{PREFIKS}:lista'
+# Parametry GET, od których zależy zawartość tabeli
+PARAMETRY_TABELI = ('status', 'sortuj', 'grupa_krwi', 'data_od', 'data_do', 'po', 'przed', 'ostatnia')
+
+_statystyki = Counter()
+_blokada = threading.Lock()
+
+
+def alias_fragmentow():
+    return getattr(settings, 'RAPORTY_CACHE', 'default')
+
+
+def alias_wersji():
+    return getattr(settings, 'RAPORTY_CACHE_WERSJE', None) or alias_fragmentow()
+
+
+def _pamiec():
+    return caches[alias_fragmentow()]
+
+
+def _pamiec_wersji():
+    return caches[alias_wersji()]
+
+
+def _czas_zycia():
+    return getattr(settings, 'RAPORTY_CACHE_TIMEOUT', DOMYSLNY_CZAS_ZYCIA)
+
+
+def _klucz_dziecka(pk):
+    return f'{PREFIKS}:dziecko:{pk}'
+
+
+def _zlicz(fragment, trafienia, chybienia):
+    with _blokada:
+        _statystyki[(fragment, 'hit')] += trafienia
+        _statystyki[(fragment, 'miss')] += chybienia
+
+
+def statystyki():
+    """Liczniki trafień i chybień w tym procesie: ``{(fragment, 'hit'|'miss'): liczba}``."""
+    with _blokada:
+        return dict(_statystyki)
+
+
+def _wersje(klucze):
+    """Aktualne wersje kluczy; brakujące są inicjowane nową wartością."""
+    pamiec = _pamiec_wersji()
+    wersje = pamiec.get_many(klucze)
+    brakujace = [klucz for klucz in klucze if klucz not in wersje]
+    if brakujace:
+        nowa = time.time_ns()
+        for klucz in brakujace:
+            # add - nie nadpisuje wersji ustawionej równolegle przez inny proces
+            pamiec.add(klucz, nowa, timeout=None)
+        wersje.update(pamiec.get_many(brakujace))
+    return wersje
+
+
+def _podbij(klucze):
+    if klucze:
+        _pamiec_wersji().set_many(dict.fromkeys(klucze, time.time_ns()), timeout=None)
+
+
+def uniewaznij_dzieci(dziecko_ids, zmiana_listy=False):
+    """Unieważnia wiersze dzieci (i strony, które je pokazują) po zatwierdzeniu transakcji.
+
+    ``zmiana_listy`` - zmiana może przesunąć dzieci między stronami lub
+    filtrami (nowe dziecko, zmiana statusu), więc unieważnia wszystkie strony.
+    """
+    klucze = [_klucz_dziecka(pk) for pk in dziecko_ids if pk is not None]
+    if zmiana_listy:
+        klucze.append(KLUCZ_LISTY)
+    if klucze:
+        transaction.on_commit(lambda: _podbij(klucze))
+
+
+def uniewaznij_liste():
+    transaction.on_commit(lambda: _podbij([KLUCZ_LISTY]))
+
+
+def uniewaznij_wszystko():
+    """Unieważnia wszystkie fragmenty (np. po przeliczeniu całej tabeli statusów)."""
+    transaction.on_commit(lambda: _podbij([KLUCZ_POKOLENIA]))
+
+
+class PamiecRaportow:
+    """Fragmenty panelu raportów dla jednego żądania.
+
+    Wersje pokolenia i listy są czytane przy tworzeniu obiektu, czyli przed
+    zapytaniami o dane - fragment policzony z nieaktualnych danych trafia
+    więc najwyżej pod starą wersję. Przy odczycie z repliki ``granica`` to
+    jej migawka - najnowsza wersja, którą replika na pewno zawiera (None,
+    gdy nieznana).
+    """
+
+    def __init__(self, parametry):
+        self.pamiec = _pamiec()
+        wersje = _wersje([KLUCZ_POKOLENIA, KLUCZ_LISTY])
+        self.pokolenie = wersje[KLUCZ_POKOLENIA]
+        opis = '&'.join(f'{nazwa}={parametry.get(nazwa, "")}' for nazwa in PARAMETRY_TABELI)
+        skrot = hashlib.sha1(opis.encode('utf-8')).hexdigest()
+        self.wersja_listy = wersje[KLUCZ_LISTY]
+        self.klucz_tabeli = f'{PREFIKS}:tabela:{self.pokolenie}:{self.wersja_listy}:{skrot}'
+        self.wersje_wierszy = {}
+        self.z_repliki = czyta_z_repliki()
+        self.granica = pozycja_repliki() if self.z_repliki else None
+
+    def _do_zapisu(self, *wersje):
+        # Z bazy podstawowej zapisywane jest wszystko; z repliki - gdy żadna wersja nie jest młodsza niż migawka
+        if not self.z_repliki:
+            return True
+        return self.granica is not None and max(self.pokolenie, *wersje) <= self.granica
+
+    def tabela(self):
+        """HTML tabeli z pamięci albo None, gdy brak wpisu lub któreś dziecko się zmieniło."""
+        wpis = self.pamiec.get(self.klucz_tabeli)
+        if wpis is not None:
+            wersje = _wersje([_klucz_dziecka(pk) for pk in wpis['wersje']])
+            if all(wersje[_klucz_dziecka(pk)] == wersja for pk, wersja in wpis['wersje'].items()):
+                _zlicz('tabela', 1, 0)
+                return wpis['html']
+        _zlicz('tabela', 0, 1)
+        return None
+
+    def wiersze(self, dziecko_ids, pobierz, renderuj):
+        """HTML wierszy dzieci w kolejności `dziecko_ids`.
+
+        Brakujące wiersze są liczone przez ``renderuj(pobierz(ids)[pk])``;
+        `pobierz` jest wołane po odczycie wersji, więc dane są co najmniej
+        tak świeże jak wersja, pod którą wiersz zostanie zapisany.
+        """
+        wersje = _wersje([_klucz_dziecka(pk) for pk in dziecko_ids])
+        self.wersje_wierszy = {pk: wersje[_klucz_dziecka(pk)] for pk in dziecko_ids}
+        klucze = {pk: f'{PREFIKS}:wiersz:{self.pokolenie}:{pk}:{wersja}' for pk, wersja in self.wersje_wierszy.items()}
+        gotowe = self.pamiec.get_many(list(klucze.values()))
+        brakujace = [pk for pk in dziecko_ids if klucze[pk] not in gotowe]
+        _zlicz('wiersz', len(dziecko_ids) - len(brakujace), len(brakujace))
+
+        html = {pk: gotowe[klucz] for pk, klucz in klucze.items() if klucz in gotowe}
+        if brakujace:
+            obiekty = pobierz(brakujace)
+            nowe = {pk: renderuj(obiekty[pk]) for pk in brakujace if pk in obiekty}
+            do_zapisu = {klucze[pk]: fragment for pk, fragment in nowe.items()
+                         if self._do_zapisu(self.wersje_wierszy[pk])}
+            if do_zapisu:
+                self.pamiec.set_many(do_zapisu, timeout=_czas_zycia())
+            html.update(nowe)
+        return [html[pk] for pk in dziecko_ids if pk in html]
+
+    def zapisz_tabele(self, html):
+        """Zapamiętuje tabelę razem z wersjami wierszy z ostatniego `wiersze`."""
+        if self._do_zapisu(self.wersja_listy, *self.wersje_wierszy.values()):
+            self.pamiec.set(self.klucz_tabeli, {'html': html, 'wersje': self.wersje_wierszy}, timeout=_czas_zycia())
@@ -0,0 +1,114 @@
+"""Warstwa dostępu do danych dla widoków raportowych.
+
+Zapytania są budowane zbiorowo (Subquery/OuterRef), tak aby liczba zapytań
+SQL nie zależała od liczby dzieci w bazie.
+"""
+from django.db import connection
+from django.db.models import CharField, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Dziecko, ParametryZewnetrzne, APGARScore
+
+
+def _ostatni(model, pole):
+    """Podzapytanie zwracające `pole` z najnowszego rekordu `model` dla dziecka."""
+    return Subquery(
+        model.objects.filter(dziecko=OuterRef('pk'))
+        .order_by('-data_pomiaru', '-id')
+        .values(pole)[:1]
+    )
+
+
+def _liczba(model):
+    """Podzapytanie zliczające rekordy `model` należące do dziecka."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(dziecko=OuterRef('pk'))
+            .order_by()
+            .values('dziecko')
+            .annotate(n=Count('pk'))
+            .values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def dzieci_z_ostatnimi_pomiarami(queryset=None):
+    """Zwraca dzieci z adnotacjami ostatniego pomiaru i ostatniego wyniku APGAR.
+
+    Dodawane pola (None, gdy dziecko nie ma jeszcze danego rekordu):
+    ``ost_waga_kg``, ``ost_natlenienie_spO2``, ``ost_apgar_5min`` oraz liczniki
+    ``liczba_pomiarow`` i ``liczba_apgar``. Całość to jedno zapytanie SQL,
+    więc można je bezpiecznie stronicować po stronie bazy.
+    """
+    if queryset is None:
+        queryset = Dziecko.objects.all()
+    return queryset.select_related('matka').annotate(
+        ost_waga_kg=_ostatni(ParametryZewnetrzne, 'waga_kg'),
+        ost_natlenienie_spO2=_ostatni(ParametryZewnetrzne, 'natlenienie_spO2'),
+        ost_apgar_5min=_ostatni(APGARScore, 'apgar_5min'),
+        liczba_pomiarow=_liczba(ParametryZewnetrzne),
+        liczba_apgar=_liczba(APGARScore),
+    )
+
+
+
+# Pola ostatniego pomiaru przepisywane do nowego wiersza obchodu
+POLA_PRZENOSZONE = ('wzrost_cm', 'czy_wczesniak', 'obwod_glowy_cm', 'oddechy_na_min')
+
+
+def dzieci_do_obchodu(queryset=None):
+    """Jak `dzieci_z_ostatnimi_pomiarami`, dodatkowo z polami ``ost_<pole>`` z `POLA_PRZENOSZONE`."""
+    return dzieci_z_ostatnimi_pomiarami(queryset).annotate(
+        **{f'ost_{pole}': _ostatni(ParametryZewnetrzne, pole) for pole in POLA_PRZENOSZONE}
+    )
+
+def _zmiany(historia, typ, dziecko, imie, nazwisko_matki, a=None, b=None):
+    """Jedno ramię unii `ostatnie_zmiany` - identyczny zestaw kolumn dla każdej tabeli."""
+    return historia.order_by().values(
+        data=F('history_date'),
+        typ=Value(typ, output_field=CharField()),
+        id_dziecka=F(dziecko),
+        imie_dziecka=F(imie),
+        nazwisko_matki=F(nazwisko_matki),
+        a=F(a) if a else Value(None, output_field=FloatField()),
+        b=F(b) if b else Value(None, output_field=FloatField()),
+    )
+
+
+def ostatnie_zmiany(uzytkownik, limit=20):
+    """Zwraca listę `limit` najnowszych zmian (zob. `zapytanie_ostatnich_zmian`)."""
+    return list(zapytanie_ostatnich_zmian(uzytkownik, limit))
+
+
+def zapytanie_ostatnich_zmian(uzytkownik, limit=20):
+    """Zapytanie o `limit` najnowszych zmian dotyczących pracy użytkownika.
+
+    Zmiany dzieci, które użytkownik badał (lub sam edytował), oraz zmiany jego
+    pomiarów i wyników APGAR - jedna unia tabel historycznych posortowana po
+    ``history_date``. Indeksy (użytkownik, -history_date) ograniczają koszt
+    każdego ramienia; tam, gdzie baza na to pozwala, każde ramię ma też
+    własny LIMIT.
+    """
+    ramiona = [
+        _zmiany(
+            Dziecko.history.filter(
+                Q(history_user=uzytkownik)
+                | Q(id__in=ParametryZewnetrzne.objects.filter(lekarz=uzytkownik).values('dziecko_id'))
+            ),
+            'Dziecko', 'id', 'imie', 'matka__nazwisko',
+        ),
+        _zmiany(
+            ParametryZewnetrzne.history.filter(lekarz=uzytkownik), 'Parametry',
+            'dziecko_id', 'dziecko__imie', 'dziecko__matka__nazwisko', 'waga_kg', 'natlenienie_spO2',
+        ),
+        _zmiany(
+            APGARScore.history.filter(lekarz=uzytkownik), 'APGAR',
+            'dziecko_id', 'dziecko__imie', 'dziecko__matka__nazwisko', 'apgar_1min', 'apgar_5min',
+        ),
+    ]
+    if connection.features.supports_slicing_ordering_in_compound:
+        ramiona = [ramie.order_by('-data')[:limit] for ramie in ramiona]
+    pierwsze, *reszta = ramiona
+    return pierwsze.union(*reszta, all=True).order_by('-data')[:limit]
@@ -0,0 +1,81 @@
+"""Deklaratywna tabela reguł medycznych i jej wektorowa ewaluacja.
+
+Każda reguła porównuje jedną kolumnę z progiem; wynik oceny to maska bitowa
+(kod werdyktu), w której każdy ustawiony bit oznacza jedną spełnioną regułę.
+Ta sama tabela służy do oceny pojedynczego rekordu (`sprawdz_parametry`)
+i całych kolumn NumPy (`ocen_wsadowo`).
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Regula = namedtuple('Regula', ['kod', 'pole', 'prog', 'domyslnie', 'status', 'komunikat'])
+
+HOSPITALIZACJA = 'Hospitalizacja'
+MONITOROWANIE = 'Monitorowanie'
+W_NORMIE = 'Parametry w normie'
+
+# Reguła jest spełniona, gdy wartość pola < próg. `domyslnie` to wartość
+# przyjmowana przy braku pola w `sprawdz_parametry` (zachowanie historyczne).
+REGULY = (
+    Regula(1, 'apgar_5min', 7, 10, HOSPITALIZACJA,
+           "Niska ocena APGAR (poniżej 7 w 5. minucie). Wymagana hospitalizacja i monitorowania."),
+    Regula(2, 'waga_kg', 2.5, 0, MONITOROWANIE,
+           "Niska masa urodzeniowa ({waga_kg} kg). Niezbędne monitorowanie karmienia i przyrostów."),
+    Regula(4, 'natlenienie_spO2', 92, 100, MONITOROWANIE,
+           "Niskie natlenienie krwi ({natlenienie_spO2}%). Wymagane dodatkowe badania saturacji i oddechu."),
+)
+
+KOD_W_NORMIE = 0
+WERDYKT_W_NORMIE = "Parametry w normie. Dziecko nie wymaga dodatkowej interwencji."
+NAGLOWEK_UWAGA = "UWAGA, NIEPRAWIDŁOWE PARAMETRY:\n"
+
+# Kolejność statusów od najpilniejszego
+PRIORYTET_STATUSOW = (HOSPITALIZACJA, MONITOROWANIE)
+
+
+def _kolumna(wartosci, domyslnie):
+    kolumna = np.asarray(wartosci, dtype=np.float64)
+    if domyslnie is not None:
+        kolumna = np.where(np.isnan(kolumna), domyslnie, kolumna)
+    return kolumna
+
+
+def ocen_wsadowo(waga_kg, natlenienie_spO2, apgar_5min, uzupelnij_braki=True):
+    """Ocenia całe kolumny naraz i zwraca wektor kodów werdyktu (uint8).
+
+    Braki oznacza się jako NaN (lub None). Przy ``uzupelnij_braki=True``
+    są zastępowane wartością ``domyslnie`` z tabeli reguł - tak jak robi to
+    `sprawdz_parametry`; przy ``False`` brak danych nigdy nie spełnia reguły
+    (tak liczony jest status dziecka).
+    """
+    kolumny = {
+        'waga_kg': waga_kg,
+        'natlenienie_spO2': natlenienie_spO2,
+        'apgar_5min': apgar_5min,
+    }
+    kody = None
+    for regula in REGULY:
+        kolumna = _kolumna(kolumny[regula.pole], regula.domyslnie if uzupelnij_braki else None)
+        if kody is None:
+            kody = np.zeros(kolumna.shape, dtype=np.uint8)
+        # NaN < próg daje False, więc brak danych nie ustawia bitu
+        kody |= np.where(kolumna < regula.prog, np.uint8(regula.kod), np.uint8(0))
+    return kody
+
+
+def status_z_kodu(kod):
+    """Zwraca status odpowiadający kodowi werdyktu."""
+    statusy = {regula.status for regula in REGULY if kod & regula.kod}
+    for status in PRIORYTET_STATUSOW:
+        if status in statusy:
+            return status
+    return W_NORMIE
+
+
+def tekst_werdyktu(kod, **wartosci):
+    """Składa tekst werdyktu z kodu; `wartosci` wypełniają komunikaty reguł."""
+    if kod == KOD_W_NORMIE:
+        return WERDYKT_W_NORMIE
+    zalecenie = [regula.komunikat.format(**wartosci) for regula in REGULY if kod & regula.kod]
+    return NAGLOWEK_UWAGA + "\n".join(zalecenie)
@@ -0,0 +1,263 @@
+"""Kierowanie odczytów raportowych do repliki bazy danych.
+
+Zapisy zawsze idą do bazy podstawowej. Do repliki (alias ``REPLIKA_BAZY``,
+domyślnie ``'replika'``, o ile jest w ``DATABASES``) trafiają tylko odczyty
+z bloków, które na to zezwalają: widoków oznaczonych `odczyt_z_repliki`
+(dla GET/HEAD) i komend w `z_repliki()`. Bez repliki w ustawieniach
+wszystko działa na bazie podstawowej.
+
+Odczyt po zapisie: gdy w bloku coś zostało zapisane, dalsze odczyty tego
+bloku idą do bazy podstawowej. `PrzyklejenieMiddleware` po żądaniu z
+zapisem ustawia ciasteczko, z którym kolejne żądania klienta (np.
+przekierowanie na `szczegoly_noworodka` po edycji) przez
+``REPLIKA_PRZYKLEJENIE`` sekund czytają z bazy podstawowej.
+
+Lokalnie replika może być drugim plikiem SQLite odświeżanym komendą
+``odswiez_replike`` (API kopii zapasowych SQLite, `odswiez_replike`).
+"""
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+CIASTECZKO = 'replika_po'
+# Tabela w kopii tworzonej przez `odswiez_replike` - znacznik czasu migawki
+TABELA_POZYCJI = 'neonatology_pozycja_repliki'
+DOMYSLNE_PRZYKLEJENIE = 30  # sekundy
+
+
+def alias_repliki():
+    """Alias repliki albo None, gdy replika nie jest skonfigurowana."""
+    alias = getattr(settings, 'REPLIKA_BAZY', 'replika')
+    return alias if alias in settings.DATABASES and alias != DEFAULT_DB_ALIAS else None
+
+
+def _czas_przyklejenia():
+    return getattr(settings, 'REPLIKA_PRZYKLEJENIE', DOMYSLNE_PRZYKLEJENIE)
+
+
+class StanOdczytu:
+    """Stan żądania lub komendy; obiekt jest współdzielony z wątkami `sync_to_async`."""
+
+    def __init__(self, przyklejone=False):
+        self.z_repliki = False  # blok zezwala na odczyt z repliki
+        self.przyklejone = przyklejone  # klient niedawno zapisywał - czyta z bazy podstawowej
+        self.zapisano = False
+
+
+_stan = ContextVar('repliki_stan', default=None)
+
+
+def czyta_z_repliki():
+    """Czy odczyty w bieżącym kontekście idą do repliki."""
+    stan = _stan.get()
+    return bool(stan and stan.z_repliki and not stan.przyklejone and not stan.zapisano and alias_repliki())
+
+
+@contextmanager
+def z_repliki(przyklejone=False):
+    """Odczyty w bloku idą do repliki (poza żądaniem - np. w komendach - z nowym stanem)."""
+    stan = _stan.get()
+    token = None
+    if stan is None:
+        stan = StanOdczytu(przyklejone)
+        token = _stan.set(stan)
+    poprzednio = stan.z_repliki
+    stan.z_repliki = True
+    try:
+        yield stan
+    finally:
+        stan.z_repliki = poprzednio
+        if token is not None:
+            _stan.reset(token)
+
+
+@contextmanager
+def z_bazy_podstawowej():
+    """Odczyty w bloku idą do bazy podstawowej, a zapisy nie przyklejają klienta.
+
+    Dla danych pochodnych uzupełnianych w widoku odczytu (np. brakujących
+    migawek statusu) - liczone z repliki nadpisałyby świeższe dane w bazie
+    podstawowej, a to nie jest zapis użytkownika.
+    """
+    stan = _stan.get()
+    if stan is None:
+        yield
+        return
+    poprzednio = stan.z_repliki, stan.zapisano
+    stan.z_repliki = False
+    try:
+        yield
+    finally:
+        stan.z_repliki, stan.zapisano = poprzednio
+
+
+def odczyt_z_repliki(widok):
+    """Dekorator widoku: odczyty żądań GET/HEAD idą do repliki (POST zawsze do bazy podstawowej)."""
+    if iscoroutinefunction(widok):
+        @wraps(widok)
+        async def opakowany(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await widok(request, *args, **kwargs)
+            with z_repliki():
+                return await widok(request, *args, **kwargs)
+    else:
+        @wraps(widok)
+        def opakowany(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return widok(request, *args, **kwargs)
+            with z_repliki():
+                return widok(request, *args, **kwargs)
+    return opakowany
+
+
+def strumien_z_repliki(strumien):
+    """Generator odpowiedzi strumieniowej czytający z repliki.
+
+    Treść jest generowana już po powrocie z widoku (i z middleware), więc
+    każdy krok generatora dostaje własny blok `z_repliki`; przyklejenie
+    klienta jest zapamiętywane przy tworzeniu strumienia.
+    """
+    stan = _stan.get()
+    przyklejone = bool(stan and (stan.przyklejone or stan.zapisano))
+    strumien = iter(strumien)
+    while True:
+        with z_repliki(przyklejone):
+            try:
+                fragment = next(strumien)
+            except StopIteration:
+                return
+        yield fragment
+
+
+class RouterReplik:
+    """Router baz danych (``DATABASE_ROUTERS = ['neonatology.repliki.RouterReplik']``)."""
+
+    def db_for_read(self, model, **hints):
+        return alias_repliki() if czyta_z_repliki() else None
+
+    def db_for_write(self, model, **hints):
+        stan = _stan.get()
+        if stan is not None:
+            stan.zapisano = True
+        # Jawnie - inaczej obiekt wczytany z repliki byłby zapisywany do repliki
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replika to kopia bazy podstawowej - obiekty z obu są tymi samymi wierszami
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replika dostaje schemat razem z danymi
+        return False if db == alias_repliki() else None
+
+
+class PrzyklejenieMiddleware:
+    """Po żądaniu z zapisem klient przez ``REPLIKA_PRZYKLEJENIE`` sekund czyta z bazy podstawowej.
+
+    Powinien być po ``SessionMiddleware`` i ``AuthenticationMiddleware`` -
+    zapis sesji i ostatniego logowania nie przykleja klienta. Działa
+    synchronicznie i asynchronicznie (stan jest w zmiennej kontekstowej,
+    którą dziedziczą wątki `sync_to_async`).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asynchroniczny = iscoroutinefunction(get_response)
+        if self.asynchroniczny:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asynchroniczny:
+            return self.__acall__(request)
+        stan = self._stan_zadania(request)
+        token = _stan.set(stan)
+        try:
+            response = self.get_response(request)
+        finally:
+            _stan.reset(token)
+        return self._przyklej(stan, response)
+
+    async def __acall__(self, request):
+        stan = self._stan_zadania(request)
+        token = _stan.set(stan)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stan.reset(token)
+        return self._przyklej(stan, response)
+
+    def _stan_zadania(self, request):
+        try:
+            przyklejone = float(request.COOKIES.get(CIASTECZKO, '')) > time.time()
+        except ValueError:
+            przyklejone = False
+        return StanOdczytu(przyklejone)
+
+    def _przyklej(self, stan, response):
+        if stan.zapisano:
+            czas = _czas_przyklejenia()
+            response.set_cookie(CIASTECZKO, str(int(time.time() + czas)), max_age=czas,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+def pozycja_repliki():
+    """Czas (``time.time_ns()``), do którego replika na pewno zawiera zatwierdzone zapisy.
+
+    Zapisuje go w kopii `odswiez_replike`. None, gdy nie jest znany - np.
+    dla repliki serwera baz danych albo kopii zrobionej inaczej.
+    """
+    alias = alias_repliki()
+    if alias is None or connections[alias].vendor != 'sqlite':
+        return None
+    try:
+        with connections[alias].cursor() as kursor:
+            kursor.execute(f'SELECT migawka FROM {TABELA_POZYCJI}')
+            wiersz = kursor.fetchone()
+    except DatabaseError:
+        return None
+    return wiersz[0] if wiersz else None
+
+
+def odswiez_replike():
+    """Kopiuje bazę podstawową SQLite do pliku repliki; zwraca (rozmiar w bajtach, czas w sekundach).
+
+    Kopia powstaje w pliku tymczasowym przez API kopii zapasowych SQLite
+    (spójna migawka bez blokowania zapisów na czas kopiowania całego pliku),
+    dostaje tryb dziennika DELETE i atomowo zastępuje plik repliki - otwarte
+    połączenia do repliki czytają starą kopię do zamknięcia. Czas sprzed
+    rozpoczęcia kopii trafia do tabeli `TABELA_POZYCJI` (zob. `pozycja_repliki`).
+    """
+    alias = alias_repliki()
+    if alias is None:
+        raise RuntimeError('No replica database configured (add it to DATABASES or set REPLIKA_BAZY)')
+    for nazwa in (DEFAULT_DB_ALIAS, alias):
+        if connections[nazwa].vendor != 'sqlite':
+            raise RuntimeError(f'Database {nazwa!r} is not SQLite; use the replication of your database server')
+    cel = os.fspath(settings.DATABASES[alias]['NAME'])
+    tymczasowy = f'{cel}.nowa'
+
+    start = time.perf_counter()
+    zrodlo = connections[DEFAULT_DB_ALIAS]
+    zrodlo.ensure_connection()
+    # Wszystko zatwierdzone przed tą chwilą jest w kopii
+    migawka = time.time_ns()
+    with closing(sqlite3.connect(tymczasowy)) as kopia:
+        zrodlo.connection.backup(kopia)
+        with kopia:
+            kopia.execute(f'CREATE TABLE {TABELA_POZYCJI} (migawka INTEGER NOT NULL)')
+            kopia.execute(f'INSERT INTO {TABELA_POZYCJI} (migawka) VALUES (?)', (migawka,))
+        # Bez WAL: pozostawiony plik -wal starej repliki nie może zostać nałożony na nową
+        kopia.execute('PRAGMA journal_mode=DELETE')
+    os.replace(tymczasowy, cel)
+    connections[alias].close()
+    return os.path.getsize(cel), time.perf_counter() - start
@@ -0,0 +1,118 @@
+"""Sygnały utrzymujące dane pochodne (migawki statusu, indeks wyszukiwania, zestawienia) po zapisach."""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka, PomiaryDnia, ApgarDnia
+from .pamiec_raportow import uniewaznij_liste
+from .statystyki import dzien, odswiez_statystyki
+from .triage import odswiez_statusy
+from .wyszukiwanie import odswiez_hasla
+
+
+def odswiez_migawki(dziecko_ids):
+    """Przelicza statusy w transakcji zapisu - migawka jest zatwierdzana albo wycofywana razem z nim."""
+    ids = [pk for pk in dziecko_ids if pk is not None]
+    if ids:
+        odswiez_statusy(ids)
+
+
+def _usuwane_z_dzieckiem(origin):
+    # Kaskada z usuwanego dziecka (lub matki z dziećmi) - dziecko znika zaraz po swoich pomiarach,
+    # a migawka zapisana w trakcie kaskady wskazywałaby na usunięty wiersz
+    return getattr(origin, 'model', type(origin)) in (Dziecko, Matka)
+
+
+@receiver([post_save, post_delete], sender=ParametryZewnetrzne)
+@receiver([post_save, post_delete], sender=APGARScore)
+def pomiar_zmieniony(sender, instance, origin=None, **kwargs):
+    if not _usuwane_z_dzieckiem(origin):
+        odswiez_migawki([instance.dziecko_id])
+
+
+@receiver(post_save, sender=Dziecko)
+def dziecko_zapisane(sender, instance, **kwargs):
+    odswiez_migawki([instance.pk])
+    # Zmiana daty urodzenia lub grupy krwi może zmienić wyniki filtrów raportów
+    uniewaznij_liste()
+
+
+@receiver(post_delete, sender=Dziecko)
+def dziecko_usuniete(sender, instance, **kwargs):
+    # Wiersz znika ze stron raportów (migawkę statusu usuwa kaskada)
+    uniewaznij_liste()
+
+
+@receiver(post_save, sender=Matka)
+def matka_zapisana(sender, instance, **kwargs):
+    odswiez_migawki(Dziecko.objects.filter(matka_id=instance.pk).values_list('pk', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Matka)
+def matka_do_indeksu(sender, instance, **kwargs):
+    matka_id = instance.pk
+    transaction.on_commit(lambda: odswiez_hasla(matki_ids=[matka_id]))
+
+
+@receiver([post_save, post_delete], sender=Dziecko)
+def dziecko_do_indeksu(sender, instance, **kwargs):
+    dziecko_id = instance.pk
+    transaction.on_commit(lambda: odswiez_hasla(dzieci_ids=[dziecko_id]))
+
+
+def zaplanuj_statystyki(**koszyki):
+    """Przelicza wskazane wiersze zestawień (zob. `odswiez_statystyki`) po zatwierdzeniu transakcji."""
+    transaction.on_commit(lambda: odswiez_statystyki(**koszyki))
+
+
+@receiver(pre_save, sender=ParametryZewnetrzne)
+@receiver(pre_save, sender=APGARScore)
+def pomiar_przed_zapisem(sender, instance, raw=False, **kwargs):
+    # Widoki edycji zapisują bieżącego użytkownika jako lekarza - stary koszyk też trzeba przeliczyć
+    instance._poprzedni_koszyk = None
+    if not instance._state.adding and not raw:
+        instance._poprzedni_koszyk = sender.objects.filter(pk=instance.pk).values_list('data_pomiaru', 'lekarz_id').first()
+
+
+@receiver([post_save, post_delete], sender=ParametryZewnetrzne)
+@receiver([post_save, post_delete], sender=APGARScore)
+def pomiar_do_statystyk(sender, instance, **kwargs):
+    koszyki = {(dzien(instance.data_pomiaru), instance.lekarz_id)}
+    poprzedni = getattr(instance, '_poprzedni_koszyk', None)
+    if poprzedni:
+        koszyki.add((dzien(poprzedni[0]), poprzedni[1]))
+    if sender is ParametryZewnetrzne:
+        # Pierwszy pomiar wagi decyduje o niskiej masie urodzeniowej
+        zaplanuj_statystyki(dzieci_ids=[instance.dziecko_id], pomiary=koszyki)
+    else:
+        zaplanuj_statystyki(apgar=koszyki)
+
+
+@receiver(pre_save, sender=Dziecko)
+def dziecko_przed_zapisem(sender, instance, raw=False, **kwargs):
+    instance._poprzedni_dzien_urodzenia = None
+    if not instance._state.adding and not raw:
+        instance._poprzedni_dzien_urodzenia = (
+            Dziecko.objects.filter(pk=instance.pk).values_list('data_urodzenia', flat=True).first())
+
+
+@receiver(post_save, sender=Dziecko)
+def dziecko_do_statystyk(sender, instance, **kwargs):
+    poprzedni = getattr(instance, '_poprzedni_dzien_urodzenia', None)
+    zaplanuj_statystyki(dni_urodzen=[poprzedni] if poprzedni else [], dzieci_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Dziecko)
+def dziecko_usuniete_ze_statystyk(sender, instance, **kwargs):
+    zaplanuj_statystyki(dni_urodzen=[Dziecko._meta.get_field('data_urodzenia').to_python(instance.data_urodzenia)])
+
+
+@receiver(pre_delete, sender=User)
+def lekarz_usuwany(sender, instance, **kwargs):
+    # Pomiary lekarza dostają lekarz=NULL bez sygnałów, a jego wiersze zestawień usuwa kaskada -
+    # przelicz te dni w koszyku "bez lekarza"
+    zaplanuj_statystyki(
+        pomiary=[(d, None) for d in PomiaryDnia.objects.filter(lekarz=instance).values_list('dzien', flat=True)],
+        apgar=[(d, None) for d in ApgarDnia.objects.filter(lekarz=instance).values_list('dzien', flat=True).distinct()],
+    )
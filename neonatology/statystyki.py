@@ -0,0 +1,263 @@
+"""Dzienne zestawienia dla panelu statystyk.
+
+Panel statystyk czyta wyłącznie małe tabele zestawień, nigdy pomiarów:
+
+- `UrodzeniaDnia` - urodzenia danego dnia i odsetek niskiej masy urodzeniowej
+  (pierwszy pomiar wagi dziecka poniżej progu reguły ``waga_kg``);
+- `PomiaryDnia` - liczba pomiarów i pomiarów z SpO2 poniżej progu reguły
+  ``natlenienie_spO2``, dla dnia i lekarza;
+- `ApgarDnia` - rozkład APGAR w 5. minucie dla dnia i lekarza.
+
+Dzień pomiaru liczony jest w bieżącej strefie czasowej. Zapis lub
+usunięcie pomiaru przelicza po zatwierdzeniu transakcji tylko dotknięte
+wiersze (dzień x lekarz) - zapytaniem po indeksie ``(lekarz, data_pomiaru)``
+- oraz dzień urodzenia dziecka (zob. signals.py). Importy zbiorcze wołają
+`odswiez_statystyki_dzieci`, a `przelicz_statystyki` odtwarza całość.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.html import format_html_join
+
+from .models import APGARScore, ApgarDnia, Dziecko, ParametryZewnetrzne, PomiaryDnia, UrodzeniaDnia
+from .reguly import REGULY
+
+ROZMIAR_PORCJI = 500
+DOMYSLNY_OKRES = 365
+MAKS_SLUPKOW = 366
+
+# Te same progi co w regułach statusu
+PROG_NISKIEJ_WAGI = next(r.prog for r in REGULY if r.pole == 'waga_kg')
+PROG_SPO2 = next(r.prog for r in REGULY if r.pole == 'natlenienie_spO2')
+
+
+def dzien(chwila):
+    """Dzień chwili w bieżącej strefie czasowej (tak jak `TruncDate`)."""
+    return timezone.localdate(chwila) if timezone.is_aware(chwila) else chwila.date()
+
+
+def _poczatek(d):
+    poczatek = datetime.combine(d, time.min)
+    return timezone.make_aware(poczatek) if settings.USE_TZ else poczatek
+
+
+def _urodzenia(dzieci):
+    pierwsza_waga = Subquery(
+        ParametryZewnetrzne.objects.filter(dziecko=OuterRef('pk')).order_by('data_pomiaru', 'id').values('waga_kg')[:1]
+    )
+    return (dzieci.annotate(pierwsza_waga=pierwsza_waga).values('data_urodzenia')
+            .annotate(urodzenia=Count('id'), zwazone=Count('id', filter=Q(pierwsza_waga__isnull=False)),
+                      niska_waga=Count('id', filter=Q(pierwsza_waga__lt=PROG_NISKIEJ_WAGI)))
+            .order_by())
+
+
+def _pomiary(pomiary):
+    return (pomiary.annotate(dzien=TruncDate('data_pomiaru')).values('dzien', 'lekarz_id')
+            .annotate(pomiary=Count('id'), niskie_spo2=Count('id', filter=Q(natlenienie_spO2__lt=PROG_SPO2)))
+            .order_by())
+
+
+def _apgar(oceny):
+    return (oceny.annotate(dzien=TruncDate('data_pomiaru')).values('dzien', 'lekarz_id', 'apgar_5min')
+            .annotate(liczba=Count('id'))
+            .order_by())
+
+
+# Zestawienie dnia i lekarza: (model źródłowy, agregacja)
+ZESTAWIENIA_LEKARZY = {
+    PomiaryDnia: (ParametryZewnetrzne, _pomiary),
+    ApgarDnia: (APGARScore, _apgar),
+}
+
+
+def _odswiez_urodzenia(dni):
+    dni = sorted(set(dni))
+    for i in range(0, len(dni), ROZMIAR_PORCJI):
+        porcja = dni[i:i + ROZMIAR_PORCJI]
+        UrodzeniaDnia.objects.filter(dzien__in=porcja).delete()
+        UrodzeniaDnia.objects.bulk_create([
+            UrodzeniaDnia(dzien=w.pop('data_urodzenia'), **w)
+            for w in _urodzenia(Dziecko.objects.filter(data_urodzenia__in=porcja))
+        ])
+
+
+def _odswiez_dni_lekarzy(zestawienie, koszyki):
+    """Przelicza wiersze zestawienia dla par (dzień, lekarz_id).
+
+    Dla każdego lekarza przeliczany jest cały zakres od najwcześniejszego do
+    najpóźniejszego dnia - to jedno zapytanie po indeksie (lekarz, data_pomiaru).
+    """
+    zrodlo, agregacja = ZESTAWIENIA_LEKARZY[zestawienie]
+    dni_lekarzy = defaultdict(set)
+    for d, lekarz_id in koszyki:
+        dni_lekarzy[lekarz_id].add(d)
+    for lekarz_id, dni in dni_lekarzy.items():
+        od, do = min(dni), max(dni)
+        wiersze = zestawienie.objects.filter(dzien__range=(od, do))
+        obiekty = zrodlo.objects.filter(data_pomiaru__gte=_poczatek(od), data_pomiaru__lt=_poczatek(do + timedelta(days=1)))
+        if lekarz_id is None:
+            wiersze, obiekty = wiersze.filter(lekarz__isnull=True), obiekty.filter(lekarz__isnull=True)
+        else:
+            wiersze, obiekty = wiersze.filter(lekarz_id=lekarz_id), obiekty.filter(lekarz_id=lekarz_id)
+        wiersze.delete()
+        zestawienie.objects.bulk_create([zestawienie(**w) for w in agregacja(obiekty)], batch_size=ROZMIAR_PORCJI)
+
+
+def odswiez_statystyki(dni_urodzen=(), dzieci_ids=(), pomiary=(), apgar=()):
+    """Przelicza wskazane wiersze zestawień w jednej transakcji.
+
+    ``dni_urodzen`` - dni urodzenia do przeliczenia; ``dzieci_ids`` - dzieci,
+    których bieżący dzień urodzenia trzeba przeliczyć (np. po zmianie
+    pierwszego pomiaru); ``pomiary``, ``apgar`` - pary (dzień, lekarz_id).
+    """
+    dni = set(dni_urodzen)
+    ids = sorted({pk for pk in dzieci_ids if pk is not None})
+    with transaction.atomic():
+        for i in range(0, len(ids), ROZMIAR_PORCJI):
+            dni.update(Dziecko.objects.filter(pk__in=ids[i:i + ROZMIAR_PORCJI]).values_list('data_urodzenia', flat=True))
+        _odswiez_urodzenia(dni)
+        _odswiez_dni_lekarzy(PomiaryDnia, pomiary)
+        _odswiez_dni_lekarzy(ApgarDnia, apgar)
+
+
+def _koszyki(model, dzieci_ids):
+    return set(model.objects.filter(dziecko_id__in=dzieci_ids).annotate(dzien=TruncDate('data_pomiaru'))
+               .values_list('dzien', 'lekarz_id').distinct())
+
+
+def odswiez_statystyki_dzieci(dzieci_ids):
+    """Przelicza zestawienia dotknięte przez podane dzieci i wszystkie ich pomiary (importy zbiorcze)."""
+    ids = sorted({pk for pk in dzieci_ids if pk is not None})
+    pomiary, apgar = set(), set()
+    for i in range(0, len(ids), ROZMIAR_PORCJI):
+        porcja = ids[i:i + ROZMIAR_PORCJI]
+        pomiary |= _koszyki(ParametryZewnetrzne, porcja)
+        apgar |= _koszyki(APGARScore, porcja)
+    odswiez_statystyki(dzieci_ids=ids, pomiary=pomiary, apgar=apgar)
+
+
+def przelicz_statystyki():
+    """Odtwarza wszystkie zestawienia od zera; zwraca liczby wierszy każdego z nich."""
+    with transaction.atomic():
+        UrodzeniaDnia.objects.all().delete()
+        UrodzeniaDnia.objects.bulk_create(
+            (UrodzeniaDnia(dzien=w.pop('data_urodzenia'), **w) for w in _urodzenia(Dziecko.objects.all())),
+            batch_size=ROZMIAR_PORCJI,
+        )
+        for zestawienie, (zrodlo, agregacja) in ZESTAWIENIA_LEKARZY.items():
+            zestawienie.objects.all().delete()
+            zestawienie.objects.bulk_create(
+                (zestawienie(**w) for w in agregacja(zrodlo.objects.all())), batch_size=ROZMIAR_PORCJI,
+            )
+    return {model.__name__: model.objects.count() for model in (UrodzeniaDnia, PomiaryDnia, ApgarDnia)}
+
+
+def _odsetek(czesc, calosc):
+    return round(100 * czesc / calosc, 1) if calosc else None
+
+
+def _seria_dzienna(od, do, wartosci):
+    """Liczby urodzeń dla dni [od, do] (brak wiersza = 0) jako słupki wykresu.
+
+    Dłuższe okresy są łączone po `krok` dni, żeby słupków było najwyżej `MAKS_SLUPKOW`.
+    """
+    liczba_dni = (do - od).days + 1
+    krok = -(-liczba_dni // MAKS_SLUPKOW)
+    slupki = []
+    for i in range(0, liczba_dni, krok):
+        poczatek = od + timedelta(days=i)
+        liczba = sum(wartosci.get(poczatek + timedelta(days=j), 0) for j in range(min(krok, liczba_dni - i)))
+        slupki.append({'dzien': poczatek, 'liczba': liczba})
+    return slupki, krok
+
+
+def _wykres_svg(slupki, krok):
+    """Prostokąty SVG słupków (viewBox ``0 0 len(slupki) 100``) jako jeden bezpieczny HTML.
+
+    Składane w Pythonie - pętla szablonu po kilkuset słupkach byłaby
+    wolniejsza niż cała reszta panelu.
+    """
+    najwiecej = max((s['liczba'] for s in slupki), default=0)
+    prefiks = 'od ' if krok > 1 else ''
+    return format_html_join('', '<rect x="{}" y="{}" width="1" height="{}"><title>{}{}: {}</title></rect>', (
+        (i, round(100 - wysokosc, 1), wysokosc, prefiks, s['dzien'].strftime('%d.%m.%Y'), s['liczba'])
+        for i, s in enumerate(slupki) if s['liczba']
+        for wysokosc in [round(100 * s['liczba'] / najwiecej, 1)]
+    ))
+
+
+def dane_panelu(od, do, lekarz_id=None):
+    """Dane panelu statystyk dla dni [od, do], opcjonalnie dla jednego lekarza.
+
+    Czyta tylko tabele zestawień - kilka zapytań niezależnie od liczby pomiarów.
+    Urodzenia nie są przypisane do lekarza, więc filtr lekarza ich nie dotyczy.
+    """
+    urodzenia = {w[0]: w for w in UrodzeniaDnia.objects.filter(dzien__range=(od, do))
+                 .values_list('dzien', 'urodzenia', 'zwazone', 'niska_waga')}
+    pomiary = PomiaryDnia.objects.filter(dzien__range=(od, do))
+    apgar = ApgarDnia.objects.filter(dzien__range=(od, do))
+    if lekarz_id is not None:
+        pomiary, apgar = pomiary.filter(lekarz_id=lekarz_id), apgar.filter(lekarz_id=lekarz_id)
+
+    lekarze = {}
+    for w in pomiary.values('lekarz_id', 'lekarz__username').annotate(pomiary=Sum('pomiary'), niskie_spo2=Sum('niskie_spo2')):
+        lekarze[w['lekarz_id']] = dict(w, apgar=0)
+    for w in apgar.values('lekarz_id', 'lekarz__username').annotate(apgar=Sum('liczba')):
+        lekarze.setdefault(w['lekarz_id'], dict(w, pomiary=0, niskie_spo2=0))['apgar'] = w['apgar']
+    for w in lekarze.values():
+        w['odsetek_spo2'] = _odsetek(w['niskie_spo2'], w['pomiary'])
+
+    rozklad = dict(apgar.values_list('apgar_5min').annotate(Sum('liczba')))
+    ocen_apgar = sum(rozklad.values())
+    najwiecej = max(rozklad.values(), default=0)
+    liczba_urodzen = sum(w[1] for w in urodzenia.values())
+    zwazone = sum(w[2] for w in urodzenia.values())
+    liczba_pomiarow = sum(w['pomiary'] for w in lekarze.values())
+    slupki, krok = _seria_dzienna(od, do, {d: w[1] for d, w in urodzenia.items()})
+    return {
+        'wykres_urodzen': _wykres_svg(slupki, krok),
+        'liczba_slupkow': len(slupki),
+        'dni_na_slupek': krok,
+        'liczba_urodzen': liczba_urodzen,
+        'niska_waga': _odsetek(sum(w[3] for w in urodzenia.values()), zwazone),
+        'liczba_pomiarow': liczba_pomiarow,
+        'niskie_spo2': _odsetek(sum(w['niskie_spo2'] for w in lekarze.values()), liczba_pomiarow),
+        'rozklad_apgar': [
+            {'wynik': wynik, 'liczba': liczba, 'odsetek': _odsetek(liczba, ocen_apgar),
+             'szerokosc': round(100 * liczba / najwiecej) if najwiecej else 0}
+            for wynik, liczba in sorted(rozklad.items())
+        ],
+        'liczba_apgar': ocen_apgar,
+        'lekarze_statystyki': sorted(lekarze.values(), key=lambda w: (-w['pomiary'], w['lekarz__username'] or '')),
+        'prog_wagi': PROG_NISKIEJ_WAGI,
+        'prog_spo2': PROG_SPO2,
+    }
+
+
+def okres_domyslny():
+    """Ostatnie `DOMYSLNY_OKRES` dni do dziś włącznie."""
+    dzis = timezone.localdate() if settings.USE_TZ else datetime.now().date()
+    return dzis - timedelta(days=DOMYSLNY_OKRES - 1), dzis
+
+
+def _data(wartosc):
+    try:
+        return date.fromisoformat(wartosc) if wartosc else None
+    except ValueError:
+        return None
+
+
+def parametry_panelu(parametry):
+    """Zakres dni i lekarz z parametrów GET (``od``, ``do``, ``lekarz``); błędne wartości są pomijane."""
+    domyslne_od, domyslne_do = okres_domyslny()
+    do = _data(parametry.get('do')) or domyslne_do
+    od = _data(parametry.get('od')) or do - (domyslne_do - domyslne_od)
+    if od > do:
+        od, do = do, od
+    lekarz = parametry.get('lekarz', '')
+    return od, do, int(lekarz) if lekarz.isdigit() else None
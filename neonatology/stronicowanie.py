@@ -0,0 +1,232 @@
+"""Stronicowanie kursorowe (keyset) list dzieci, matek i pomiarów.
+
+Zamiast OFFSET strona jest wyznaczana warunkiem na klucz sortowania
+ostatniego (lub pierwszego) wiersza poprzedniej strony, np.
+``(created_at, id) < (kursor)``. Z indeksem na kolumnach klucza koszt
+strony to O(rozmiar strony) niezależnie od jej głębokości, a linki
+"następna"/"poprzednia" są stabilne przy dopisywaniu nowych rekordów.
+
+Kursor to zakodowane base64 wartości klucza ostatniego/pierwszego wiersza.
+Sortowanie musi być jednoznaczne - ostatnim polem powinien być klucz główny.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+# Parametry GET używane przez paginator
+PO = 'po'
+PRZED = 'przed'
+OSTATNIA = 'ostatnia'
+PARAMETRY = (PO, PRZED, OSTATNIA)
+
+
+def _kierunek(pole):
+    return (pole[1:], True) if pole.startswith('-') else (pole, False)
+
+
+def _odwroc(pole):
+    nazwa, malejaco = _kierunek(pole)
+    return nazwa if malejaco else '-' + nazwa
+
+
+class _KoderKursora(json.JSONEncoder):
+    # Pełna precyzja mikrosekund (DjangoJSONEncoder obcina je do milisekund)
+    def default(self, o):
+        if isinstance(o, (date, datetime)):
+            return o.isoformat()
+        return str(o)
+
+
+class StronaKursorowa:
+    """Strona wyników z kursorami do sąsiednich stron (interfejs zbliżony do `Page`)."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        # Kursory liczone od razu - `object_list` bywa później podmieniany w widokach
+        self.kursor_nastepny = paginator.zakoduj(object_list[-1]) if object_list and has_next else None
+        self.kursor_poprzedni = paginator.zakoduj(object_list[0]) if object_list and has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indeks):
+        return self.object_list[indeks]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class PaginatorKursorowy:
+    """Stronicuje `queryset` po kluczu `ordering` (np. ``('-created_at', '-id')``)."""
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    def _wartosc(self, obiekt, nazwa):
+        for czesc in nazwa.split('__'):
+            obiekt = getattr(obiekt, czesc, None)
+        return obiekt
+
+    def zakoduj(self, obiekt):
+        wartosci = [self._wartosc(obiekt, _kierunek(pole)[0]) for pole in self.ordering]
+        tekst = json.dumps(wartosci, cls=_KoderKursora, separators=(',', ':'))
+        return base64.urlsafe_b64encode(tekst.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def _pole_modelu(self, nazwa):
+        model = self.queryset.model
+        pole = None
+        for czesc in nazwa.split('__'):
+            pole = model._meta.get_field(czesc)
+            model = pole.related_model
+        return pole
+
+    def odkoduj(self, kursor):
+        """Zwraca wartości klucza z kursora lub None, gdy kursor jest nieprawidłowy."""
+        try:
+            tekst = base64.urlsafe_b64decode(kursor + '=' * (-len(kursor) % 4)).decode('utf-8')
+            wartosci = json.loads(tekst)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if not isinstance(wartosci, list) or len(wartosci) != len(self.ordering):
+            return None
+        wynik = []
+        for pole, wartosc in zip(self.ordering, wartosci):
+            nazwa = _kierunek(pole)[0]
+            try:
+                wynik.append(self._pole_modelu(nazwa).to_python(wartosc))
+            except FieldDoesNotExist:
+                # Adnotacja - wartość JSON porównywana wprost
+                wynik.append(wartosc)
+            except Exception:
+                return None
+        return wynik
+
+    def _warunek(self, wartosci, dalej):
+        """Q dla wierszy leżących za (`dalej`) lub przed kluczem `wartosci`."""
+        warunek = Q()
+        rowne = {}
+        for pole, wartosc in zip(self.ordering, wartosci):
+            nazwa, malejaco = _kierunek(pole)
+            operator = 'lt' if malejaco == dalej else 'gt'
+            warunek |= Q(**rowne, **{f'{nazwa}__{operator}': wartosc})
+            rowne[nazwa] = wartosc
+        return warunek
+
+    def _zapytanie(self, po, przed, ostatnia):
+        """Zapytanie o stronę (``per_page + 1`` wierszy), kierunek i informacja, czy użyto kursora."""
+        klucz_po = self.odkoduj(po) if po else None
+        klucz_przed = self.odkoduj(przed) if przed and klucz_po is None else None
+
+        if klucz_przed is not None or ostatnia:
+            # Wstecz: odwrócone sortowanie, potem odwrócenie wyniku
+            qs = self.queryset.order_by(*[_odwroc(pole) for pole in self.ordering])
+            if klucz_przed is not None:
+                qs = qs.filter(self._warunek(klucz_przed, dalej=False))
+            return qs[:self.per_page + 1], True, klucz_przed is not None
+
+        qs = self.queryset.order_by(*self.ordering)
+        if klucz_po is not None:
+            qs = qs.filter(self._warunek(klucz_po, dalej=True))
+        return qs[:self.per_page + 1], False, klucz_po is not None
+
+    def _strona(self, wiersze, wstecz, z_kursorem):
+        nadmiar = len(wiersze) > self.per_page
+        wiersze = wiersze[:self.per_page]
+        if wstecz:
+            return StronaKursorowa(wiersze[::-1], self, has_next=z_kursorem, has_previous=nadmiar)
+        return StronaKursorowa(wiersze, self, has_next=nadmiar, has_previous=z_kursorem)
+
+    def get_page(self, po=None, przed=None, ostatnia=False):
+        """Zwraca stronę za kursorem `po`, przed kursorem `przed`, ostatnią lub pierwszą."""
+        qs, wstecz, z_kursorem = self._zapytanie(po, przed, ostatnia)
+        return self._strona(list(qs), wstecz, z_kursorem)
+
+    async def aget_page(self, po=None, przed=None, ostatnia=False):
+        """Asynchroniczna wersja `get_page` (async ORM)."""
+        qs, wstecz, z_kursorem = self._zapytanie(po, przed, ostatnia)
+        return self._strona([wiersz async for wiersz in qs], wstecz, z_kursorem)
+
+    def strona_z_zadania(self, parametry):
+        """Wybiera stronę na podstawie parametrów GET (`po`, `przed`, `ostatnia`)."""
+        return self.get_page(po=parametry.get(PO), przed=parametry.get(PRZED),
+                             ostatnia=parametry.get(OSTATNIA) == '1')
+
+    async def astrona_z_zadania(self, parametry):
+        return await self.aget_page(po=parametry.get(PO), przed=parametry.get(PRZED),
+                                    ostatnia=parametry.get(OSTATNIA) == '1')
+
+
+def parametry_bez_kursora(parametry):
+    """Kopia parametrów GET bez kursora (i starego numeru strony) - do budowy linków."""
+    kopia = parametry.copy()
+    for nazwa in PARAMETRY + ('page',):
+        kopia.pop(nazwa, None)
+    return kopia.urlencode()
+
+
+# --- Panel administracyjny ---
+
+class ListaKursorowa(ChangeList):
+    """`ChangeList` stronicowany kursorem zamiast numeru strony.
+
+    Używany, gdy lista jest posortowana domyślnie (bez kliknięcia w
+    nagłówek kolumny); w przeciwnym razie działa zwykłe stronicowanie.
+    """
+    kursorowa = False
+
+    def get_results(self, request):
+        if self.model_admin.kursor_ordering is None or 'o' in self.params or self.show_all:
+            return super().get_results(request)
+        paginator = PaginatorKursorowy(self.queryset, self.list_per_page, self.model_admin.kursor_ordering)
+        strona = paginator.strona_z_zadania(request.kursor_admina)
+        self.kursorowa = True
+        self.strona_kursorowa = strona
+        self.filtry_kursora = parametry_bez_kursora(request.GET)
+        self.result_list = strona.object_list
+        self.result_count = len(strona)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = strona.has_other_pages()
+        self.paginator = paginator
+
+
+class KursorAdminMixin:
+    """Mixin `ModelAdmin` włączający stronicowanie kursorowe listy zmian.
+
+    `kursor_ordering` to klucz sortowania, np. ``('-created_at', '-id')``.
+    """
+    kursor_ordering = None
+    change_list_template = 'admin/change_list_kursor.html'
+
+    def get_changelist(self, request, **kwargs):
+        return ListaKursorowa
+
+    def get_changelist_instance(self, request):
+        # Parametry kursora nie są filtrami - ChangeList odrzuciłby je jako nieznane
+        request.kursor_admina = {nazwa: request.GET.get(nazwa) for nazwa in PARAMETRY}
+        if any(request.kursor_admina.values()):
+            request.GET = request.GET.copy()
+            for nazwa in PARAMETRY:
+                request.GET.pop(nazwa, None)
+        return super().get_changelist_instance(request)
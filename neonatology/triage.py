@@ -0,0 +1,140 @@
+"""Ocena stanu noworodka i utrzymywanie tabeli `StatusDziecka`.
+
+Logika medyczna (status, werdykt, konflikt serologiczny) jest tu w jednym
+miejscu, tak aby widoki i migawka statusów liczyły wszystko identycznie.
+"""
+import numpy as np
+from django.db import transaction
+
+from .models import StatusDziecka
+from .pamiec_raportow import uniewaznij_dzieci, uniewaznij_wszystko
+from .queries import dzieci_z_ostatnimi_pomiarami
+from .reguly import ocen_wsadowo, status_z_kodu, tekst_werdyktu
+
+# Ile dzieci przeliczać w jednej porcji (limit parametrów SQL w SQLite)
+ROZMIAR_PORCJI = 500
+
+
+# --- KRYTYCZNA FUNKCJA WERYFIKACJI DANYCH ---
+def sprawdz_parametry(dane):
+    """Implementuje logikę medyczną i zwraca zalecenia.
+
+    Cienka nakładka na `reguly.ocen_wsadowo` dla pojedynczego rekordu.
+    """
+    waga = float(dane.get('waga_kg', 0))
+    apgar_5min = int(dane.get('apgar_5min', 10))
+    natlenienie = int(dane.get('natlenienie_spO2', 100))
+
+    kod = int(ocen_wsadowo([waga], [natlenienie], [apgar_5min])[0])
+    return tekst_werdyktu(kod, waga_kg=waga, natlenienie_spO2=natlenienie)
+
+
+def ustal_status(waga, natlenienie, apgar_5min):
+    """Zwraca status dziecka na podstawie ostatnich pomiarów (None = brak pomiaru)."""
+    kod = int(ocen_wsadowo([waga], [natlenienie], [apgar_5min], uzupelnij_braki=False)[0])
+    return status_z_kodu(kod)
+
+
+def konflikt_serologiczny(dziecko):
+    """Sprawdza, czy między matką a dzieckiem możliwy jest konflikt serologiczny."""
+    matka = dziecko.matka
+    if not (matka and matka.konflikt_serologiczny and dziecko.grupa_krwi):
+        return False
+    # Sprawdź czy grupy krwi są różne (uproszczona logika)
+    matka_grupa = matka.grupa_krwi.lower() if matka.grupa_krwi else ""
+    dziecko_grupa = dziecko.grupa_krwi.lower()
+    # Jeśli matka ma Rh- a dziecko Rh+, lub inne niezgodności
+    return bool(('-' in matka_grupa and '+' in dziecko_grupa)
+                or (matka_grupa != dziecko_grupa and matka_grupa and dziecko_grupa))
+
+
+def zbuduj_statusy(dzieci):
+    """Buduje (niezapisane) migawki `StatusDziecka` dla dzieci z adnotacjami z `queries`.
+
+    Reguły są oceniane wektorowo dla całej porcji naraz (None -> NaN = brak pomiaru).
+    """
+    dzieci = list(dzieci)
+    wagi = np.array([d.ost_waga_kg for d in dzieci], dtype=np.float64)
+    natlenienia = np.array([d.ost_natlenienie_spO2 for d in dzieci], dtype=np.float64)
+    apgary = np.array([d.ost_apgar_5min for d in dzieci], dtype=np.float64)
+    kody_statusu = ocen_wsadowo(wagi, natlenienia, apgary, uzupelnij_braki=False)
+    kody_werdyktu = ocen_wsadowo(wagi, natlenienia, apgary)
+
+    statusy = []
+    for dziecko, kod_statusu, kod_werdyktu in zip(dzieci, kody_statusu.tolist(), kody_werdyktu.tolist()):
+        waga = dziecko.ost_waga_kg
+        natlenienie = dziecko.ost_natlenienie_spO2
+        # Brak pomiaru = wartości domyślne, jak w sprawdz_parametry
+        werdykt = tekst_werdyktu(
+            kod_werdyktu,
+            waga_kg=float(waga) if waga is not None else 0.0,
+            natlenienie_spO2=natlenienie if waga is not None else 100,
+        )
+        konflikt = konflikt_serologiczny(dziecko)
+        if konflikt:
+            werdykt += "\nUWAGA: Możliwy konflikt serologiczny między matką a dzieckiem!"
+
+        statusy.append(StatusDziecka(
+            dziecko_id=dziecko.pk,
+            status=status_z_kodu(kod_statusu),
+            werdykt=werdykt,
+            waga_kg=waga,
+            natlenienie_spO2=natlenienie,
+            apgar_5min=dziecko.ost_apgar_5min,
+            liczba_pomiarow=dziecko.liczba_pomiarow,
+            liczba_apgar=dziecko.liczba_apgar,
+            konflikt_serologiczny=konflikt,
+        ))
+    return statusy
+
+
+def _zapisz_porcje(dzieci):
+    """Zapisuje migawki porcji; zwraca (liczba migawek, czy zmienił się któryś status)."""
+    statusy = zbuduj_statusy(dzieci)
+    ids = [s.dziecko_id for s in statusy]
+    poprzednie = dict(StatusDziecka.objects.filter(dziecko_id__in=ids).values_list('dziecko_id', 'status'))
+    StatusDziecka.objects.filter(dziecko_id__in=ids).delete()
+    StatusDziecka.objects.bulk_create(statusy)
+    return len(statusy), any(poprzednie.get(s.dziecko_id) != s.status for s in statusy)
+
+
+def odswiez_statusy(dziecko_ids, zmiana_listy=False):
+    """Przelicza migawki statusu dla podanych dzieci w jednej transakcji.
+
+    Dzieci, które już nie istnieją, są pomijane (ich migawki usuwa kaskada).
+    Unieważnia też wiersze tych dzieci w pamięci panelu raportów, a przy
+    zmianie statusu (lub nowym dziecku) - wszystkie strony raportów.
+    ``zmiana_listy=True`` unieważnia strony zawsze - dla zapisów zbiorczych
+    (bez sygnałów) zmieniających filtrowane kolumny: grupę krwi lub datę
+    urodzenia. Zwraca liczbę zapisanych migawek.
+    """
+    ids = sorted({pk for pk in dziecko_ids if pk is not None})
+    zapisane = 0
+    with transaction.atomic():
+        for i in range(0, len(ids), ROZMIAR_PORCJI):
+            porcja = ids[i:i + ROZMIAR_PORCJI]
+            liczba, zmiana = _zapisz_porcje(dzieci_z_ostatnimi_pomiarami().filter(pk__in=porcja))
+            zapisane += liczba
+            zmiana_listy = zmiana_listy or zmiana
+    uniewaznij_dzieci(ids, zmiana_listy)
+    return zapisane
+
+
+def przelicz_wszystkie_statusy(rozmiar_porcji=ROZMIAR_PORCJI):
+    """Odbudowuje całą tabelę `StatusDziecka` porcjami po kluczu głównym."""
+    zapisane = 0
+    ostatni_pk = 0
+    with transaction.atomic():
+        StatusDziecka.objects.all().delete()
+        while True:
+            porcja = list(
+                dzieci_z_ostatnimi_pomiarami()
+                .filter(pk__gt=ostatni_pk)
+                .order_by('pk')[:rozmiar_porcji]
+            )
+            if not porcja:
+                break
+            zapisane += _zapisz_porcje(porcja)[0]
+            ostatni_pk = porcja[-1].pk
+    uniewaznij_wszystko()
+    return zapisane
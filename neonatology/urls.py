@@ -1,20 +1,38 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, widoki_async
 
-urlpatterns = [
-    path('', views.index, name='index'),
-    path('login/', views.CustomLoginView.as_view(), name='login'),
-    path('logout/', views.CustomLogoutView.as_view(), name='logout'),
-    path('dodaj_noworodka/', views.dodaj_noworodka, name='dodaj_noworodka'),
-    path('raporty/', views.raporty, name='raporty'),
-    path('noworodek/<int:dziecko_id>/', views.szczegoly_noworodka, name='szczegoly_noworodka'),
-    path('noworodek/<int:dziecko_id>/edytuj/', views.edytuj_dziecko, name='edytuj_dziecko'),
-    path('noworodek/<int:dziecko_id>/historia/', views.historia_zmian, name='historia_zmian'),
-    path('noworodek/<int:dziecko_id>/parametry/<int:param_id>/edytuj/', views.edytuj_parametry, name='edytuj_parametry'),
-    path('noworodek/<int:dziecko_id>/apgar/<int:apgar_id>/edytuj/', views.edytuj_apgar, name='edytuj_apgar'),
-    path('noworodek/<int:dziecko_id>/parametry/dodaj/', views.dodaj_parametry, name='dodaj_parametry'),
-    path('noworodek/<int:dziecko_id>/apgar/dodaj/', views.dodaj_apgar, name='dodaj_apgar'),
-    path('matka/<int:matka_id>/', views.szczegoly_matki, name='szczegoly_matki'),
-    path('matka/<int:matka_id>/edytuj/', views.edytuj_matke, name='edytuj_matke'),
-    path('panel_admina/', views.panel_admina, name='panel_admina'),
-]
+
+def wzorce(odczyt):
+    """Wzorce URL aplikacji; `odczyt` to moduł widoków odczytu (`views` albo `widoki_async`)."""
+    return [
+        path('', views.index, name='index'),
+        path('login/', views.CustomLoginView.as_view(), name='login'),
+        path('logout/', views.CustomLogoutView.as_view(), name='logout'),
+        path('dodaj_noworodka/', views.dodaj_noworodka, name='dodaj_noworodka'),
+        path('obchod/', views.obchod, name='obchod'),
+        path('obchod/wynik/', views.obchod_wynik, name='obchod_wynik'),
+        path('raporty/', odczyt.raporty, name='raporty'),
+        path('raporty/eksport/', views.eksport_raportow, name='eksport_raportow'),
+        path('statystyki/', views.statystyki, name='statystyki'),
+        path('szukaj/', views.wyszukiwanie, name='szukaj'),
+        path('szukaj/api/', views.wyszukiwanie_api, name='szukaj_api'),
+        path('noworodek/<int:dziecko_id>/', odczyt.szczegoly_noworodka, name='szczegoly_noworodka'),
+        path('noworodek/<int:dziecko_id>/edytuj/', views.edytuj_dziecko, name='edytuj_dziecko'),
+        path('noworodek/<int:dziecko_id>/historia/', odczyt.historia_zmian, name='historia_zmian'),
+        path('noworodek/<int:dziecko_id>/wzrastanie/', views.krzywe_wzrastania, name='krzywe_wzrastania'),
+        path('noworodek/<int:dziecko_id>/parametry/<int:param_id>/edytuj/', views.edytuj_parametry, name='edytuj_parametry'),
+        path('noworodek/<int:dziecko_id>/apgar/<int:apgar_id>/edytuj/', views.edytuj_apgar, name='edytuj_apgar'),
+        path('noworodek/<int:dziecko_id>/parametry/dodaj/', views.dodaj_parametry, name='dodaj_parametry'),
+        path('noworodek/<int:dziecko_id>/apgar/dodaj/', views.dodaj_apgar, name='dodaj_apgar'),
+        path('matka/podpowiedzi/', views.podpowiedzi_matek_api, name='podpowiedzi_matek'),
+        path('matka/<int:matka_id>/', odczyt.szczegoly_matki, name='szczegoly_matki'),
+        path('matka/<int:matka_id>/edytuj/', views.edytuj_matke, name='edytuj_matke'),
+        path('panel_admina/', views.panel_admina, name='panel_admina'),
+        path('api/<str:zasob>/', views.api_zasob, name='api_zasob'),
+        path('metrics', views.metryki, name='metryki'),
+    ]
+
+
+# Wdrożenie ASGI może obsługiwać widoki odczytu asynchronicznie (zob. widoki_async.py)
+urlpatterns = wzorce(widoki_async if getattr(settings, 'WIDOKI_ASYNC', False) else views)
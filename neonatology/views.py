@@ -1,11 +1,34 @@
+import json
+from functools import wraps
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.http import HttpResponseRedirect
-from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka
-from .forms import DzieckoForm, ParametryZewnetrzneForm, APGARScoreForm, MatkaForm
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.http import (HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed, HttpResponseRedirect,
+                         JsonResponse, StreamingHttpResponse)
+from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka, StatusDziecka, PomiaryDnia
+from .forms import DzieckoForm, ParametryZewnetrzneForm, APGARScoreForm, MatkaForm, ObchodFormSet
+from . import api, queries
+from .archiwum_historii import typy_dziecka
+from .eksport import FORMATY, filtruj_dzieci, strumien_eksportu
+from .historia import historia_dziecka
+from .metryki import dostep_do_metryk, eksport_prometheus
+from .obchod import DNI_OBCHODU, MAKS_WIERSZY, dzieci_obchodu, wartosci_poczatkowe, werdykty_obchodu, zapisz_obchod
+from .pamiec_raportow import PamiecRaportow
+from .repliki import odczyt_z_repliki, strumien_z_repliki, z_bazy_podstawowej
+from .statystyki import dane_panelu, parametry_panelu
+from .stronicowanie import PaginatorKursorowy, parametry_bez_kursora
+from .triage import odswiez_statusy, sprawdz_parametry
+from .warunkowe import walidator_dziecka, walidator_matki, warunkowy
+from .wyszukiwanie import podpowiedzi_matek, szukaj
+from .wzrastanie import DOMYSLNA_LICZBA_PUNKTOW, MAKS_LICZBA_PUNKTOW, krzywe_dziecka
 
 def index(request):
     if not request.user.is_authenticated:
@@ -93,62 +116,167 @@ def dodaj_noworodka(request):
     })
 
 
+def _dzieci_raportu(ids):
+    """Dzieci do wierszy raportu (z matką i migawką statusu) jako słownik pk -> dziecko."""
+    dzieci = Dziecko.objects.select_related('matka', 'status').in_bulk(ids)
+    # Dzieci bez migawki (np. dane sprzed migracji) - uzupełnij tylko dla tej strony
+    brakujace = [pk for pk, d in dzieci.items() if not hasattr(d, 'status')]
+    if brakujace:
+        # Migawki liczone i czytane w bazie podstawowej, także gdy strona czyta z repliki
+        with z_bazy_podstawowej():
+            odswiez_statusy(brakujace)
+            statusy = StatusDziecka.objects.in_bulk(brakujace)
+        for pk in brakujace:
+            if pk in statusy:
+                dzieci[pk].status = statusy[pk]
+    return dzieci
+
+
+def _wiersz_raportu(dziecko):
+    return render_to_string('raporty_wiersz.html', {
+        'dziecko': dziecko, 'status': dziecko.status.status, 'werdykt': dziecko.status.werdykt,
+    })
+
+
+def _paginator_raportu(parametry):
+    """Paginator strony raportu - strona wyznacza tylko klucze dzieci."""
+    # Dane wierszy są pobierane dla brakujących fragmentów
+    dzieci = Dziecko.objects.only('pk', 'created_at')
+
+    # Filtrowanie (wspólne z eksportem) i sortowanie - w całości po stronie SQL
+    dzieci = filtruj_dzieci(dzieci, parametry)
+    if parametry.get('sortuj', '') == 'status':
+        # Brak migawki sortowany jak pusty status - klucz kursora nie może być NULL
+        dzieci = dzieci.annotate(status_sort=Coalesce('status__status', Value('')))
+        klucz = ('status_sort', '-created_at', '-id')
+    else:
+        klucz = ('-created_at', '-id')
+
+    # Stronicowanie kursorowe po (created_at, id) - koszt strony nie zależy od jej głębokości
+    return PaginatorKursorowy(dzieci, 50, klucz)  # 50 records per page
+
+
+def _zloz_tabele_raportu(parametry, pamiec, page_obj):
+    """HTML tabeli strony; wiersze niezmienionych dzieci pochodzą z pamięci podręcznej."""
+    wiersze = pamiec.wiersze([d.pk for d in page_obj], _dzieci_raportu, _wiersz_raportu)
+    tabela = render_to_string('raporty_tabela.html', {
+        'wiersze': wiersze,
+        'page_obj': page_obj,
+        'filtry': parametry_bez_kursora(parametry),
+    })
+    pamiec.zapisz_tabele(tabela)
+    return tabela
+
+
+def _tabela_raportu(parametry, pamiec):
+    page_obj = _paginator_raportu(parametry).strona_z_zadania(parametry)
+    return _zloz_tabele_raportu(parametry, pamiec, page_obj)
+
+
+def _kontekst_raportow(parametry, tabela):
+    return {
+        'tabela': mark_safe(tabela),
+        'statusy': StatusDziecka.STATUS_CHOICES,
+        'wybrany_status': parametry.get('status', ''),
+        'sortowanie': parametry.get('sortuj', ''),
+        'grupa_krwi': parametry.get('grupa_krwi', ''),
+        'data_od': parametry.get('data_od', ''),
+        'data_do': parametry.get('data_do', ''),
+        'filtry': parametry_bez_kursora(parametry),
+    }
+
+
 @login_required
+@odczyt_z_repliki
 def raporty(request):
     """Doctors' dashboard: list all babies and their records."""
-    dzieci = Dziecko.objects.all().prefetch_related('parametry', 'apgar', 'matka').order_by('-created_at')
+    # Tabela jest brana z pamięci podręcznej, dopóki nie zmieni się nic, co pokazuje
+    pamiec = PamiecRaportow(request.GET)
+    tabela = pamiec.tabela()
+    if tabela is None:
+        tabela = _tabela_raportu(request.GET, pamiec)
+
+    return render(request, 'raporty.html', _kontekst_raportow(request.GET, tabela))
 
-    dzieci_status = []
-    for dziecko in dzieci:
-        param = dziecko.parametry.order_by('-data_pomiaru').first()
-        apgar = dziecko.apgar.order_by('-data_pomiaru').first()
 
-        # default
-        status = 'Parametry w normie'
+@login_required
+@odczyt_z_repliki
+def statystyki(request):
+    """Panel statystyk - czyta tylko dzienne zestawienia (zob. statystyki.py)."""
+    od, do, lekarz_id = parametry_panelu(request.GET)
+    lekarze = User.objects.filter(pk__in=PomiaryDnia.objects.values('lekarz_id')).order_by('username')
+    return render(request, 'statystyki.html', dict(
+        dane_panelu(od, do, lekarz_id),
+        od=od, do=do, wybrany_lekarz=lekarz_id, lekarze=lekarze,
+    ))
 
-        # Hospitalizacja has highest priority
-        if apgar and getattr(apgar, 'apgar_5min', None) is not None and apgar.apgar_5min < 7:
-            status = 'Hospitalizacja'
+
+@login_required
+@odczyt_z_repliki
+def eksport_raportow(request):
+    """Strumieniowy eksport raportu (CSV lub XLSX, opcjonalnie gzip) z filtrami panelu."""
+    format = request.GET.get('format', 'csv')
+    if format not in FORMATY:
+        format = 'csv'
+    gzip = request.GET.get('gzip') == '1'
+    typy = {
+        'csv': 'text/csv; charset=utf-8',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+    nazwa = f'raporty.{format}' + ('.gz' if gzip else '')
+    response = StreamingHttpResponse(
+        strumien_z_repliki(strumien_eksportu(request.GET, format=format, gzip=gzip)),
+        content_type='application/gzip' if gzip else typy[format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nazwa}"'
+    return response
+
+
+@login_required
+@odczyt_z_repliki
+def wyszukiwanie(request):
+    """Wyszukiwanie pacjentów po prefiksie PESEL, nazwiska matki lub imienia dziecka."""
+    zapytanie = request.GET.get('q', '').strip()
+    return render(request, 'szukaj.html', {
+        'zapytanie': zapytanie,
+        'wyniki': szukaj(zapytanie) if zapytanie else [],
+    })
+
+
+@login_required
+@odczyt_z_repliki
+def wyszukiwanie_api(request):
+    """JSON z wynikami wyszukiwania (np. dla podpowiedzi w polu wyszukiwania)."""
+    wyniki = []
+    for wynik in szukaj(request.GET.get('q', '')):
+        obiekt = wynik['obiekt']
+        if wynik['typ'] == 'matka':
+            wyniki.append({
+                'typ': 'matka', 'id': obiekt.id, 'etykieta': f"{obiekt.imie} {obiekt.nazwisko} ({obiekt.pesel})",
+                'url': reverse('szczegoly_matki', args=[obiekt.id]),
+            })
         else:
-            # monitoring if weight low or O2 low
-            if param and ((getattr(param, 'waga_kg', None) is not None and param.waga_kg < 2.5) or (getattr(param, 'natlenienie_spO2', None) is not None and param.natlenienie_spO2 < 92)):
-                status = 'Monitorowanie'
-
-        # Build combined data dict to generate the same medical verdict used when adding a newborn
-        combined = {}
-        if dziecko.imie is not None:
-            combined['imie'] = dziecko.imie
-        if param:
-            # match keys expected by sprawdz_parametry
-            combined['waga_kg'] = getattr(param, 'waga_kg', None)
-            combined['natlenienie_spO2'] = getattr(param, 'natlenienie_spO2', None)
-        if apgar:
-            combined['apgar_5min'] = getattr(apgar, 'apgar_5min', None)
-
-        # Use the existing checker to produce a textual verdict
-        werdykt = sprawdz_parametry(combined)
-
-        # Dodaj sprawdzenie konfliktu serologicznego
-        if dziecko.matka and dziecko.matka.konflikt_serologiczny and dziecko.grupa_krwi:
-            # Sprawdź czy grupy krwi są różne (uproszczona logika)
-            matka_grupa = dziecko.matka.grupa_krwi.lower() if dziecko.matka.grupa_krwi else ""
-            dziecko_grupa = dziecko.grupa_krwi.lower()
-            
-            # Jeśli matka ma Rh- a dziecko Rh+, lub inne niezgodności
-            if ('-' in matka_grupa and '+' in dziecko_grupa) or (matka_grupa != dziecko_grupa and matka_grupa and dziecko_grupa):
-                werdykt += "\nUWAGA: Możliwy konflikt serologiczny między matką a dzieckiem!"
-
-        dzieci_status.append({'dziecko': dziecko, 'status': status, 'werdykt': werdykt})
-
-    # Pagination
-    paginator = Paginator(dzieci_status, 50)  # 50 records per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    return render(request, 'raporty.html', {'page_obj': page_obj})
+            wyniki.append({
+                'typ': 'dziecko', 'id': obiekt.id, 'etykieta': f"{obiekt.imie} ({obiekt.data_urodzenia})",
+                'url': reverse('szczegoly_noworodka', args=[obiekt.id]),
+            })
+    return JsonResponse({'wyniki': wyniki})
 
 
 @login_required
+@odczyt_z_repliki
+def podpowiedzi_matek_api(request):
+    """Strona podpowiedzi dla pola wyboru matki (`?q=` prefiks, `?po=` kursor następnej strony)."""
+    wyniki, nastepna = podpowiedzi_matek(request.GET.get('q', ''), request.GET.get('po'))
+    return JsonResponse({
+        'wyniki': [{'id': pk, 'etykieta': etykieta} for pk, etykieta in wyniki],
+        'nastepna': nastepna,
+    })
+
+
+@login_required
+@odczyt_z_repliki
+@warunkowy(walidator_dziecka)
 def szczegoly_noworodka(request, dziecko_id):
     """Szczegóły konkretnego noworodka."""
     dziecko = Dziecko.objects.get(id=dziecko_id)
@@ -161,134 +289,22 @@ def szczegoly_noworodka(request, dziecko_id):
     })
 
 
-# --- KRYTYCZNA FUNKCJA WERYFIKACJI DANYCH ---
-def sprawdz_parametry(dane):
-    """Implementuje logikę medyczną i zwraca zalecenia."""
-    
-    # Przykładowa uproszczona logika
-    waga = float(dane.get('waga_kg', 0))
-    apgar_5min = int(dane.get('apgar_5min', 10))
-    natlenienie = int(dane.get('natlenienie_spO2', 100))
-    
-    zalecenie = []
-
-    # 1. Sprawdzenie APGAR
-    if apgar_5min < 7:
-        zalecenie.append("Niska ocena APGAR (poniżej 7 w 5. minucie). Wymagana hospitalizacja i monitorowania.")
-        
-    # 2. Sprawdzenie wagi (ryzyko małej wagi urodzeniowej < 2.5 kg)
-    if waga < 2.5:
-        zalecenie.append(f"Niska masa urodzeniowa ({waga} kg). Niezbędne monitorowanie karmienia i przyrostów.")
-
-    # 3. Sprawdzenie natlenienia
-    if natlenienie < 92:
-        zalecenie.append(f"Niskie natlenienie krwi ({natlenienie}%). Wymagane dodatkowe badania saturacji i oddechu.")
-        
-    if not zalecenie:
-        return "Parametry w normie. Dziecko nie wymaga dodatkowej interwencji."
-    
-    return "UWAGA, NIEPRAWIDŁOWE PARAMETRY:\n" + "\n".join(zalecenie)
+@login_required
+@odczyt_z_repliki
+def krzywe_wzrastania(request, dziecko_id):
+    """Seria wzrastania dziecka z centylami WHO jako JSON dla wykresu (``?punkty=N`` - limit punktów serii)."""
+    dziecko = get_object_or_404(Dziecko, id=dziecko_id)
+    punkty = request.GET.get('punkty', '')
+    punkty = min(int(punkty), MAKS_LICZBA_PUNKTOW) if punkty.isdigit() else DOMYSLNA_LICZBA_PUNKTOW
+    return JsonResponse(krzywe_dziecka(dziecko, punkty))
 
 
 @login_required
+@odczyt_z_repliki
 def historia_zmian(request, dziecko_id):
     """Wyświetla historię zmian dla konkretnego dziecka."""
     dziecko = get_object_or_404(Dziecko, id=dziecko_id)
     
-    # Pobierz historię dziecka
-    dziecko_history = []
-    for history_item in dziecko.history.all():
-        changes = []
-        if history_item.prev_record:
-            # Porównaj z poprzednią wersją
-            if history_item.imie != history_item.prev_record.imie:
-                changes.append(f"Imię: '{history_item.prev_record.imie}' → '{history_item.imie}'")
-            if history_item.data_urodzenia != history_item.prev_record.data_urodzenia:
-                changes.append(f"Data urodzenia: {history_item.prev_record.data_urodzenia} → {history_item.data_urodzenia}")
-            if history_item.plec != history_item.prev_record.plec:
-                changes.append(f"Płeć: {history_item.prev_record.get_plec_display()} → {history_item.get_plec_display()}")
-            if history_item.grupa_krwi != history_item.prev_record.grupa_krwi:
-                changes.append(f"Grupa krwi: '{history_item.prev_record.grupa_krwi}' → '{history_item.grupa_krwi}'")
-            if history_item.matka_id != history_item.prev_record.matka_id:
-                prev_matka = history_item.prev_record.matka.imie + " " + history_item.prev_record.matka.nazwisko if history_item.prev_record.matka else "Brak"
-                curr_matka = history_item.matka.imie + " " + history_item.matka.nazwisko if history_item.matka else "Brak"
-                changes.append(f"Matka: {prev_matka} → {curr_matka}")
-        else:
-            # Pierwsza wersja
-            changes.append(f"Pierwsza wersja - Imię: {history_item.imie}, Data urodzenia: {history_item.data_urodzenia}, Płeć: {history_item.get_plec_display()}")
-        
-        dziecko_history.append({
-            'data': history_item.history_date,
-            'lekarz': history_item.history_user,
-            'typ': 'Dziecko',
-            'opis': '; '.join(changes) if changes else 'Utworzenie rekordu dziecka',
-            'object': history_item,
-            'model_type': 'dziecko'
-        })
-    
-    # Pobierz historię matki jeśli istnieje
-    matka_history = []
-    if dziecko.matka:
-        for history_item in dziecko.matka.history.all():
-            changes = []
-            if history_item.prev_record:
-                if history_item.pesel != history_item.prev_record.pesel:
-                    changes.append(f"PESEL: '{history_item.prev_record.pesel}' → '{history_item.pesel}'")
-                if history_item.imie != history_item.prev_record.imie:
-                    changes.append(f"Imię: '{history_item.prev_record.imie}' → '{history_item.imie}'")
-                if history_item.nazwisko != history_item.prev_record.nazwisko:
-                    changes.append(f"Nazwisko: '{history_item.prev_record.nazwisko}' → '{history_item.nazwisko}'")
-                if history_item.grupa_krwi != history_item.prev_record.grupa_krwi:
-                    changes.append(f"Grupa krwi: '{history_item.prev_record.grupa_krwi}' → '{history_item.grupa_krwi}'")
-                if history_item.konflikt_serologiczny != history_item.prev_record.konflikt_serologiczny:
-                    prev_konflikt = "Tak" if history_item.prev_record.konflikt_serologiczny else "Nie"
-                    curr_konflikt = "Tak" if history_item.konflikt_serologiczny else "Nie"
-                    changes.append(f"Konflikt serologiczny: {prev_konflikt} → {curr_konflikt}")
-            else:
-                changes.append(f"Pierwsza wersja matki - {history_item.imie} {history_item.nazwisko}")
-            
-            matka_history.append({
-                'data': history_item.history_date,
-                'lekarz': history_item.history_user,
-                'typ': 'Matka',
-                'opis': '; '.join(changes) if changes else 'Utworzenie rekordu matki',
-                'object': history_item,
-                'model_type': 'matka'
-            })
-    
-    # Pobierz historię parametrów
-    parametry_history = []
-    for param in dziecko.parametry.all():
-        for history_item in param.history.all():
-            parametry_history.append({
-                'data': history_item.history_date,
-                'lekarz': history_item.lekarz,
-                'typ': 'Parametry',
-                'opis': f"Waga: {history_item.waga_kg} kg, Wzrost: {history_item.wzrost_cm} cm, "
-                       f"Natlenienie: {history_item.natlenienie_spO2}%, "
-                       f"Oddechy: {history_item.oddechy_na_min}/min",
-                'object': history_item,
-                'model_type': 'parametry'
-            })
-    
-    # Pobierz historię APGAR
-    apgar_history = []
-    for apgar in dziecko.apgar.all():
-        for history_item in apgar.history.all():
-            apgar_history.append({
-                'data': history_item.history_date,
-                'lekarz': history_item.lekarz,
-                'typ': 'APGAR',
-                'opis': f"1min: {history_item.apgar_1min}, 5min: {history_item.apgar_5min}"
-                       f"{', 10min: ' + str(history_item.apgar_10min) if history_item.apgar_10min else ''}",
-                'object': history_item,
-                'model_type': 'apgar'
-            })
-    
-    # Połącz i posortuj historię
-    historia = dziecko_history + matka_history + parametry_history + apgar_history
-    historia.sort(key=lambda x: x['data'], reverse=True)
-    
     # Obsługa przywracania wersji
     if request.method == 'POST' and 'restore_version' in request.POST:
         version_id = request.POST.get('version_id')
@@ -323,19 +339,29 @@ def historia_zmian(request, dziecko_id):
         messages.success(request, 'Wersja została przywrócona pomyślnie.')
         return HttpResponseRedirect(request.path)
     
+    # Archiwum jest czytane tylko po przejściu do starszych wpisów (?archiwum=1)
+    archiwum = request.GET.get('archiwum') == '1'
+    zarchiwizowane = typy_dziecka(dziecko)
     return render(request, 'historia_zmian.html', {
         'dziecko': dziecko,
-        'historia': historia
+        'historia': historia_dziecka(dziecko, zarchiwizowane, archiwum=archiwum),
+        'archiwum': archiwum,
+        'ma_archiwum': bool(zarchiwizowane),
     })
 
 @login_required
+@odczyt_z_repliki
+@warunkowy(walidator_matki)
 def szczegoly_matki(request, matka_id):
     matka = get_object_or_404(Matka, id=matka_id)
-    dzieci = matka.dzieci.all().order_by('-data_urodzenia')
+    dzieci = PaginatorKursorowy(matka.dzieci.all(), 50, ('-data_urodzenia', '-id')).strona_z_zadania(request.GET)
     
     return render(request, 'szczegoly_matki.html', {
         'matka': matka,
-        'dzieci': dzieci
+        'dzieci': dzieci,
+        'liczba_dzieci': matka.dzieci.count(),
+        'page_obj': dzieci,
+        'filtry': parametry_bez_kursora(request.GET),
     })
 
 @login_required
@@ -415,64 +441,43 @@ def edytuj_apgar(request, dziecko_id, apgar_id):
     })
 
 @login_required
+@odczyt_z_repliki
 def panel_admina(request):
     """Panel administratora - pokazuje noworodki dodane przez aktualnego użytkownika."""
     
     # Pobierz wszystkie noworodki dodane przez aktualnego użytkownika
     dzieci_uzytkownika = Dziecko.objects.filter(
-        parametry__lekarz=request.user
-    ).distinct().prefetch_related('parametry', 'apgar', 'matka').order_by('-created_at')
+        pk__in=ParametryZewnetrzne.objects.filter(lekarz=request.user).values('dziecko_id')
+    ).select_related('matka')
     
     # Statystyki
     liczba_dzieci = dzieci_uzytkownika.count()
+    strona = PaginatorKursorowy(dzieci_uzytkownika, 50).strona_z_zadania(request.GET)
     liczba_matek = Matka.objects.filter(
         dzieci__parametry__lekarz=request.user
     ).distinct().count()
     
-    # Pobierz ostatnie zmiany w historii
+    # Ostatnie zmiany w historii - jedno zapytanie (UNION tabel historycznych)
     ostatnie_zmiany = []
-    
-    # Zmiany w dzieciach
-    for dziecko in dzieci_uzytkownika[:10]:  # ostatnie 10 dzieci
-        for history_item in dziecko.history.all()[:5]:  # ostatnie 5 zmian na dziecko
-            ostatnie_zmiany.append({
-                'data': history_item.history_date,
-                'typ': 'Dziecko',
-                'obiekt': f"{dziecko.imie} {dziecko.matka.nazwisko if dziecko.matka else ''}",
-                'opis': f"Zmiana w danych dziecka",
-                'dziecko_id': dziecko.id
-            })
-    
-    # Zmiany w parametrach
-    parametry_uzytkownika = ParametryZewnetrzne.objects.filter(lekarz=request.user)
-    for param in parametry_uzytkownika[:20]:  # ostatnie 20 parametrów
-        for history_item in param.history.all()[:3]:  # ostatnie 3 zmiany na parametr
-            ostatnie_zmiany.append({
-                'data': history_item.history_date,
-                'typ': 'Parametry',
-                'obiekt': f"{param.dziecko.imie} {param.dziecko.matka.nazwisko if param.dziecko.matka else ''}",
-                'opis': f"Waga: {history_item.waga_kg}kg, SpO2: {history_item.natlenienie_spO2}%",
-                'dziecko_id': param.dziecko.id
-            })
-    
-    # Zmiany w APGAR
-    apgar_uzytkownika = APGARScore.objects.filter(lekarz=request.user)
-    for apgar in apgar_uzytkownika[:20]:  # ostatnie 20 wyników APGAR
-        for history_item in apgar.history.all()[:3]:  # ostatnie 3 zmiany na APGAR
-            ostatnie_zmiany.append({
-                'data': history_item.history_date,
-                'typ': 'APGAR',
-                'obiekt': f"{apgar.dziecko.imie} {apgar.dziecko.matka.nazwisko if apgar.dziecko.matka else ''}",
-                'opis': f"1min: {history_item.apgar_1min}, 5min: {history_item.apgar_5min}",
-                'dziecko_id': apgar.dziecko.id
-            })
-    
-    # Sortuj ostatnie zmiany po dacie (najnowsze pierwsze)
-    ostatnie_zmiany.sort(key=lambda x: x['data'], reverse=True)
-    ostatnie_zmiany = ostatnie_zmiany[:20]  # tylko 20 ostatnich zmian
+    for zmiana in queries.ostatnie_zmiany(request.user, limit=20):
+        if zmiana['typ'] == 'Parametry':
+            opis = f"Waga: {zmiana['a']}kg, SpO2: {int(zmiana['b'])}%"
+        elif zmiana['typ'] == 'APGAR':
+            opis = f"1min: {int(zmiana['a'])}, 5min: {int(zmiana['b'])}"
+        else:
+            opis = "Zmiana w danych dziecka"
+        ostatnie_zmiany.append({
+            'data': zmiana['data'],
+            'typ': zmiana['typ'],
+            'obiekt': f"{zmiana['imie_dziecka']} {zmiana['nazwisko_matki'] or ''}",
+            'opis': opis,
+            'dziecko_id': zmiana['id_dziecka']
+        })
     
     return render(request, 'panel_admina.html', {
-        'dzieci': dzieci_uzytkownika,
+        'dzieci': strona,
+        'page_obj': strona,
+        'filtry': parametry_bez_kursora(request.GET),
         'liczba_dzieci': liczba_dzieci,
         'liczba_matek': liczba_matek,
         'ostatnie_zmiany': ostatnie_zmiany
@@ -520,4 +525,107 @@ def dodaj_apgar(request, dziecko_id):
     return render(request, 'dodaj_apgar.html', {
         'form': form,
         'dziecko': dziecko
-    })
\ No newline at end of file
+    })
+
+
+# Klucz sesji z wynikiem ostatniego obchodu: [[id pomiaru, status, werdykt], ...]
+KLUCZ_WYNIKU_OBCHODU = 'obchod_wynik'
+
+
+@login_required
+def obchod(request):
+    """Obchód - pomiary wielu dzieci wpisywane w jednym formularzu i zapisywane razem."""
+    ucieta = False
+    if request.method == 'POST':
+        formset = ObchodFormSet(request.POST)
+        if formset.is_valid():
+            wypelnione = formset.wypelnione()
+            if wypelnione:
+                pomiary = []
+                for form in wypelnione:
+                    pomiar = form.save(commit=False)
+                    pomiar.dziecko = formset.dzieci[form.cleaned_data['dziecko']]
+                    pomiary.append(pomiar)
+                wyniki = werdykty_obchodu(zapisz_obchod(pomiary, request.user))
+                # Post/Redirect/Get - odświeżenie strony wyniku nie zapisuje obchodu ponownie
+                request.session[KLUCZ_WYNIKU_OBCHODU] = [
+                    [pomiar.pk, status, werdykt] for pomiar, status, werdykt in wyniki]
+                messages.success(request, f'Zapisano pomiary {len(pomiary)} dzieci.')
+                return redirect('obchod_wynik')
+            messages.warning(request, 'Nie wpisano pomiaru dla żadnego dziecka.')
+        # Dzieci wierszy odtwarzane z wysłanego formularza, w tej samej kolejności
+        ids = [form['dziecko'].value() for form in formset.forms]
+        dzieci = queries.dzieci_do_obchodu().in_bulk([pk for pk in ids if str(pk).isdigit()])
+        dzieci = [dzieci.get(int(pk)) if str(pk).isdigit() else None for pk in ids]
+    else:
+        dzieci, ucieta = dzieci_obchodu(request.GET)
+        formset = ObchodFormSet(initial=wartosci_poczatkowe(dzieci))
+
+    return render(request, 'obchod.html', {
+        'formset': formset,
+        'wiersze': list(zip(formset.forms, dzieci)),
+        'ucieta': ucieta,
+        'maks_wierszy': MAKS_WIERSZY,
+        'dni_obchodu': DNI_OBCHODU,
+        'statusy': StatusDziecka.STATUS_CHOICES,
+        'filtry': request.GET,
+    })
+
+
+@login_required
+def obchod_wynik(request):
+    """Werdykty ostatniego obchodu zapisanego w tej sesji."""
+    wyniki = request.session.get(KLUCZ_WYNIKU_OBCHODU)
+    if not wyniki:
+        return redirect('obchod')
+    pomiary = ParametryZewnetrzne.objects.select_related('dziecko').in_bulk([pk for pk, _, _ in wyniki])
+    return render(request, 'obchod_wynik.html', {
+        # Pomiar mógł zostać usunięty po zapisie obchodu
+        'wyniki': [(pomiary[pk], status, werdykt) for pk, status, werdykt in wyniki if pk in pomiary],
+    })
+
+
+def _json(dane, status=200):
+    # Zwarty zapis bez spacji - odpowiedzi API bywają duże
+    return JsonResponse(dane, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def _api_wymaga_logowania(widok):
+    """Jak `login_required`, ale dla klientów API: 401 z JSON zamiast przekierowania na stronę logowania."""
+    @wraps(widok)
+    def opakowany(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({'blad': 'Authentication required'}, status=401)
+        return widok(request, *args, **kwargs)
+    return opakowany
+
+
+@_api_wymaga_logowania
+@odczyt_z_repliki
+def api_zasob(request, zasob):
+    """JSON API: ``GET /api/<zasob>/?ids=...&pola=...`` oraz ``POST /api/parametry/`` z tablicą pomiarów."""
+    if zasob not in api.ZASOBY:
+        return _json({'blad': f'Unknown resource: {zasob}'}, status=404)
+    if request.method == 'POST' and zasob == 'parametry':
+        try:
+            zapisane, bledy = api.zapisz_pomiary(json.loads(request.body), request.user)
+        except json.JSONDecodeError:
+            return _json({'blad': 'Invalid JSON'}, status=400)
+        except ValueError as e:
+            return _json({'blad': str(e)}, status=400)
+        if bledy:
+            return _json({'bledy': bledy}, status=400)
+        return _json({'wyniki': zapisane}, status=201)
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET', 'POST'] if zasob == 'parametry' else ['GET'])
+    try:
+        return _json(api.pobierz(zasob, request.GET))
+    except ValueError as e:
+        return _json({'blad': str(e)}, status=400)
+
+
+def metryki(request):
+    """Histogramy czasu i zapytań SQL widoków w formacie tekstowym Prometheusa."""
+    if not dostep_do_metryk(request):
+        return HttpResponseForbidden()
+    return HttpResponse(eksport_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
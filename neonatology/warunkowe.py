@@ -0,0 +1,129 @@
+"""Warunkowy GET (ETag / Last-Modified) dla stron szczegółów dziecka i matki.
+
+Walidatorem strony jest najnowsza ``history_date`` z tabel historii, z
+których strona jest złożona - każdy zapis i każde usunięcie dopisuje wiersz
+historii, więc walidator zmienia się razem z treścią. Liczy go jedno
+zapytanie: podzapytania ``ORDER BY history_date DESC LIMIT 1`` idą po
+indeksach ``(obiekt, -history_date)`` tabel historycznych. Niezmieniona
+strona dostaje 304 bez wczytywania pomiarów i bez renderowania szablonu.
+"""
+import hashlib
+from datetime import datetime, timezone as strefa
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import Dziecko, Matka, ParametryZewnetrzne, APGARScore
+
+# Zamiast NULL (brak wierszy historii) - GREATEST z NULL w SQLite daje NULL
+EPOKA = datetime(1970, 1, 1, tzinfo=strefa.utc)
+
+
+def _najnowsza(model, **filtr):
+    return Coalesce(
+        Subquery(model.history.model.objects.filter(**filtr).order_by('-history_date').values('history_date')[:1]),
+        Value(EPOKA),
+    )
+
+
+@lru_cache(maxsize=None)
+def _zmiany_dzieci():
+    # Budowane raz - menedżer `model.history` jest tworzony od nowa przy każdym odczycie
+    return Dziecko.objects.annotate(zmiana=Greatest(
+        _najnowsza(Dziecko, id=OuterRef('pk')),
+        _najnowsza(ParametryZewnetrzne, dziecko_id=OuterRef('pk')),
+        _najnowsza(APGARScore, dziecko_id=OuterRef('pk')),
+        _najnowsza(Matka, id=OuterRef('matka_id')),
+    )).order_by().values_list('zmiana', flat=True)
+
+
+@lru_cache(maxsize=None)
+def _zmiany_matek():
+    liczba_dzieci = Subquery(
+        Dziecko.objects.filter(matka=OuterRef('pk')).order_by().values('matka').annotate(n=Count('pk')).values('n'))
+    return Matka.objects.annotate(
+        zmiana=Greatest(_najnowsza(Matka, id=OuterRef('pk')),
+                        _najnowsza(Dziecko, matka_id=OuterRef('pk'))),
+        liczba_dzieci=Coalesce(liczba_dzieci, 0),
+    ).order_by().values_list('zmiana', 'liczba_dzieci')
+
+
+def walidator_dziecka(dziecko_id):
+    """(najnowsza zmiana, dodatek do ETag) dla strony dziecka - historia dziecka, jego pomiarów, APGAR i matki.
+
+    None, gdy dziecko nie istnieje.
+    """
+    zmiana = next(iter(_zmiany_dzieci().filter(pk=dziecko_id)), None)
+    return None if zmiana is None else (zmiana, '')
+
+
+def walidator_matki(matka_id):
+    """Jak `walidator_dziecka` dla strony matki - historia matki i jej dzieci.
+
+    Dziecko przepisane do innej matki nie zostawia wiersza historii z
+    poprzednią matką, dlatego ETag zawiera też liczbę dzieci.
+    """
+    wiersz = next(iter(_zmiany_matek().filter(pk=matka_id)), None)
+    return None if wiersz is None else (wiersz[0], str(wiersz[1]))
+
+
+def _etag(request, zmiana, dodatek):
+    # Użytkownik jest w ETag, bo strona zawiera jego nazwę (menu), a sekret CSRF, bo strona zawiera
+    # formularz wylogowania - po ponownym zalogowaniu 304 zostawiłoby w przeglądarce nieaktualny token.
+    # get_token() zwraca za każdym razem inaczej zamaskowany token, więc do ETag idzie sam sekret.
+    get_token(request)
+    tresc = f'{request.path}|{zmiana.isoformat()}|{dodatek}|{request.user.pk}|{request.META["CSRF_COOKIE"]}'
+    return quote_etag(hashlib.sha1(tresc.encode()).hexdigest()[:20])
+
+
+def warunkowy(walidator):
+    """Dekorator widoku szczegółów: ETag i Last-Modified z `walidator` oraz 304 dla niezmienionej strony.
+
+    `walidator` dostaje argumenty widoku (bez żądania). Strona z oczekującymi
+    komunikatami (messages) jest zawsze renderowana - komunikat nie zmienia
+    walidatora. ``Cache-Control: private, no-cache`` wymusza walidację przy
+    każdym wyświetleniu zamiast heurystycznego cache przeglądarki, a
+    ``Vary: Cookie`` - osobną wersję strony dla każdej sesji.
+    """
+    def dekorator(widok):
+        def przygotuj(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+                return None, None, None
+            znacznik = walidator(*args, **kwargs)
+            if znacznik is None:
+                return None, None, None
+            zmiana, dodatek = znacznik
+            etag = _etag(request, zmiana, dodatek)
+            ostatnia_zmiana = int(zmiana.timestamp())
+            return get_conditional_response(request, etag=etag, last_modified=ostatnia_zmiana), etag, ostatnia_zmiana
+
+        def uzupelnij(response, etag, ostatnia_zmiana):
+            if etag is not None and response.status_code in (200, 304):
+                response.headers.setdefault('ETag', etag)
+                response.headers.setdefault('Last-Modified', http_date(ostatnia_zmiana))
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ('Cookie',))
+            return response
+
+        if iscoroutinefunction(widok):
+            @wraps(widok)
+            async def opakowany(request, *args, **kwargs):
+                odpowiedz, etag, ostatnia_zmiana = await sync_to_async(przygotuj)(request, *args, **kwargs)
+                if odpowiedz is None:
+                    odpowiedz = await widok(request, *args, **kwargs)
+                return uzupelnij(odpowiedz, etag, ostatnia_zmiana)
+        else:
+            @wraps(widok)
+            def opakowany(request, *args, **kwargs):
+                odpowiedz, etag, ostatnia_zmiana = przygotuj(request, *args, **kwargs)
+                if odpowiedz is None:
+                    odpowiedz = widok(request, *args, **kwargs)
+                return uzupelnij(odpowiedz, etag, ostatnia_zmiana)
+        return opakowany
+    return dekorator
@@ -0,0 +1,99 @@
+"""Asynchroniczne wersje widoków odczytu dla wdrożenia ASGI.
+
+Zapytania idą przez async ORM (`aget`, `async for`, `acount`), a te,
+które od siebie nie zależą, są uruchamiane razem przez `asyncio.gather`.
+Async ORM w Django 5.2 wykonuje zapytania przez
+``sync_to_async(thread_sensitive=True)``, czyli w jednym współdzielonym
+wątku - `gather` skraca oczekiwanie pętli zdarzeń, ale nie zrównolegla
+zapytań na bazie. Szablony są renderowane w tym samym wątku, bo procesory
+kontekstu (użytkownik, komunikaty) czytają sesję synchronicznie.
+
+Widoki są podpinane w urls.py zamiast synchronicznych, gdy
+``WIDOKI_ASYNC = True``. Porównanie obu ścieżek pod obciążeniem:
+``python manage.py porownaj_obciazenie``.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import aget_object_or_404, render
+
+from . import views
+from .archiwum_historii import typy_dziecka
+from .historia import ahistoria_dziecka
+from .models import Dziecko, ParametryZewnetrzne, APGARScore, Matka
+from .pamiec_raportow import PamiecRaportow
+from .repliki import odczyt_z_repliki
+from .stronicowanie import PaginatorKursorowy, parametry_bez_kursora
+from .warunkowe import walidator_dziecka, walidator_matki, warunkowy
+
+_renderuj = sync_to_async(render)
+
+
+async def _lista(zapytanie):
+    return [obiekt async for obiekt in zapytanie]
+
+
+@login_required
+@odczyt_z_repliki
+async def raporty(request):
+    """Panel raportów - jak `views.raporty`; strona kluczy jest czytana przez async ORM."""
+    pamiec = await sync_to_async(PamiecRaportow)(request.GET)
+    tabela = await sync_to_async(pamiec.tabela)()
+    if tabela is None:
+        page_obj = await views._paginator_raportu(request.GET).astrona_z_zadania(request.GET)
+        tabela = await sync_to_async(views._zloz_tabele_raportu)(request.GET, pamiec, page_obj)
+    return await _renderuj(request, 'raporty.html', views._kontekst_raportow(request.GET, tabela))
+
+
+@login_required
+@odczyt_z_repliki
+@warunkowy(walidator_dziecka)
+async def szczegoly_noworodka(request, dziecko_id):
+    """Szczegóły noworodka - dziecko, pomiary i APGAR czytane współbieżnie."""
+    dziecko, parametry, apgar_scores = await asyncio.gather(
+        aget_object_or_404(Dziecko.objects.select_related('matka'), id=dziecko_id),
+        _lista(ParametryZewnetrzne.objects.filter(dziecko_id=dziecko_id)),
+        _lista(APGARScore.objects.filter(dziecko_id=dziecko_id)),
+    )
+    return await _renderuj(request, 'szczegoly_noworodka.html', {
+        'dziecko': dziecko,
+        'parametry': parametry,
+        'apgar_scores': apgar_scores,
+    })
+
+
+@login_required
+@odczyt_z_repliki
+async def historia_zmian(request, dziecko_id):
+    """Historia zmian dziecka; przywracanie wersji (POST) i wpisy z archiwum obsługuje widok synchroniczny."""
+    if request.method == 'POST' or request.GET.get('archiwum') == '1':
+        return await sync_to_async(views.historia_zmian)(request, dziecko_id)
+    dziecko = await aget_object_or_404(Dziecko, id=dziecko_id)
+    zarchiwizowane = await sync_to_async(typy_dziecka)(dziecko)
+    return await _renderuj(request, 'historia_zmian.html', {
+        'dziecko': dziecko,
+        'historia': await ahistoria_dziecka(dziecko, zarchiwizowane),
+        'archiwum': False,
+        'ma_archiwum': bool(zarchiwizowane),
+    })
+
+
+@login_required
+@odczyt_z_repliki
+@warunkowy(walidator_matki)
+async def szczegoly_matki(request, matka_id):
+    """Szczegóły matki - matka, strona dzieci i ich liczba czytane współbieżnie."""
+    dzieci = Dziecko.objects.filter(matka_id=matka_id)
+    matka, strona, liczba_dzieci = await asyncio.gather(
+        aget_object_or_404(Matka, id=matka_id),
+        PaginatorKursorowy(dzieci, 50, ('-data_urodzenia', '-id')).astrona_z_zadania(request.GET),
+        dzieci.acount(),
+    )
+    return await _renderuj(request, 'szczegoly_matki.html', {
+        'matka': matka,
+        'dzieci': strona,
+        'liczba_dzieci': liczba_dzieci,
+        'page_obj': strona,
+        'filtry': parametry_bez_kursora(request.GET),
+    })
@@ -0,0 +1,172 @@
+"""Szybkie wyszukiwanie pacjentów po prefiksie (PESEL, nazwisko matki, imię dziecka).
+
+Każde słowo wyszukiwanych pól jest zapisane w tabeli `HasloWyszukiwania`
+w postaci znormalizowanej (małe litery, bez znaków diakrytycznych), więc
+"Wójcik" znajduje się po "wojc". Prefiks jest zamieniany na zakres
+``tekst >= 'wojc' AND tekst < 'wojd'``, który korzysta ze zwykłego indeksu
+B-drzewa na każdej bazie (w przeciwieństwie do ``icontains``).
+
+Tabela jest aktualizowana przyrostowo z sygnałów zapisu `Matka`/`Dziecko`;
+importy zbiorcze wołają `odswiez_hasla`, a `przebuduj_indeks` odtwarza
+całość.
+
+`podpowiedzi_matek` obsługuje pole wyboru matki w formularzu dziecka:
+zwraca stronę podpowiedzi z kursorem do następnej, a ostatnio używane
+strony trzyma w małej pamięci LRU procesu.
+"""
+import re
+import time
+import unicodedata
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Dziecko, Matka, HasloWyszukiwania
+from .stronicowanie import PaginatorKursorowy
+
+ROZMIAR_PORCJI = 500
+DOMYSLNY_LIMIT = 20
+MAKS_DLUGOSC = 100
+ROZMIAR_STRONY_PODPOWIEDZI = 20
+# Liczba zapamiętanych stron podpowiedzi i czas ich ważności (sekundy).
+# Pamięć jest czyszczona przy każdej zmianie haseł w tym procesie; czas
+# ważności ogranicza nieaktualność w pozostałych procesach serwera.
+ROZMIAR_PAMIECI_PODPOWIEDZI = 256
+WAZNOSC_PODPOWIEDZI = 60
+
+# Litery, których NFKD nie rozkłada na literę bazową i znak diakrytyczny
+_ZAMIANY = str.maketrans({'ł': 'l', 'Ł': 'l', 'ø': 'o', 'Ø': 'o', 'ß': 'ss'})
+_SLOWO = re.compile(r'[0-9a-z]+')
+
+# Pola indeksowane dla każdego typu obiektu
+POLA = {
+    'matka': ('pesel', 'nazwisko'),
+    'dziecko': ('imie',),
+}
+
+
+def normalizuj(tekst):
+    """Zwraca tekst małymi literami ASCII, bez znaków diakrytycznych."""
+    tekst = unicodedata.normalize('NFKD', (tekst or '').translate(_ZAMIANY))
+    return ''.join(znak for znak in tekst if not unicodedata.combining(znak)).lower()
+
+
+def slowa(tekst):
+    """Dzieli tekst na znormalizowane słowa (np. nazwiska dwuczłonowe)."""
+    return _SLOWO.findall(normalizuj(tekst))
+
+
+def _hasla(typ, obiekt):
+    for pole in POLA[typ]:
+        for slowo in set(slowa(getattr(obiekt, pole))):
+            yield HasloWyszukiwania(typ=typ, obiekt_id=obiekt.pk, pole=pole, tekst=slowo[:MAKS_DLUGOSC])
+
+
+def _odswiez(typ, model, ids):
+    ids = sorted({pk for pk in ids if pk is not None})
+    for i in range(0, len(ids), ROZMIAR_PORCJI):
+        porcja = ids[i:i + ROZMIAR_PORCJI]
+        HasloWyszukiwania.objects.filter(typ=typ, obiekt_id__in=porcja).delete()
+        HasloWyszukiwania.objects.bulk_create(
+            [haslo for obiekt in model.objects.filter(pk__in=porcja).only('pk', *POLA[typ])
+             for haslo in _hasla(typ, obiekt)],
+            batch_size=ROZMIAR_PORCJI,
+        )
+
+
+def odswiez_hasla(matki_ids=(), dzieci_ids=()):
+    """Przelicza hasła podanych matek i dzieci (usunięte obiekty tracą hasła)."""
+    with transaction.atomic():
+        _odswiez('matka', Matka, matki_ids)
+        _odswiez('dziecko', Dziecko, dzieci_ids)
+    _strona_podpowiedzi_matek.cache_clear()
+
+
+def przebuduj_indeks():
+    """Odbudowuje cały indeks; zwraca liczbę zapisanych haseł."""
+    with transaction.atomic():
+        HasloWyszukiwania.objects.all().delete()
+        for typ, model in (('matka', Matka), ('dziecko', Dziecko)):
+            porcja = []
+            for obiekt in model.objects.only('pk', *POLA[typ]).iterator(chunk_size=2000):
+                porcja.extend(_hasla(typ, obiekt))
+                if len(porcja) >= ROZMIAR_PORCJI:
+                    HasloWyszukiwania.objects.bulk_create(porcja)
+                    porcja = []
+            HasloWyszukiwania.objects.bulk_create(porcja)
+    _strona_podpowiedzi_matek.cache_clear()
+    return HasloWyszukiwania.objects.count()
+
+
+def _zakres(prefiks):
+    """Warunek zakresowy równoważny ``tekst LIKE 'prefiks%'`` (prefiks w ASCII)."""
+    return {'tekst__gte': prefiks, 'tekst__lt': prefiks[:-1] + chr(ord(prefiks[-1]) + 1)}
+
+
+def szukaj(zapytanie, limit=DOMYSLNY_LIMIT):
+    """Zwraca listę wyników ``{'typ', 'obiekt'}`` pasujących do wszystkich słów zapytania.
+
+    Każde słowo musi być prefiksem któregoś z indeksowanych słów tego samego
+    obiektu (np. "anna kow" - dziecko Anna lub matka Kowalska, ale nie obie
+    naraz, bo to różne obiekty).
+    """
+    prefiksy = slowa(zapytanie)
+    if not prefiksy:
+        return []
+    hasla = _hasla_pasujace(prefiksy)
+
+    trafienia = []
+    for typ, obiekt_id in hasla.order_by('tekst', 'typ', 'obiekt_id').values_list('typ', 'obiekt_id')[:limit * 3]:
+        if (typ, obiekt_id) not in trafienia:
+            trafienia.append((typ, obiekt_id))
+        if len(trafienia) == limit:
+            break
+
+    matki = Matka.objects.in_bulk([pk for typ, pk in trafienia if typ == 'matka'])
+    dzieci = Dziecko.objects.select_related('matka').in_bulk([pk for typ, pk in trafienia if typ == 'dziecko'])
+    obiekty = {'matka': matki, 'dziecko': dzieci}
+    return [
+        {'typ': typ, 'obiekt': obiekty[typ][pk]}
+        for typ, pk in trafienia if pk in obiekty[typ]
+    ]
+
+
+def _hasla_pasujace(prefiksy, typ=None):
+    """Hasła pasujące do najdłuższego prefiksu, których obiekt ma też pozostałe prefiksy."""
+    # Najdłuższy prefiks jest najbardziej selektywny - od niego zaczyna się zakres
+    prefiksy = sorted(prefiksy, key=len, reverse=True)
+    hasla = HasloWyszukiwania.objects.filter(**_zakres(prefiksy[0]))
+    if typ is not None:
+        hasla = hasla.filter(typ=typ)
+    for prefiks in prefiksy[1:]:
+        hasla = hasla.filter(Exists(HasloWyszukiwania.objects.filter(
+            typ=OuterRef('typ'), obiekt_id=OuterRef('obiekt_id'), **_zakres(prefiks))))
+    return hasla
+
+
+@lru_cache(maxsize=ROZMIAR_PAMIECI_PODPOWIEDZI)
+def _strona_podpowiedzi_matek(prefiksy, po, okres):
+    # `okres` jest tylko częścią klucza pamięci - wymusza odświeżenie co WAZNOSC_PODPOWIEDZI
+    if prefiksy:
+        # Sortowanie zgodne z indeksem haslo_typ_tekst_idx
+        strona = PaginatorKursorowy(_hasla_pasujace(prefiksy, 'matka').only('typ', 'tekst', 'obiekt_id'),
+                                    ROZMIAR_STRONY_PODPOWIEDZI, ('typ', 'tekst', 'obiekt_id')).get_page(po=po)
+        ids = list(dict.fromkeys(haslo.obiekt_id for haslo in strona))
+        matki = Matka.objects.only('imie', 'nazwisko', 'pesel').in_bulk(ids)
+        matki = [matki[pk] for pk in ids if pk in matki]
+    else:
+        strona = PaginatorKursorowy(Matka.objects.only('imie', 'nazwisko', 'pesel'),
+                                    ROZMIAR_STRONY_PODPOWIEDZI, ('nazwisko', 'imie', 'id')).get_page(po=po)
+        matki = strona.object_list
+    return tuple((matka.pk, str(matka)) for matka in matki), strona.kursor_nastepny
+
+
+def podpowiedzi_matek(zapytanie='', po=None):
+    """Strona podpowiedzi dla pola wyboru matki.
+
+    Zwraca ``(wyniki, kursor_nastepny)``, gdzie wyniki to krotki
+    ``(id, etykieta)``. Puste zapytanie listuje matki alfabetycznie.
+    """
+    prefiksy = tuple(sorted(set(slowa(zapytanie))))
+    return _strona_podpowiedzi_matek(prefiksy, po or None, int(time.monotonic() // WAZNOSC_PODPOWIEDZI))
@@ -0,0 +1,184 @@
+"""Krzywe wzrastania dziecka (waga, długość, obwód głowy) z centylami WHO.
+
+Tabele referencyjne LMS (WHO Child Growth Standards, węzły miesięczne
+0-12 miesięcy, osobno dla chłopców i dziewczynek) są wczytywane z
+``dane/who_lms.csv`` raz na proces do tablic NumPy. Dla wieku każdego
+pomiaru L, M i S są interpolowane liniowo (`np.interp`), a z-score
+liczony wzorem LMS dla całej serii naraz. Centyl jest odczytywany z
+gęstej, raz policzonej siatki dystrybuanty rozkładu normalnego.
+
+Długie serie są przerzedzane po stronie serwera algorytmem LTTB
+(Largest-Triangle-Three-Buckets), który zachowuje kształt wykresu.
+Pomiary poza zakresem tabel (przed urodzeniem, po 12. miesiącu) mają
+z-score i centyl równe ``None``.
+"""
+import csv
+import math
+from datetime import datetime, time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ParametryZewnetrzne
+
+SCIEZKA_TABEL = Path(__file__).resolve().parent / 'dane' / 'who_lms.csv'
+ZRODLO = 'WHO Child Growth Standards (LMS), 0-12 months'
+DNI_W_MIESIACU = 30.4375
+SEKUNDY_W_DNIU = 86400
+
+# Pola pomiaru, dla których są tabele (nazwa wskaźnika w pliku = nazwa pola)
+WSKAZNIKI = ('waga_kg', 'wzrost_cm', 'obwod_glowy_cm')
+CENTYLE_KRZYWYCH = (3, 15, 50, 85, 97)
+PUNKTY_KRZYWEJ = 60
+DOMYSLNA_LICZBA_PUNKTOW = 500
+MAKS_LICZBA_PUNKTOW = 5000
+
+# Siatka dystrybuanty: z w [-MAKS_Z, MAKS_Z] co 0.001
+MAKS_Z = 6.0
+WEZLY_SIATKI = 12001
+
+
+@lru_cache(maxsize=None)
+def tabele_lms():
+    """``{(wskaznik, plec): (wiek_dni, L, M, S)}`` - tablice NumPy posortowane po wieku."""
+    wiersze = {}
+    with open(SCIEZKA_TABEL, encoding='utf-8', newline='') as plik:
+        for wiersz in csv.DictReader(plik):
+            wiersze.setdefault((wiersz['wskaznik'], wiersz['plec']), []).append(
+                (float(wiersz['miesiac']) * DNI_W_MIESIACU, float(wiersz['L']), float(wiersz['M']), float(wiersz['S'])))
+    tabele = {}
+    for klucz, wartosci in wiersze.items():
+        tablica = np.array(sorted(wartosci), dtype=np.float64)
+        tabele[klucz] = tuple(tablica[:, i].copy() for i in range(4))
+    return tabele
+
+
+@lru_cache(maxsize=None)
+def _siatka_centyli():
+    """(z, centyl) na gęstej siatce - dystrybuanta liczona raz, dalej tylko `np.interp`."""
+    z = np.linspace(-MAKS_Z, MAKS_Z, WEZLY_SIATKI)
+    centyl = 50.0 * (1.0 + np.frompyfunc(math.erf, 1, 1)(z / math.sqrt(2)).astype(np.float64))
+    return z, centyl
+
+
+def centyl(z):
+    siatka_z, siatka_centyli = _siatka_centyli()
+    return np.interp(z, siatka_z, siatka_centyli)
+
+
+def z_dla_centyla(c):
+    siatka_z, siatka_centyli = _siatka_centyli()
+    return np.interp(c, siatka_centyli, siatka_z)
+
+
+def lms(wskaznik, plec, wiek_dni):
+    """L, M, S interpolowane dla tablicy wieku w dniach (NaN poza zakresem tabel)."""
+    wiek, l, m, s = tabele_lms()[(wskaznik, plec)]
+    return tuple(np.interp(wiek_dni, wiek, kolumna, left=np.nan, right=np.nan) for kolumna in (l, m, s))
+
+
+def z_score(x, l, m, s):
+    """z-score wzorem LMS: ((x/M)^L - 1) / (L*S), a dla L = 0: ln(x/M) / S."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iloraz = x / m
+        bez_l = np.abs(l) < 1e-6
+        return np.where(bez_l, np.log(iloraz) / s, (np.power(iloraz, l) - 1.0) / np.where(bez_l, 1.0, l * s))
+
+
+def wartosc_dla_z(z, l, m, s):
+    """Odwrotność `z_score`: M * (1 + L*S*z)^(1/L), a dla L = 0: M * exp(S*z)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bez_l = np.abs(l) < 1e-6
+        return np.where(bez_l, m * np.exp(s * z), m * np.power(1.0 + l * s * z, 1.0 / np.where(bez_l, 1.0, l)))
+
+
+def lttb(x, y, liczba_punktow):
+    """Indeksy punktów wybranych algorytmem Largest-Triangle-Three-Buckets.
+
+    Pierwszy i ostatni punkt zostają; środek jest dzielony na
+    ``liczba_punktow - 2`` kubełków, a z każdego wybierany jest punkt
+    tworzący największy trójkąt z punktem wybranym w poprzednim kubełku
+    i średnią następnego. Pętla idzie po kubełkach, nie po punktach.
+    """
+    dlugosc = len(x)
+    if liczba_punktow >= dlugosc or liczba_punktow < 3:
+        return np.arange(dlugosc)
+    granice = np.linspace(1, dlugosc - 1, liczba_punktow - 1).astype(np.intp)
+    wybrane = np.empty(liczba_punktow, dtype=np.intp)
+    wybrane[0], wybrane[-1] = 0, dlugosc - 1
+    a = 0
+    for i in range(liczba_punktow - 2):
+        poczatek, koniec = granice[i], granice[i + 1]
+        nastepny = slice(koniec, granice[i + 2]) if i + 2 < len(granice) else slice(dlugosc - 1, dlugosc)
+        sx, sy = x[nastepny].mean(), y[nastepny].mean()
+        pola = np.abs((x[a] - sx) * (y[poczatek:koniec] - y[a]) - (x[a] - x[poczatek:koniec]) * (sy - y[a]))
+        a = poczatek + int(np.argmax(pola))
+        wybrane[i + 1] = a
+    return wybrane
+
+
+def _lista(tablica, miejsca):
+    """Lista do JSON: wartości zaokrąglone, NaN jako None."""
+    tablica = np.round(tablica, miejsca)
+    return np.where(np.isnan(tablica), None, tablica).tolist()
+
+
+def _poczatek_dnia(data):
+    poczatek = datetime.combine(data, time.min)
+    return timezone.make_aware(poczatek) if settings.USE_TZ else poczatek
+
+
+def krzywe_dziecka(dziecko, liczba_punktow=DOMYSLNA_LICZBA_PUNKTOW):
+    """Dane wykresu wzrastania dziecka gotowe do JSON.
+
+    ``serie`` - dla każdego wskaźnika kolumny ``wiek_dni``, ``czas`` (ms od
+    epoki), ``wartosc``, ``z`` i ``centyl`` po przerzedzeniu do
+    `liczba_punktow`; ``krzywe`` - referencyjne centyle WHO w zakresie
+    wieku serii.
+    """
+    wiersze = list(ParametryZewnetrzne.objects.filter(dziecko=dziecko).order_by('data_pomiaru', 'id')
+                   .values_list('data_pomiaru', *WSKAZNIKI))
+    plec = dziecko.plec
+    if wiersze:
+        daty, *kolumny = zip(*wiersze)
+        # Jedyna pętla po pomiarach - zamiana dat z ORM na znaczniki czasu
+        czas = np.fromiter((d.timestamp() for d in daty), dtype=np.float64, count=len(daty))
+        wartosci = np.array(kolumny, dtype=np.float64)
+    else:
+        czas = np.empty(0)
+        wartosci = np.empty((len(WSKAZNIKI), 0))
+    wiek = (czas - _poczatek_dnia(dziecko.data_urodzenia).timestamp()) / SEKUNDY_W_DNIU
+
+    serie, krzywe = {}, {}
+    for wskaznik, x in zip(WSKAZNIKI, wartosci):
+        l, m, s = lms(wskaznik, plec, wiek)
+        z = z_score(x, l, m, s)
+        indeksy = lttb(wiek, x, liczba_punktow)
+        serie[wskaznik] = {
+            'wiek_dni': _lista(wiek[indeksy], 2),
+            'czas': (czas[indeksy] * 1000).astype(np.int64).tolist(),
+            'wartosc': _lista(x[indeksy], 3),
+            'z': _lista(z[indeksy], 2),
+            'centyl': _lista(centyl(z[indeksy]), 1),
+            'liczba_pomiarow': len(x),
+        }
+
+        wiek_tabeli = tabele_lms()[(wskaznik, plec)][0]
+        koniec = min(max(wiek.max(initial=0.0), DNI_W_MIESIACU), wiek_tabeli[-1])
+        wiek_krzywej = np.linspace(0.0, koniec, PUNKTY_KRZYWEJ)
+        l, m, s = lms(wskaznik, plec, wiek_krzywej)
+        krzywe[wskaznik] = {
+            'wiek_dni': _lista(wiek_krzywej, 2),
+            'centyle': {str(c): _lista(wartosc_dla_z(z_dla_centyla(c), l, m, s), 3) for c in CENTYLE_KRZYWYCH},
+        }
+
+    return {
+        'dziecko': {'id': dziecko.pk, 'imie': dziecko.imie, 'plec': plec,
+                    'data_urodzenia': dziecko.data_urodzenia.isoformat()},
+        'zrodlo': ZRODLO,
+        'serie': serie,
+        'krzywe': krzywe,
+    }